@@ -0,0 +1,261 @@
+"""Time the app's hot paths against synthetic databases.
+
+    python -m benchmarks.run --sizes 10000 100000 1000000 --output bench.json
+
+Runs headless on Qt's offscreen platform. Each operation is repeated and
+the wall times are written as JSON, so results from different commits
+can be compared side by side.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import PySide6
+from PySide6.QtCore import QEventLoop, QSettings, Qt
+from PySide6.QtWidgets import QApplication, QDialog
+
+from benchmarks.synthetic import generate
+from gui.expense_model import AMOUNT_COLUMN, ID_COLUMN
+from gui.main_window import MainWindow
+
+
+CATEGORY_COLUMN = 3
+FILTER_CATEGORIES = {'Repairs', 'Taxes', 'Utilities'}
+
+
+def wait_idle(app, executor):
+    """Process events until the executor has nothing left in flight."""
+    app.processEvents()
+    while executor.is_busy():
+        loop = QEventLoop()
+        executor.busy_changed.connect(loop.quit)
+        loop.exec()
+        executor.busy_changed.disconnect(loop.quit)
+        app.processEvents()
+
+
+def first_page(model):
+    # What a view shows right after a reset
+    if model.rowCount() == 0 and model.canFetchMore():
+        model.fetchMore()
+
+
+def operations(app, window):
+    """[(name, setup, run)]; only run() is timed."""
+    model = window.details_model
+    address = window.addr_selector.itemText(0)
+
+    def idle():
+        wait_idle(app, window.executor)
+
+    def no_filters():
+        window.active_filters.clear()
+        window._apply_filters()
+        idle()
+
+    def load_summary():
+        window.load_summary()
+        idle()
+
+    def load_details():
+        window.load_details(address)
+        idle()
+        first_page(model)
+
+    def scroll_details():
+        model.sort(ID_COLUMN, Qt.AscendingOrder)
+        while model.canFetchMore():
+            model.fetchMore()
+
+    def sort_details():
+        model.sort(AMOUNT_COLUMN, Qt.DescendingOrder)
+        first_page(model)
+
+    def apply_filters():
+        window.active_filters = {CATEGORY_COLUMN: set(FILTER_CATEGORIES)}
+        window._apply_filters()
+        idle()
+        first_page(model)
+
+    def category_summary():
+        window._show_category_summary(0, 0)
+        idle()
+
+    def all_years():
+        window.year_selector.setCurrentIndex(0)
+        idle()
+
+    def year_details():
+        # The latest full year; summary and details reload for it
+        window.year_selector.setCurrentIndex(
+            min(2, window.year_selector.count() - 1))
+        idle()
+        first_page(model)
+
+    def search():
+        # Bypasses the typing debounce; synthetic recipients are 'Vendor N'
+        window.search_edit.blockSignals(True)
+        window.search_edit.setText('vendor 12')
+        window.search_edit.blockSignals(False)
+        window.run_search()
+        idle()
+
+    def cash_flow():
+        # Every house by month, from the monthly rollup
+        window.load_cash_flow()
+        idle()
+
+    return [
+        ('load_summary', idle, load_summary),
+        ('load_details', idle, load_details),
+        ('scroll_details', no_filters, scroll_details),
+        ('sort_details', no_filters, sort_details),
+        ('apply_filters', no_filters, apply_filters),
+        ('category_summary', idle, category_summary),
+        ('year_details', all_years, year_details),
+        ('search', all_years, search),
+        ('cash_flow', all_years, cash_flow),
+    ]
+
+
+def bench_database(app, path, repeat):
+    window = MainWindow(path)
+    window.show()
+    # The data is asked for once the window has painted
+    while not window._started or window.refresher.is_dirty('addresses'):
+        app.processEvents()
+    wait_idle(app, window.executor)
+    # Tabs are built when first shown; the operations use all of them,
+    # from the Summary tab the window starts on
+    window.tabs.setCurrentIndex(window.CASH_FLOW_TAB)
+    window.tabs.setCurrentIndex(window.SEARCH_TAB)
+    window.tabs.setCurrentIndex(window.DETAILS_TAB)
+    window.tabs.setCurrentIndex(0)
+    wait_idle(app, window.executor)
+    results = []
+    # The category dialog would block on exec(); only building it counts
+    with mock.patch.object(QDialog, 'exec', return_value=0):
+        for name, setup, run in operations(app, window):
+            runs = []
+            for _ in range(repeat):
+                setup()
+                start = time.perf_counter()
+                run()
+                runs.append(time.perf_counter() - start)
+            results.append({
+                'operation': name,
+                'runs': runs,
+                'min': min(runs),
+                'median': statistics.median(runs),
+                'mean': statistics.fmean(runs),
+                'rows': window.details_model.rowCount(),
+            })
+    window.close()
+    window.deleteLater()
+    app.processEvents()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def add_database_arguments(parser):
+    """Options shared by the benchmarks: which databases, how often."""
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help='transactions per database')
+    parser.add_argument('--houses', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skew', type=float, default=1.0,
+                        help='house size skew; 0 spreads rows evenly')
+    parser.add_argument('--null-share', type=float, default=0.02)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cache-dir',
+                        default=os.path.join(tempfile.gettempdir(), 'realestate_bench'),
+                        help='where generated databases are kept for reuse')
+    parser.add_argument('--output', help='JSON file (default: stdout)')
+
+
+def ensure_database(args, size):
+    """Path of the cached database for size, generating it if needed."""
+    os.makedirs(args.cache_dir, exist_ok=True)
+    path = os.path.join(
+        args.cache_dir,
+        f'{size}-{args.houses}-{args.seed}-{args.skew}-{args.null_share}.db')
+    if not os.path.exists(path):
+        print(f'Generating {size:,} transactions…', file=sys.stderr)
+        partial = path + '.partial'
+        if os.path.exists(partial):
+            os.remove(partial)
+        generate(partial, size, houses=args.houses, seed=args.seed,
+                 skew=args.skew, null_share=args.null_share)
+        os.replace(partial, path)
+    return path
+
+
+def report_header(args):
+    """What a report's numbers depend on besides the code."""
+    return {
+        'generated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'pyside': PySide6.__version__,
+        'platform': platform.platform(),
+        'parameters': {
+            'houses': args.houses, 'seed': args.seed, 'skew': args.skew,
+            'null_share': args.null_share, 'repeat': args.repeat,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    add_database_arguments(parser)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    app = QApplication.instance() or QApplication([])
+    # Keep the benchmark's column widths out of the user's settings
+    QSettings.setDefaultFormat(QSettings.IniFormat)
+    QSettings.setPath(QSettings.IniFormat, QSettings.UserScope, args.cache_dir)
+
+    report = report_header(args)
+    report['results'] = []
+    for size in args.sizes:
+        path = ensure_database(args, size)
+        print(f'Benchmarking {size:,} transactions…', file=sys.stderr)
+        for result in bench_database(app, path, args.repeat):
+            result['transactions'] = size
+            report['results'].append(result)
+            print(f"  {result['operation']:<18} median {result['median'] * 1000:9.1f} ms",
+                  file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
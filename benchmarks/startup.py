@@ -0,0 +1,111 @@
+"""Time how long the main window takes to start.
+
+    python -m benchmarks.startup --sizes 100000 --repeat 5 --output startup.json
+
+Every run is a fresh interpreter, so imports are paid for as a user
+would pay for them. Each run reports the time from process start to:
+the window's modules being imported, the window being constructed, its
+first paint, and its initial data being on screen.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+MILESTONES = ['imported', 'constructed', 'painted', 'loaded']
+
+
+def measure(db_path, cache_dir):
+    """Start the window on db_path in this process; return milestone times."""
+    start = time.perf_counter()
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtCore import QEvent, QObject, QSettings
+    from PySide6.QtWidgets import QApplication
+    from gui.main_window import MainWindow
+    times = {'imported': time.perf_counter() - start}
+
+    app = QApplication.instance() or QApplication([])
+    # Keep the benchmark's window state out of the user's settings
+    QSettings.setDefaultFormat(QSettings.IniFormat)
+    QSettings.setPath(QSettings.IniFormat, QSettings.UserScope, cache_dir)
+
+    class FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and 'painted' not in times:
+                times['painted'] = time.perf_counter() - start
+            return False
+
+    window = MainWindow(db_path)
+    times['constructed'] = time.perf_counter() - start
+    watcher = FirstPaint()
+    window.installEventFilter(watcher)
+    window.show()
+    # Loaded: painted, the initial loads have been requested and all of
+    # them have come back
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        app.processEvents()
+        if ('painted' in times and window.summary_table.rowCount()
+                and not window.executor.is_busy()):
+            times['loaded'] = time.perf_counter() - start
+            break
+        time.sleep(0.001)
+    window.close()
+    return times
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['--measure']:
+        # Child process: one measurement, as JSON on stdout. Nothing of
+        # Qt or the app may be imported before measure() starts its clock.
+        print(json.dumps(measure(*argv[1:3])))
+        return 0
+
+    from benchmarks.run import add_database_arguments, ensure_database, report_header
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    add_database_arguments(parser)
+    args = parser.parse_args(argv)
+
+    report = report_header(args)
+    report['results'] = []
+    for size in args.sizes:
+        path = ensure_database(args, size)
+        print(f'Starting on {size:,} transactions…', file=sys.stderr)
+        runs = []
+        for _ in range(args.repeat):
+            child = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.startup',
+                 '--measure', path, args.cache_dir],
+                capture_output=True, text=True, check=True,
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            runs.append(json.loads(child.stdout.strip().splitlines()[-1]))
+        for milestone in MILESTONES:
+            values = [run[milestone] for run in runs if milestone in run]
+            result = {
+                'transactions': size,
+                'milestone': milestone,
+                'runs': values,
+                'median': statistics.median(values) if values else None,
+            }
+            report['results'].append(result)
+            if values:
+                print(f'  {milestone:<12} median {result["median"] * 1000:9.1f} ms',
+                      file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import random
+from datetime import date, timedelta
+from gui.db_utils import DBManager
+from gui.importer import INSERT_EXPENSE
+
+
+INCOME_CATEGORIES = ['Rents received', 'Royalties received']
+EXPENSE_CATEGORIES = [
+    'Advertising', 'Cleaning and maintenance', 'Insurance',
+    'Management fees', 'Mortgage interest paid to banks', 'Repairs',
+    'Supplies', 'Taxes', 'Utilities', 'Other',
+]
+PAYMENTS = ['Cash', 'Check', 'Credit Card', 'Bank Transfer', 'Venmo', 'Zelle']
+STREETS = ['Main St', 'Oak Ave', 'Elm Rd', 'Pine Ct', 'Lake Dr', 'Hill Way']
+
+# Rows handed to one executemany() call
+BATCH_SIZE = 10000
+
+
+def generate(path, transactions, houses=20, seed=0, income_share=0.3,
+             null_share=0.02, skew=1.0, start=date(2015, 1, 1), days=3650,
+             recipients=500, descriptions=2000):
+    """Create a database at path with the app's schema and synthetic rows.
+
+    Houses get transactions in proportion to 1 / rank ** skew, so with
+    the default skew the busiest house holds several times the share of
+    an average one. null_share of the optional text columns are NULL.
+    The same arguments always produce the same database.
+    """
+    rng = random.Random(seed)
+    db = DBManager(path)
+    db.init_db()
+    weights = [1 / rank ** skew for rank in range(1, houses + 1)]
+    day_strings = [(start + timedelta(days=d)).isoformat() for d in range(days)]
+
+    def maybe(value):
+        return None if rng.random() < null_share else value
+
+    def rows():
+        for _ in range(transactions):
+            house_id = rng.choices(house_ids, weights)[0]
+            if rng.random() < income_share:
+                kind, amount = 'income', rng.randrange(50000, 400000)
+                category = rng.choice(INCOME_CATEGORIES)
+            else:
+                kind, amount = 'expense', -round(rng.lognormvariate(9.1, 1.2))
+                category = rng.choice(EXPENSE_CATEGORIES)
+            yield (
+                house_id, rng.choice(day_strings), kind, maybe(category),
+                maybe(f'Item {rng.randrange(descriptions)}'),
+                maybe(f'Vendor {rng.randrange(recipients)}'),
+                amount, maybe(rng.choice(PAYMENTS)),
+            )
+
+    with db.transaction():
+        house_ids = [
+            db.execute('INSERT INTO houses(address) VALUES(?)', (
+                f'{n + 1} {STREETS[n % len(STREETS)]}',)).lastrowid
+            for n in range(houses)
+        ]
+        batch = []
+        for row in rows():
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                db.executemany(INSERT_EXPENSE, batch)
+                batch.clear()
+        db.executemany(INSERT_EXPENSE, batch)
+    db.close()
+
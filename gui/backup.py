@@ -0,0 +1,171 @@
+import gzip
+import os
+import re
+import sqlite3
+from datetime import datetime
+from typing import NamedTuple
+
+
+# Pages copied per backup step; progress is reported between steps
+BACKUP_PAGES = 1024
+
+# Bytes read per step when compressing a snapshot
+COMPRESS_CHUNK_SIZE = 1 << 20
+
+# gzip level of snapshots; pages compress almost as well at 1 as at 6,
+# in a third of the time
+COMPRESS_LEVEL = 1
+
+# Snapshots are named <database name>-<time>.db, plus .gz when compressed
+SNAPSHOT_TIME_FORMAT = '%Y%m%d-%H%M%S'
+
+
+class BackupSettings(NamedTuple):
+    # Automatic snapshots: taken every interval_minutes while the
+    # database changes, the newest keep of them kept in directory
+    enabled: bool
+    interval_minutes: int
+    keep: int
+    compress: bool
+    directory: str
+
+
+class BackupCancelled(Exception):
+    """Raised by a progress callback to abandon a backup."""
+
+
+def backup_database(source_path, target_path, progress=None, pages=BACKUP_PAGES):
+    """Copy the database at source_path to target_path with SQLite's
+    online backup API, without stopping anyone from using it.
+
+    Pages are copied `pages` at a time and progress(bytes done, total
+    bytes) is called after each batch; it may raise BackupCancelled. In
+    WAL mode the copy is of the snapshot taken when it starts, so commits
+    made meanwhile neither tear it nor make SQLite start over; in
+    rollback mode SQLite restarts it when another connection writes
+    between batches. The copy goes to a temporary file that only
+    replaces target_path once complete, so a failed or cancelled backup
+    leaves an earlier file of that name untouched. Returns target_path.
+    """
+    partial = target_path + '.part'
+    source = sqlite3.connect(source_path, isolation_level=None)
+    try:
+        if source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal':
+            # An open read transaction pins the snapshot for every batch;
+            # under WAL it does not hold up writers
+            source.execute('BEGIN')
+            source.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchall()
+        page_size = source.execute('PRAGMA page_size').fetchone()[0]
+
+        def report(status, remaining, total):
+            if progress is not None:
+                progress((total - remaining) * page_size, total * page_size)
+
+        target = sqlite3.connect(partial)
+        try:
+            source.backup(target, pages=pages, progress=report)
+        finally:
+            target.close()
+        os.replace(partial, target_path)
+    except BaseException:
+        # Never leave a partial copy behind
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        source.close()
+    return target_path
+
+
+def _compress(path, target_path, progress=None):
+    # gzip path into target_path, reporting (bytes read, file size)
+    total = os.path.getsize(path)
+    partial = target_path + '.part'
+    done = 0
+    try:
+        with open(path, 'rb') as src, gzip.open(
+                partial, 'wb', compresslevel=COMPRESS_LEVEL) as dst:
+            while True:
+                chunk = src.read(COMPRESS_CHUNK_SIZE)
+                if not chunk:
+                    break
+                dst.write(chunk)
+                done += len(chunk)
+                if progress is not None:
+                    progress(done, total)
+        os.replace(partial, target_path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+def snapshot_name(source_path, when, compress=True):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    name = f'{stem}-{when.strftime(SNAPSHOT_TIME_FORMAT)}.db'
+    return name + '.gz' if compress else name
+
+
+def list_snapshots(directory, source_path):
+    """Paths of source_path's snapshots in directory, oldest first."""
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    pattern = re.compile(re.escape(stem) + r'-\d{8}-\d{6}\.db(\.gz)?')
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    # The fixed-width time sorts chronologically as text
+    return [os.path.join(directory, name)
+            for name in sorted(names, key=lambda name: name[len(stem) + 1:])
+            if pattern.fullmatch(name)]
+
+
+def write_snapshot(source_path, directory, keep, compress=True,
+                   progress=None, when=None):
+    """Back up source_path into a new timestamped snapshot in directory,
+    gzip-compressed if compress, and delete all but the newest keep of
+    its snapshots there. Returns the snapshot's path.
+
+    progress(bytes done, total bytes) covers the copy and, when
+    compressing, the compression too; like backup_database() it may
+    raise BackupCancelled.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(
+        directory, snapshot_name(source_path, when or datetime.now(), compress))
+    if not compress:
+        backup_database(source_path, path, progress)
+    else:
+        # Copy first, then compress the copy: the database is only read
+        # for as long as the copy takes. Each counts for half the work.
+        def copying(done, total):
+            if progress is not None:
+                progress(done, 2 * total)
+
+        def compressing(done, total):
+            if progress is not None:
+                progress(total + done, 2 * total)
+
+        copy = path[:-len('.gz')]
+        backup_database(source_path, copy, copying)
+        try:
+            _compress(copy, path, compressing)
+        finally:
+            os.remove(copy)
+    for old in list_snapshots(directory, source_path)[:-max(keep, 1)]:
+        os.remove(old)
+    return path
+
+
+def database_signature(path):
+    """Changes whenever the database at path is written to, WAL included;
+    for skipping backups of unchanged files."""
+    signature = []
+    for name in (path, path + '-wal'):
+        try:
+            stat = os.stat(name)
+        except FileNotFoundError:
+            signature.append(None)
+        else:
+            signature.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
@@ -0,0 +1,77 @@
+import os
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QCheckBox, QSpinBox,
+    QLineEdit, QPushButton, QListWidget, QLabel, QFileDialog
+)
+from gui.backup import BackupSettings
+
+
+class BackupDialog(QDialog):
+    """Settings of the automatic snapshots, and the snapshots taken so
+    far of the open database. The window applies and persists the
+    settings when the dialog is accepted."""
+
+    def __init__(self, settings, snapshots, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Backups')
+        self.resize(520, 420)
+        layout = QVBoxLayout(self)
+
+        self.enabled_cb = QCheckBox('Back up automatically while the database changes')
+        self.enabled_cb.setChecked(settings.enabled)
+        layout.addWidget(self.enabled_cb)
+
+        form = QFormLayout()
+        self.interval_spin = QSpinBox()
+        self.interval_spin.setRange(1, 24 * 60)
+        self.interval_spin.setSuffix(' min')
+        self.interval_spin.setValue(settings.interval_minutes)
+        form.addRow('Every', self.interval_spin)
+        self.keep_spin = QSpinBox()
+        self.keep_spin.setRange(1, 1000)
+        self.keep_spin.setValue(settings.keep)
+        form.addRow('Snapshots kept', self.keep_spin)
+        self.compress_cb = QCheckBox('Compress (gzip)')
+        self.compress_cb.setChecked(settings.compress)
+        form.addRow('', self.compress_cb)
+        folder_layout = QHBoxLayout()
+        self.directory_edit = QLineEdit(settings.directory)
+        folder_layout.addWidget(self.directory_edit)
+        browse_btn = QPushButton('Browse…')
+        browse_btn.clicked.connect(self._browse)
+        folder_layout.addWidget(browse_btn)
+        form.addRow('Folder', folder_layout)
+        layout.addLayout(form)
+
+        title = QLabel('Snapshots of this database')
+        title.setObjectName('dialogTitle')
+        layout.addWidget(title)
+        snapshot_list = QListWidget()
+        # Newest first
+        for path in reversed(snapshots):
+            snapshot_list.addItem(
+                f'{os.path.basename(path)}  ({os.path.getsize(path) / 1024:,.0f} KiB)')
+        layout.addWidget(snapshot_list)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        ok_btn = QPushButton('OK')
+        ok_btn.setDefault(True)
+        ok_btn.clicked.connect(self.accept)
+        buttons.addWidget(ok_btn)
+        cancel_btn = QPushButton('Cancel')
+        cancel_btn.clicked.connect(self.reject)
+        buttons.addWidget(cancel_btn)
+        layout.addLayout(buttons)
+
+    def _browse(self):
+        directory = QFileDialog.getExistingDirectory(
+            self, 'Backup Folder', self.directory_edit.text())
+        if directory:
+            self.directory_edit.setText(directory)
+
+    def backup_settings(self):
+        return BackupSettings(
+            self.enabled_cb.isChecked(), self.interval_spin.value(),
+            self.keep_spin.value(), self.compress_cb.isChecked(),
+            self.directory_edit.text().strip())
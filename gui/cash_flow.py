@@ -0,0 +1,234 @@
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QPointF, QRectF
+from PySide6.QtGui import QColor, QFont, QPainter, QPainterPath, QPen
+from PySide6.QtWidgets import QToolTip, QWidget
+from gui.ledger import CashFlow
+from gui.money import format_cents
+
+
+INCOME_COLOR = QColor(76, 175, 80)
+EXPENSES_COLOR = QColor(229, 57, 53)
+NET_COLOR = QColor(42, 130, 218)
+
+# Label of the row and column adding up every house and every month
+TOTAL = 'Total'
+
+# Roles CashFlowModel answers; views ask for many more per cell
+_CELL_ROLES = frozenset((
+    Qt.DisplayRole, Qt.TextAlignmentRole, Qt.ForegroundRole,
+    Qt.ToolTipRole, Qt.FontRole,
+))
+
+
+class CashFlowModel(QAbstractTableModel):
+    """Pivot of a CashFlow: one row per house plus a total row, one
+    column per month plus a total column; cells show the net.
+
+    Totals are added up once when the data is set, and cells are
+    formatted only when a view asks for them, so a portfolio of many
+    houses over many years resets instantly.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.set_cash_flow(CashFlow([], [], {}))
+
+    def set_cash_flow(self, cash_flow):
+        self.beginResetModel()
+        self.cash_flow = cash_flow
+        self.rows = list(cash_flow.addresses) + [TOTAL]
+        self.columns = list(cash_flow.months) + [TOTAL]
+        self._month_totals = month_totals = cash_flow.month_totals()
+        # (row, column) -> (income, expenses) for the total row and column
+        self._totals = {}
+        for address in cash_flow.addresses:
+            income = expenses = 0
+            for month in cash_flow.months:
+                cell = cash_flow.cells.get((address, month))
+                if cell is not None:
+                    income += cell[0]
+                    expenses += cell[1]
+            self._totals[address, TOTAL] = (income, expenses)
+        for month, total in zip(cash_flow.months, month_totals):
+            self._totals[TOTAL, month] = total
+        self._totals[TOTAL, TOTAL] = (
+            sum(income for income, _ in month_totals),
+            sum(expenses for _, expenses in month_totals),
+        )
+        self.endResetModel()
+
+    def cell(self, row, column):
+        """(income, expenses) in cents, or None for a month without
+        transactions."""
+        key = (self.rows[row], self.columns[column])
+        return self.cash_flow.cells.get(key) or self._totals.get(key)
+
+    def series(self, row):
+        """[(income, expenses)] of the row's house (or every house) per
+        month, with (0, 0) for months without transactions."""
+        if self.rows[row] == TOTAL:
+            return self._month_totals
+        return [self.cell(row, column) or (0, 0)
+                for column in range(len(self.cash_flow.months))]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in _CELL_ROLES:
+            return None
+        cell = self.cell(index.row(), index.column())
+        if cell is None:
+            return None
+        income, expenses = cell
+        if role == Qt.DisplayRole:
+            return format_cents(income + expenses)
+        if role == Qt.TextAlignmentRole:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.ForegroundRole and income + expenses < 0:
+            return EXPENSES_COLOR
+        if role == Qt.ToolTipRole:
+            return (f'Income: {format_cents(income)}\n'
+                    f'Expenses: {format_cents(abs(expenses))}')
+        if role == Qt.FontRole and TOTAL in (
+                self.rows[index.row()], self.columns[index.column()]):
+            font = QFont()
+            font.setBold(True)
+            return font
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.columns[section]
+        return self.rows[section]
+
+
+class CashFlowChart(QWidget):
+    """Monthly trend: income bars up, expense bars down, net as a line.
+
+    Painted directly, so it needs nothing beyond QtWidgets and draws a
+    decade of months in one pass.
+    """
+
+    MARGIN = 10
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(180)
+        self.setMouseTracking(True)
+        self.title = ''
+        self.months = []
+        self.totals = []
+
+    def set_series(self, title, months, totals):
+        """Show [(income, expenses)] for months under title."""
+        self.title = title
+        self.months = list(months)
+        self.totals = list(totals)
+        self.update()
+
+    def _plot_area(self):
+        metrics = self.fontMetrics()
+        label_width = max(
+            [metrics.horizontalAdvance(label) for label in self._axis_labels()]
+            or [0])
+        top = self.MARGIN + metrics.height()
+        bottom = self.height() - self.MARGIN - metrics.height()
+        left = self.MARGIN + label_width + 6
+        return QRectF(left, top, self.width() - left - self.MARGIN,
+                      max(bottom - top, 1))
+
+    def _range(self):
+        # Cents at the top and bottom of the plot; always includes zero
+        high = max([income for income, _ in self.totals] + [0])
+        low = min([expenses for _, expenses in self.totals] + [0])
+        if high == low:
+            high = 100
+        return high, low
+
+    def _axis_labels(self):
+        high, low = self._range()
+        return [format_cents(high), format_cents(low)] if self.totals else []
+
+    def _month_at(self, x):
+        area = self._plot_area()
+        if not self.months or not area.left() <= x < area.right():
+            return None
+        return int((x - area.left()) * len(self.months) / area.width())
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        text_color = self.palette().color(self.foregroundRole())
+        painter.setPen(text_color)
+        painter.drawText(self.MARGIN, self.MARGIN + self.fontMetrics().ascent(),
+                         self.title)
+        if not self.months:
+            return
+        area = self._plot_area()
+        high, low = self._range()
+        scale = area.height() / (high - low)
+
+        def y(cents):
+            return area.top() + (high - cents) * scale
+
+        zero = y(0)
+        step = area.width() / len(self.months)
+        bar = max(step * 0.8, 1)
+        painter.setPen(Qt.NoPen)
+        for i, (income, expenses) in enumerate(self.totals):
+            x = area.left() + i * step + (step - bar) / 2
+            if income:
+                painter.fillRect(QRectF(x, y(income), bar, zero - y(income)),
+                                 INCOME_COLOR)
+            if expenses:
+                painter.fillRect(QRectF(x, zero, bar, y(expenses) - zero),
+                                 EXPENSES_COLOR)
+
+        net = QPainterPath()
+        for i, (income, expenses) in enumerate(self.totals):
+            point = QPointF(area.left() + (i + 0.5) * step, y(income + expenses))
+            if i:
+                net.lineTo(point)
+            else:
+                net.moveTo(point)
+        painter.setPen(QPen(NET_COLOR, 2))
+        painter.drawPath(net)
+
+        # Axes: zero line, the top and bottom values, and as many month
+        # labels as fit without overlapping
+        painter.setPen(text_color)
+        painter.drawLine(QPointF(area.left(), zero), QPointF(area.right(), zero))
+        metrics = self.fontMetrics()
+        high_label, low_label = self._axis_labels()
+        painter.drawText(QRectF(self.MARGIN, area.top(), area.left() - self.MARGIN - 6,
+                                metrics.height()),
+                         Qt.AlignRight | Qt.AlignTop, high_label)
+        painter.drawText(QRectF(self.MARGIN, area.bottom() - metrics.height(),
+                                area.left() - self.MARGIN - 6, metrics.height()),
+                         Qt.AlignRight | Qt.AlignBottom, low_label)
+        needed = metrics.horizontalAdvance('0000-00  ') / step
+        every = next((n for n in (1, 3, 6, 12, 24, 60, 120) if n >= needed), 240)
+        for i, month in enumerate(self.months):
+            # Labels fall on quarters, Januaries or round years
+            if (int(month[:4]) * 12 + int(month[5:7]) - 1) % every == 0:
+                painter.drawText(QPointF(area.left() + i * step,
+                                         area.bottom() + metrics.ascent() + 2),
+                                 month)
+
+    def mouseMoveEvent(self, event):
+        i = self._month_at(event.position().x())
+        if i is None:
+            QToolTip.hideText()
+            return
+        income, expenses = self.totals[i]
+        QToolTip.showText(
+            event.globalPosition().toPoint(),
+            f'{self.months[i]}\nIncome: {format_cents(income)}\n'
+            f'Expenses: {format_cents(abs(expenses))}\n'
+            f'Net: {format_cents(income + expenses)}',
+            self)
@@ -0,0 +1,59 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QPushButton, QTableWidget, QTableWidgetItem
+)
+from PySide6.QtGui import QColor
+from gui.money import format_cents
+
+
+class CategoryDialog(QDialog):
+    """Income and expenses by category, with a total and a net row.
+
+    rows are CategoryTotal, of one house or of a whole portfolio.
+    """
+
+    def __init__(self, title, rows, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.resize(400, 500)
+        layout = QVBoxLayout(self)
+
+        # Create table for category summary
+        self.table = table = QTableWidget()
+        table.setColumnCount(3)
+        table.setHorizontalHeaderLabels(['Category', 'Income', 'Expenses'])
+
+        # Populate table
+        table.setRowCount(len(rows))
+        for row_idx, total in enumerate(rows):
+            table.setItem(row_idx, 0, QTableWidgetItem(total.category))
+            table.setItem(row_idx, 1, QTableWidgetItem(format_cents(total.income)))
+            table.setItem(row_idx, 2, QTableWidgetItem(format_cents(abs(total.expenses))))
+
+        # Add totals row
+        total_income = sum(total.income for total in rows)
+        total_expenses = sum(abs(total.expenses) for total in rows)
+        net = total_income - total_expenses
+
+        table.setRowCount(len(rows) + 1)
+        table.setItem(len(rows), 0, QTableWidgetItem('TOTAL'))
+        table.setItem(len(rows), 1, QTableWidgetItem(format_cents(total_income)))
+        table.setItem(len(rows), 2, QTableWidgetItem(format_cents(total_expenses)))
+
+        # Add net row
+        table.setRowCount(len(rows) + 2)
+        table.setItem(len(rows) + 1, 0, QTableWidgetItem('NET'))
+        net_item = QTableWidgetItem(format_cents(net))
+        net_item.setForeground(QColor('green') if net >= 0 else QColor('red'))
+        table.setItem(len(rows) + 1, 1, net_item)
+
+        # Set column widths
+        table.horizontalHeader().setStretchLastSection(True)
+        for i in range(3):
+            table.setColumnWidth(i, 120)
+
+        layout.addWidget(table)
+
+        # Add close button
+        close_btn = QPushButton('Close')
+        close_btn.clicked.connect(self.accept)
+        layout.addWidget(close_btn)
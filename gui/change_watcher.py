@@ -0,0 +1,77 @@
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+class ChangeWatcher(QObject):
+    """Notices commits that other connections make to the database,
+    e.g. a colleague's window on the same file.
+
+    PRAGMA data_version on the GUI thread's connection is polled every
+    INTERVAL_MS; it moves whenever another connection commits, and
+    reading it costs next to nothing. When it does, the houses and their
+    revisions (house_revisions, bumped by triggers on every change to a
+    house's expenses) are read on a worker thread and compared with the
+    previous read. changed is emitted with the ids of the houses whose
+    rows changed and whether any house was added, renamed or removed.
+
+    The window's own worker threads count as other connections, so its
+    own writes can be reported too; reloading the views they already
+    reloaded is harmless.
+    """
+
+    INTERVAL_MS = 1000
+
+    changed = Signal(object, bool)
+
+    def __init__(self, db, executor, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.executor = executor
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.INTERVAL_MS)
+        self._timer.timeout.connect(self.poll)
+        self._version = None
+        # ({house_id: revision}, ((id, address), ...)) at the last read
+        self._state = None
+
+    def start(self):
+        # Baseline now, so changes from the first interval count
+        self.poll()
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+
+    def reset(self):
+        """Forget what was seen, e.g. after switching files; the next
+        poll only takes a fresh baseline."""
+        self._version = None
+        self._state = None
+        self.executor.cancel('changes')
+
+    def poll(self):
+        version = self.db.query_one('PRAGMA data_version')[0]
+        if version == self._version:
+            return
+        self._version = version
+        self.executor.submit('changes', self._read_state, self._on_state)
+
+    def _read_state(self):
+        # Worker thread
+        return (
+            dict(self.db.query_all(
+                'SELECT house_id, revision FROM house_revisions')),
+            tuple(self.db.query_all('SELECT id, address FROM houses ORDER BY id')),
+        )
+
+    def _on_state(self, state):
+        previous, self._state = self._state, state
+        if previous is None:
+            return
+        revisions, houses = state
+        old_revisions, old_houses = previous
+        house_ids = {house_id for house_id, revision in revisions.items()
+                     if old_revisions.get(house_id) != revision}
+        house_ids.update(old_revisions.keys() - revisions.keys())
+        houses_changed = houses != old_houses
+        if house_ids or houses_changed:
+            self.changed.emit(house_ids, houses_changed)
@@ -1,48 +1,718 @@
 import sqlite3
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from gui.importer import parse_date
+from gui.instrumentation import instrumentation, statement_name
+from gui.query_cache import QueryCache
+
+
+# Prepared statements kept per connection by the sqlite3 module
+STATEMENT_CACHE_SIZE = 256
+
+# How long a statement waits for another connection's lock before
+# failing with "database is locked"
+BUSY_TIMEOUT_MS = 5000
+
+# Page cache per connection, in KiB
+CACHE_SIZE_KIB = 16384
+
+
+
+def _signed_amounts(row, sign):
+    # (income, expenses) SQL for one expenses row, sign '' or '-'
+    income = f"CASE WHEN {row}.type = 'income' THEN {sign}COALESCE({row}.amount, 0) ELSE 0 END"
+    expenses = f"CASE WHEN {row}.type = 'expense' THEN {sign}COALESCE({row}.amount, 0) ELSE 0 END"
+    return income, expenses
+
+
+def _rollup_sql(row, sign):
+    """SQL applying one expenses row (NEW or OLD) to both rollup tables.
+
+    sign is '' to add the row and '-' to take it back out.
+    """
+    income, expenses = _signed_amounts(row, sign)
+    return f'''
+        INSERT INTO house_totals(house_id, income, expenses, row_count)
+            SELECT {row}.house_id, {income}, {expenses}, {sign}1
+            WHERE {row}.house_id IS NOT NULL
+            ON CONFLICT(house_id) DO UPDATE SET
+                income = income + excluded.income,
+                expenses = expenses + excluded.expenses,
+                row_count = row_count + excluded.row_count;
+        INSERT INTO house_category_totals(house_id, category, income, expenses, row_count)
+            SELECT {row}.house_id, COALESCE({row}.category, ''), {income}, {expenses}, {sign}1
+            WHERE {row}.house_id IS NOT NULL
+            ON CONFLICT(house_id, category) DO UPDATE SET
+                income = income + excluded.income,
+                expenses = expenses + excluded.expenses,
+                row_count = row_count + excluded.row_count;
+        DELETE FROM house_totals
+            WHERE house_id = {row}.house_id AND row_count = 0;
+        DELETE FROM house_category_totals
+            WHERE house_id = {row}.house_id
+              AND category = COALESCE({row}.category, '') AND row_count = 0;'''
+
+
+def _month_rollup_sql(row, sign):
+    """SQL applying one expenses row (NEW or OLD) to house_month_totals,
+    keyed by the 'YYYY-MM' prefix of its date; undated rows have no
+    month and are left out."""
+    income, expenses = _signed_amounts(row, sign)
+    return f'''
+        INSERT INTO house_month_totals(house_id, month, income, expenses, row_count)
+            SELECT {row}.house_id, substr({row}.date, 1, 7), {income}, {expenses}, {sign}1
+            WHERE {row}.house_id IS NOT NULL AND {row}.date IS NOT NULL
+            ON CONFLICT(house_id, month) DO UPDATE SET
+                income = income + excluded.income,
+                expenses = expenses + excluded.expenses,
+                row_count = row_count + excluded.row_count;
+        DELETE FROM house_month_totals
+            WHERE house_id = {row}.house_id
+              AND month = substr({row}.date, 1, 7) AND row_count = 0;'''
+
+
+def _revision_sql(row):
+    # Bumps the revision of the house of one expenses row (NEW or OLD)
+    return f'''
+        INSERT INTO house_revisions(house_id, revision)
+            SELECT {row}.house_id, 1 WHERE {row}.house_id IS NOT NULL
+            ON CONFLICT(house_id) DO UPDATE SET revision = revision + 1;'''
+
+
+# Fresh aggregates the rollup tables must match
+HOUSE_TOTALS_SELECT = '''
+    SELECT house_id,
+           COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END), 0),
+           COALESCE(SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END), 0),
+           COUNT(*)
+    FROM expenses WHERE house_id IS NOT NULL
+    GROUP BY house_id'''
+HOUSE_CATEGORY_TOTALS_SELECT = '''
+    SELECT house_id, COALESCE(category, ''),
+           COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END), 0),
+           COALESCE(SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END), 0),
+           COUNT(*)
+    FROM expenses WHERE house_id IS NOT NULL
+    GROUP BY house_id, COALESCE(category, '')'''
+HOUSE_MONTH_TOTALS_SELECT = '''
+    SELECT house_id, substr(date, 1, 7),
+           COALESCE(SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END), 0),
+           COALESCE(SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END), 0),
+           COUNT(*)
+    FROM expenses WHERE house_id IS NOT NULL AND date IS NOT NULL
+    GROUP BY house_id, substr(date, 1, 7)'''
+
+
+# Columns of the expenses table, shared by init_db() and migrations that
+# rebuild it. amount is in integer cents, income positive.
+EXPENSES_COLUMNS_SQL = '''
+    id INTEGER PRIMARY KEY,
+    house_id INTEGER,
+    date TEXT,
+    type TEXT CHECK(type IN ('income', 'expense')),
+    category TEXT,
+    expense TEXT,
+    recipient TEXT,
+    amount INTEGER,
+    payment TEXT,
+    FOREIGN KEY(house_id) REFERENCES houses(id) ON DELETE CASCADE'''
+EXPENSES_FIELDS = ('id, house_id, date, type, category, expense, recipient,'
+                   ' amount, payment')
+
+
+def _rebuild_expenses(db, select=EXPENSES_FIELDS):
+    """Copy expenses into a new table of EXPENSES_COLUMNS_SQL, with
+    select giving each row's columns, and put it in the old one's place.
+
+    SQLite cannot change a column's type or constraints in place, so
+    the table is copied. Its indexes and triggers are recreated from
+    their stored SQL; ids are kept, so the search index stays valid.
+    """
+    schema = db.query_all(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = 'expenses'"
+        " AND type IN ('index', 'trigger') AND sql IS NOT NULL")
+    db.execute(f'CREATE TABLE expenses_new ({EXPENSES_COLUMNS_SQL})')
+    db.execute(f'INSERT INTO expenses_new({EXPENSES_FIELDS})'
+               f' SELECT {select} FROM expenses')
+    db.execute('DROP TABLE expenses')
+    db.execute('ALTER TABLE expenses_new RENAME TO expenses')
+    for (sql,) in schema:
+        db.execute(sql)
+
+
+def _amounts_to_cents(db):
+    """Rebuild expenses and the rollups with INTEGER cents amounts; a
+    REAL column would turn integers back into floats."""
+    _rebuild_expenses(db, '''
+        id, house_id, date, type, category, expense, recipient,
+        CAST(ROUND(amount * 100) AS INTEGER), payment''')
+    db.execute('DROP TABLE house_totals')
+    db.execute('DROP TABLE house_category_totals')
+    db.execute('''CREATE TABLE house_totals (
+        house_id INTEGER PRIMARY KEY,
+        income INTEGER NOT NULL DEFAULT 0,
+        expenses INTEGER NOT NULL DEFAULT 0,
+        row_count INTEGER NOT NULL DEFAULT 0
+    )''')
+    db.execute('''CREATE TABLE house_category_totals (
+        house_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        income INTEGER NOT NULL DEFAULT 0,
+        expenses INTEGER NOT NULL DEFAULT 0,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (house_id, category)
+    )''')
+    db.rebuild_rollups()
+
+
+def _normalize_dates(db):
+    """Rewrite dates that are not already YYYY-MM-DD into that form.
+
+    Values none of the importer's formats understand are left as they
+    were rather than lost; they only show up under "All dates".
+    """
+    fixes = []
+    for (text,) in db.query_all(
+            'SELECT DISTINCT date FROM expenses'
+            " WHERE date IS NOT NULL AND date(date, '+0 days') IS NOT date"):
+        try:
+            fixes.append((parse_date(str(text)), text))
+        except ValueError:
+            pass
+    db.executemany('UPDATE expenses SET date = ? WHERE date = ?', fixes)
+
+
+# Rejects writes of a date SQLite would not read back unchanged; the
+# no-op modifier makes date() roll impossible days like Feb 30 over
+_DATE_CHECK = '''
+    WHEN NEW.date IS NOT NULL AND date(NEW.date, '+0 days') IS NOT NEW.date
+    BEGIN SELECT RAISE(ABORT, 'expenses.date must be YYYY-MM-DD'); END'''
+
+
+# Free-text columns covered by the expenses_fts search index
+SEARCH_COLUMNS = ('expense', 'recipient', 'category', 'payment')
+
+
+def _create_search_index(db):
+    """FTS5 index over SEARCH_COLUMNS, kept in step by triggers.
+
+    It is an external-content table: the text stays in expenses and the
+    index holds only tokens, with 2 and 3 character prefixes indexed so
+    search-as-you-type stays fast. Skipped when the SQLite library was
+    built without FTS5; Ledger.search() then falls back to LIKE.
+    """
+    columns = ', '.join(SEARCH_COLUMNS)
+    try:
+        db.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5('
+            f"{columns}, content='expenses', content_rowid='id',"
+            " tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+    except sqlite3.OperationalError as exc:
+        if 'fts5' not in str(exc):
+            raise
+        return
+    new = ', '.join(f'NEW.{column}' for column in SEARCH_COLUMNS)
+    old = ', '.join(f'OLD.{column}' for column in SEARCH_COLUMNS)
+    insert = f'INSERT INTO expenses_fts(rowid, {columns}) VALUES (NEW.id, {new});'
+    delete = (f'INSERT INTO expenses_fts(expenses_fts, rowid, {columns})'
+              f" VALUES ('delete', OLD.id, {old});")
+    db.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_insert
+        AFTER INSERT ON expenses BEGIN {insert} END''')
+    db.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_delete
+        AFTER DELETE ON expenses BEGIN {delete} END''')
+    db.execute(f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_fts_update
+        AFTER UPDATE OF id, {columns} ON expenses BEGIN {delete} {insert} END''')
+    db.execute("INSERT INTO expenses_fts(expenses_fts) VALUES ('rebuild')")
+
+
+# Schema migrations, applied in order by init_db(). Entry N brings the
+# database to PRAGMA user_version N + 1; each entry is a sequence of SQL
+# statements or callables taking the DBManager. Never edit or reorder
+# released entries, only append new ones.
+MIGRATIONS = [
+    # 1: indexes for per-house detail, summary and category queries
+    (
+        'CREATE INDEX IF NOT EXISTS idx_expenses_house_date'
+        ' ON expenses(house_id, date)',
+        'CREATE INDEX IF NOT EXISTS idx_expenses_house_category'
+        ' ON expenses(house_id, category, type, amount)',
+    ),
+    # 2: per-house and per-house-per-category rollups kept by triggers
+    (
+        '''CREATE TABLE IF NOT EXISTS house_totals (
+            house_id INTEGER PRIMARY KEY,
+            income REAL NOT NULL DEFAULT 0,
+            expenses REAL NOT NULL DEFAULT 0,
+            row_count INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS house_category_totals (
+            house_id INTEGER NOT NULL,
+            category TEXT NOT NULL,
+            income REAL NOT NULL DEFAULT 0,
+            expenses REAL NOT NULL DEFAULT 0,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (house_id, category)
+        )''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_insert
+            AFTER INSERT ON expenses BEGIN {_rollup_sql('NEW', '')}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_delete
+            AFTER DELETE ON expenses BEGIN {_rollup_sql('OLD', '-')}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_update
+            AFTER UPDATE OF house_id, type, category, amount ON expenses
+            BEGIN {_rollup_sql('OLD', '-')} {_rollup_sql('NEW', '')}
+        END''',
+        lambda db: db.rebuild_rollups(),
+    ),
+    # 3: one (house_id, column) index per sortable details column, so
+    # keyset pages seek instead of sorting; id order uses the rowid that
+    # every index ends with
+    (
+        'CREATE INDEX IF NOT EXISTS idx_expenses_house'
+        ' ON expenses(house_id)',
+    ) + tuple(
+        f'CREATE INDEX IF NOT EXISTS idx_expenses_house_{column}'
+        f' ON expenses(house_id, {column})'
+        for column in ('type', 'category', 'expense', 'recipient',
+                       'amount', 'payment')
+    ),
+    # 4: amounts (and their rollups) as integer cents, so sums are exact
+    (_amounts_to_cents,),
+    # 5: ISO dates only, and a covering (house_id, date) index so date
+    # range totals read just the range's index entries
+    (
+        _normalize_dates,
+        f'CREATE TRIGGER IF NOT EXISTS trg_expenses_date_insert'
+        f' BEFORE INSERT ON expenses {_DATE_CHECK}',
+        f'CREATE TRIGGER IF NOT EXISTS trg_expenses_date_update'
+        f' BEFORE UPDATE OF date ON expenses {_DATE_CHECK}',
+        'DROP INDEX IF EXISTS idx_expenses_house_date',
+        'CREATE INDEX IF NOT EXISTS idx_expenses_house_date_totals'
+        ' ON expenses(house_id, date, type, category, amount)',
+    ),
+    # 6: full-text search across every house
+    (_create_search_index,),
+    # 7: per-house monthly rollup for the cash-flow report, kept by its
+    # own triggers
+    (
+        '''CREATE TABLE IF NOT EXISTS house_month_totals (
+            house_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            income INTEGER NOT NULL DEFAULT 0,
+            expenses INTEGER NOT NULL DEFAULT 0,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (house_id, month)
+        )''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_month_insert
+            AFTER INSERT ON expenses BEGIN {_month_rollup_sql('NEW', '')}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_month_delete
+            AFTER DELETE ON expenses BEGIN {_month_rollup_sql('OLD', '-')}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_month_update
+            AFTER UPDATE OF house_id, date, type, amount ON expenses
+            BEGIN {_month_rollup_sql('OLD', '-')} {_month_rollup_sql('NEW', '')}
+        END''',
+        lambda db: db.rebuild_rollups(),
+    ),
+    # 8: a revision per house, bumped by any change to its expenses, so
+    # a window can tell which houses another one changed
+    (
+        '''CREATE TABLE IF NOT EXISTS house_revisions (
+            house_id INTEGER PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 0
+        )''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_revision_insert
+            AFTER INSERT ON expenses BEGIN {_revision_sql('NEW')}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_revision_delete
+            AFTER DELETE ON expenses BEGIN {_revision_sql('OLD')}
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS trg_expenses_revision_update
+            AFTER UPDATE ON expenses
+            BEGIN {_revision_sql('OLD')} {_revision_sql('NEW')}
+        END''',
+    ),
+    # 9: undo/redo journal, see gui.undo_journal: houses and expenses
+    # rows as they were before and after each action
+    (
+        '''CREATE TABLE IF NOT EXISTS undo_actions (
+            id INTEGER PRIMARY KEY,
+            label TEXT NOT NULL,
+            undone INTEGER NOT NULL DEFAULT 0
+        )''',
+        '''CREATE TABLE IF NOT EXISTS undo_houses (
+            action_id INTEGER NOT NULL,
+            phase TEXT NOT NULL CHECK(phase IN ('before', 'after')),
+            id INTEGER NOT NULL,
+            address TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS undo_expenses (
+            action_id INTEGER NOT NULL,
+            phase TEXT NOT NULL CHECK(phase IN ('before', 'after')),
+            id INTEGER NOT NULL,
+            house_id INTEGER,
+            date TEXT,
+            type TEXT,
+            category TEXT,
+            expense TEXT,
+            recipient TEXT,
+            amount INTEGER,
+            payment TEXT
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_undo_houses_action'
+        ' ON undo_houses(action_id, phase, id)',
+        'CREATE INDEX IF NOT EXISTS idx_undo_expenses_action'
+        ' ON undo_expenses(action_id, phase, id)',
+    ),    # 10: a house's expenses are deleted with it (ON DELETE CASCADE),
+    # after dropping those that earlier versions left without a house
+    (
+        'DELETE FROM expenses WHERE house_id IS NOT NULL'
+        ' AND house_id NOT IN (SELECT id FROM houses)',
+        _rebuild_expenses,
+    ),
+]
 
 
 class DBManager:
+    """Owns the SQLite connections for one database file.
+
+    Each thread gets one long-lived connection, opened on first use and
+    reused afterwards, so the GUI thread and any worker threads share a
+    small pool instead of reconnecting per query. Statements run through
+    execute()/executemany() so they are counted and hit the per-connection
+    prepared-statement cache.
+
+    Files are switched to write-ahead logging (WAL) where possible, so
+    readers, in this process or another, neither block nor are blocked
+    by the writer; a writer waits up to BUSY_TIMEOUT_MS for another
+    writer to finish.
+
+    Reads that views repeat, such as totals, can go through
+    query_cached(), which serves them from memory until the data
+    changes: commits made here invalidate the cache directly, and
+    commits by other connections or processes show up as a change of
+    PRAGMA data_version on the reading connection.
+    """
+
     def __init__(self, path):
         self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        # Bumped by rebind() so threads drop connections to the old file
+        self._generation = 0
+        self.connections_opened = 0
+        self.statements_executed = 0
+        # Journal mode of the last connection opened, normally 'wal';
+        # None when it could not be set
+        self.journal_mode = None
+        self.cache = QueryCache()
 
     def init_db(self):
-        conn = sqlite3.connect(self.path)
-        cur = conn.cursor()
-        # Create houses table if missing
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS houses (
-                id INTEGER PRIMARY KEY,
-                address TEXT UNIQUE
-            );''')
-        # Create expenses table if missing
-        cur.execute('''
-            CREATE TABLE IF NOT EXISTS expenses (
-                id INTEGER PRIMARY KEY,
-                house_id INTEGER,
-                date TEXT,
-                type TEXT CHECK(type IN ('income', 'expense')),
-                category TEXT,
-                expense TEXT,
-                recipient TEXT,
-                amount REAL,
-                payment TEXT,
-                FOREIGN KEY(house_id) REFERENCES houses(id)
-            );''')
-        # Migrate existing DB: add missing columns
-        cur.execute("PRAGMA table_info(expenses);")
-        existing = [row[1] for row in cur.fetchall()]
-        if 'type' not in existing:
-            cur.execute('ALTER TABLE expenses ADD COLUMN type TEXT DEFAULT "expense"')
-        if 'category' not in existing:
-            cur.execute('ALTER TABLE expenses ADD COLUMN category TEXT')
-        if 'expense' not in existing:
-            cur.execute('ALTER TABLE expenses ADD COLUMN expense TEXT')
-        if 'recipient' not in existing:
-            cur.execute('ALTER TABLE expenses ADD COLUMN recipient TEXT')
-        if 'payment' not in existing:
-            cur.execute('ALTER TABLE expenses ADD COLUMN payment TEXT')
+        # Base schema and column fixups apply together or not at all
+        with self.transaction():
+            # Create houses table if missing
+            self.execute('''
+                CREATE TABLE IF NOT EXISTS houses (
+                    id INTEGER PRIMARY KEY,
+                    address TEXT UNIQUE
+                );''')
+            # Create expenses table if missing
+            self.execute(
+                f'CREATE TABLE IF NOT EXISTS expenses ({EXPENSES_COLUMNS_SQL})')
+            # Migrate existing DB: add missing columns
+            existing = [row[1] for row in self.query_all("PRAGMA table_info(expenses);")]
+            if 'type' not in existing:
+                self.execute('ALTER TABLE expenses ADD COLUMN type TEXT DEFAULT "expense"')
+            if 'category' not in existing:
+                self.execute('ALTER TABLE expenses ADD COLUMN category TEXT')
+            if 'expense' not in existing:
+                self.execute('ALTER TABLE expenses ADD COLUMN expense TEXT')
+            if 'recipient' not in existing:
+                self.execute('ALTER TABLE expenses ADD COLUMN recipient TEXT')
+            if 'payment' not in existing:
+                self.execute('ALTER TABLE expenses ADD COLUMN payment TEXT')
+        self.migrate()
+
+    def has_table(self, name):
+        return self.query_one(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (name,)) is not None
+
+    def schema_version(self):
+        return self.query_one('PRAGMA user_version')[0]
+
+    def migrate(self):
+        """Apply pending MIGRATIONS, each in its own transaction."""
+        current = self.schema_version()
+        if current == len(MIGRATIONS):
+            return
+        # Rebuilding a table drops and renames it, which foreign key
+        # enforcement would turn into cascades and checks; it can only
+        # be switched outside a transaction
+        conn = self.connection()
+        conn.execute('PRAGMA foreign_keys = OFF')
+        try:
+            for version in range(current + 1, len(MIGRATIONS) + 1):
+                with self.transaction():
+                    for step in MIGRATIONS[version - 1]:
+                        if callable(step):
+                            step(self)
+                        else:
+                            self.execute(step)
+                    self.execute(f'PRAGMA user_version = {version}')
+        finally:
+            conn.execute('PRAGMA foreign_keys = ON')
+
+    # Connections
+
+    def connection(self):
+        """Return the calling thread's connection, opening it if needed."""
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        if conn is None or local.generation != self._generation:
+            conn = self._open()
+            local.conn = conn
+            local.generation = self._generation
+        return conn
+
+    def _open(self):
+        # check_same_thread is off only so rebind()/close() can close
+        # connections of other threads; each is used by its own thread
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            check_same_thread=False
+        )
+        conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KIB}')
+        # Off by default in SQLite; deleting a house cascades to its
+        # expenses, and no expense can point at a missing house
+        conn.execute('PRAGMA foreign_keys = ON')
+        if self._enable_wal(conn):
+            # Commits stay atomic and consistent; a power cut may only
+            # lose the last ones. Without WAL this would risk corruption.
+            conn.execute('PRAGMA synchronous = NORMAL')
+        with self._lock:
+            self._connections.append(conn)
+            self.connections_opened += 1
+        return conn
+
+    def _enable_wal(self, conn):
+        # The journal mode is stored in the file, so this only changes
+        # anything for the first connection to a file in rollback mode
+        try:
+            mode = conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+        except sqlite3.OperationalError:
+            # Read-only file, or another writer kept it locked too long;
+            # it stays in rollback mode, which still works
+            mode = None
+        self.journal_mode = mode
+        return mode == 'wal'
+
+    def rebind(self, path):
+        """Point this manager at another database file."""
+        self.close()
+        self.path = path
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+        self.cache.invalidate()
+
+    # Statements
+
+    def _count(self):
+        with self._lock:
+            self.statements_executed += 1
+
+    def execute(self, sql, params=()):
+        self._count()
+        if not instrumentation.enabled:
+            return self.connection().execute(sql, params)
+        start = perf_counter()
+        cur = self.connection().execute(sql, params)
+        instrumentation.record(
+            'sql', statement_name(sql), perf_counter() - start)
+        return cur
+
+    def executemany(self, sql, seq_of_params):
+        def counted(rows):
+            for row in rows:
+                self._count()
+                yield row
+        return self.connection().executemany(sql, counted(seq_of_params))
+
+    def query_one(self, sql, params=()):
+        if instrumentation.enabled:
+            return self._timed_query(sql, params, one=True)
+        cur = self.execute(sql, params)
+        row = cur.fetchone()
+        # Finish the statement so it does not hold a read lock
+        cur.close()
+        return row
+
+    def query_all(self, sql, params=()):
+        if instrumentation.enabled:
+            return self._timed_query(sql, params, one=False)
+        return self.execute(sql, params).fetchall()
+
+    def _timed_query(self, sql, params, one):
+        # Times execution and fetching together and records the row count
+        self._count()
+        start = perf_counter()
+        cur = self.connection().execute(sql, params)
+        if one:
+            result = cur.fetchone()
+            cur.close()
+            rows = 0 if result is None else 1
+        else:
+            result = cur.fetchall()
+            rows = len(result)
+        instrumentation.record(
+            'sql', statement_name(sql), perf_counter() - start, rows)
+        return result
+
+    def query_cached(self, sql, params=()):
+        """Like query_all(), but from the result cache while the data
+        is unchanged. Returns a tuple of rows; do not hold on to it
+        expecting later changes to show up."""
+        conn = self.connection()
+        if conn.in_transaction:
+            # May see this connection's uncommitted changes
+            return tuple(self.query_all(sql, params))
+        self._check_data_version(conn)
+        key = (sql, tuple(params))
+        rows = self.cache.get(key)
+        if rows is None:
+            generation = self.cache.generation
+            rows = tuple(self.query_all(sql, params))
+            self.cache.put(key, generation, rows)
+        return rows
+
+    def _check_data_version(self, conn):
+        # data_version moves when another connection commits; a
+        # connection's own commits invalidate in commit()/transaction()
+        version = conn.execute('PRAGMA data_version').fetchone()[0]
+        if version != getattr(self._local, 'data_version', None):
+            # Also on a connection's first check, as changes made
+            # before it opened were not seen by anyone
+            self._local.data_version = version
+            self.cache.invalidate()
+
+    def commit(self):
+        self.connection().commit()
+        self.cache.invalidate()
+
+    @contextmanager
+    def transaction(self):
+        """Commit everything run inside the block, or roll it all back.
+
+        Nested blocks join the outermost transaction.
+        """
+        conn = self.connection()
+        if conn.in_transaction:
+            yield self
+            return
+        # Explicit BEGIN so DDL is covered too, not only DML
+        conn.execute('BEGIN')
+        try:
+            yield self
+        except BaseException:
+            conn.rollback()
+            raise
         conn.commit()
-        conn.close()
+        self.cache.invalidate()
+
+    # Rollups
+
+    def rebuild_rollups(self):
+        """Recompute the rollup tables from scratch."""
+        with self.transaction():
+            self.execute('DELETE FROM house_totals')
+            self.execute('DELETE FROM house_category_totals')
+            self.execute(
+                'INSERT INTO house_totals(house_id, income, expenses, row_count)'
+                + HOUSE_TOTALS_SELECT)
+            self.execute(
+                'INSERT INTO house_category_totals'
+                '(house_id, category, income, expenses, row_count)'
+                + HOUSE_CATEGORY_TOTALS_SELECT)
+            # Older migrations rebuild before the monthly rollup exists
+            if self.has_table('house_month_totals'):
+                self.execute('DELETE FROM house_month_totals')
+                self.execute(
+                    'INSERT INTO house_month_totals'
+                    '(house_id, month, income, expenses, row_count)'
+                    + HOUSE_MONTH_TOTALS_SELECT)
+
+    def verify_rollups(self):
+        """Return the ids of houses whose rollup rows are out of date."""
+        rows = self.query_all(f'''
+            WITH fresh(house_id, income, expenses, row_count) AS (
+                    {HOUSE_TOTALS_SELECT}),
+                 stored AS (
+                    SELECT house_id, income, expenses, row_count
+                    FROM house_totals),
+                 fresh_cat(house_id, category, income, expenses, row_count) AS (
+                    {HOUSE_CATEGORY_TOTALS_SELECT}),
+                 stored_cat AS (
+                    SELECT house_id, category, income, expenses, row_count
+                    FROM house_category_totals)
+            SELECT house_id FROM fresh f
+                LEFT JOIN stored s USING (house_id)
+                WHERE s.row_count IS NOT f.row_count
+                   OR s.income IS NOT f.income
+                   OR s.expenses IS NOT f.expenses
+            UNION
+            SELECT house_id FROM stored s
+                WHERE house_id NOT IN (SELECT house_id FROM fresh)
+            UNION
+            SELECT house_id FROM fresh_cat f
+                LEFT JOIN stored_cat s USING (house_id, category)
+                WHERE s.row_count IS NOT f.row_count
+                   OR s.income IS NOT f.income
+                   OR s.expenses IS NOT f.expenses
+            UNION
+            SELECT house_id FROM stored_cat s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM fresh_cat f
+                    WHERE f.house_id = s.house_id AND f.category = s.category)
+        ''')
+        if self.has_table('house_month_totals'):
+            rows += self.query_all(f'''
+                WITH fresh(house_id, month, income, expenses, row_count) AS (
+                        {HOUSE_MONTH_TOTALS_SELECT}),
+                     stored AS (
+                        SELECT house_id, month, income, expenses, row_count
+                        FROM house_month_totals)
+                SELECT house_id FROM fresh f
+                    LEFT JOIN stored s USING (house_id, month)
+                    WHERE s.row_count IS NOT f.row_count
+                       OR s.income IS NOT f.income
+                       OR s.expenses IS NOT f.expenses
+                UNION
+                SELECT house_id FROM stored s
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM fresh f
+                        WHERE f.house_id = s.house_id AND f.month = s.month)
+            ''')
+        return sorted({house_id for (house_id,) in rows})
 
-    def connect(self):
-        return sqlite3.connect(self.path)
+    def stats(self):
+        with self._lock:
+            stats = {
+                'connections_opened': self.connections_opened,
+                'open_connections': len(self._connections),
+                'statements_executed': self.statements_executed,
+                'journal_mode': self.journal_mode,
+            }
+        stats.update(self.cache.stats())
+        return stats
@@ -0,0 +1,108 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QCheckBox, QSpinBox, QLabel,
+    QPushButton, QTableWidget, QTableWidgetItem, QAbstractItemView
+)
+from PySide6.QtCore import Qt
+from gui.instrumentation import instrumentation
+
+
+class DiagnosticsDialog(QDialog):
+    """Shows what the instrumentation recorded and the connection stats.
+
+    Recording is switched on and off here; the window persists the
+    choice. Kinds are 'sql' (one statement, rows fetched), 'query' (a
+    worker task), 'update' (applying its result on the GUI thread),
+    'latency' (submit to screen) and 'ui' (GUI methods).
+    """
+
+    HEADERS = ['Kind', 'Operation', 'Calls', 'Total ms', 'Avg ms', 'Max ms', 'Rows']
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db = db_manager
+        self.setWindowTitle('Diagnostics')
+        self.resize(900, 500)
+        layout = QVBoxLayout(self)
+
+        controls = QHBoxLayout()
+        self.enabled_cb = QCheckBox('Record timings')
+        self.enabled_cb.setChecked(instrumentation.enabled)
+        controls.addWidget(self.enabled_cb)
+        controls.addWidget(QLabel('Log operations slower than'))
+        self.threshold_spin = QSpinBox()
+        self.threshold_spin.setRange(1, 60000)
+        self.threshold_spin.setSuffix(' ms')
+        self.threshold_spin.setValue(instrumentation.slow_ms)
+        controls.addWidget(self.threshold_spin)
+        controls.addStretch()
+        refresh_btn = QPushButton('Refresh')
+        refresh_btn.clicked.connect(self.refresh)
+        controls.addWidget(refresh_btn)
+        reset_btn = QPushButton('Reset')
+        reset_btn.clicked.connect(self._reset)
+        controls.addWidget(reset_btn)
+        layout.addLayout(controls)
+
+        self.connection_label = QLabel()
+        layout.addWidget(self.connection_label)
+        self.log_label = QLabel()
+        self.log_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.log_label)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(1, 420)
+        layout.addWidget(self.table)
+
+        close_btn = QPushButton('Close')
+        close_btn.clicked.connect(self.accept)
+        layout.addWidget(close_btn)
+
+        self.enabled_cb.toggled.connect(self._apply_settings)
+        self.threshold_spin.valueChanged.connect(self._apply_settings)
+        self.refresh()
+
+    def _apply_settings(self):
+        instrumentation.configure(
+            self.enabled_cb.isChecked(), self.threshold_spin.value(),
+            instrumentation.log_path)
+
+    def _reset(self):
+        instrumentation.reset()
+        self.refresh()
+
+    def refresh(self):
+        stats = self.db.stats()
+        self.connection_label.setText(
+            f"Connections: {stats['open_connections']} open, "
+            f"{stats['connections_opened']} opened in total, "
+            f"journal mode {stats['journal_mode'] or 'unknown'}  ·  "
+            f"Statements executed: {stats['statements_executed']:,}  ·  "
+            f"Cache: {stats['cache_hits']:,} hits, {stats['cache_misses']:,} misses, "
+            f"{stats['cache_entries']} entries ({stats['cache_bytes'] / 1024:,.0f} KiB), "
+            f"{stats['cache_evictions']:,} evicted"
+        )
+        self.log_label.setText(
+            f'Slow-operation log: {instrumentation.log_path or "(none)"}')
+
+        rows = instrumentation.snapshot()
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(rows))
+        for row_index, (kind, name, calls, total, longest, count) in enumerate(rows):
+            values = [kind, name, calls, total * 1000, total * 1000 / calls,
+                      longest * 1000, count]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem()
+                if isinstance(value, str):
+                    item.setText(value)
+                else:
+                    # Numbers sort numerically; show ms with one decimal
+                    item.setData(Qt.DisplayRole,
+                                 round(value, 1) if isinstance(value, float) else value)
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row_index, col, item)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(3, Qt.DescendingOrder)
@@ -1,17 +1,17 @@
-import sqlite3
 from PySide6.QtWidgets import (
     QDialog, QFormLayout, QComboBox,
     QDateEdit, QLineEdit, QPushButton, QMessageBox,
     QRadioButton, QButtonGroup, QVBoxLayout, QHBoxLayout
 )
 from PySide6.QtCore import QDate
-from gui.db_utils import DBManager
+from gui.ledger import Transaction
+from gui.money import to_cents
 
 
 class ExpenseFormDialog(QDialog):
-    def __init__(self, db_manager, parent=None):
+    def __init__(self, ledger, parent=None):
         super().__init__(parent)
-        self.db = db_manager
+        self.ledger = ledger
         self.setWindowTitle('Add Transaction')
         self.resize(480, 320)
         layout = QFormLayout(self)
@@ -108,12 +108,7 @@ class ExpenseFormDialog(QDialog):
             self.category_cb.addItems(self.expense_categories)
 
     def _load_addresses(self):
-        conn = self.db.connect()
-        cur = conn.cursor()
-        cur.execute('SELECT address FROM houses')
-        for (addr,) in cur.fetchall():
-            self.address_cb.addItem(addr)
-        conn.close()
+        self.address_cb.addItems(self.ledger.addresses())
 
     def _save(self):
         addr = self.address_cb.currentText().strip()
@@ -123,7 +118,8 @@ class ExpenseFormDialog(QDialog):
         exp = self.expense_edit.text().strip()
         rec = self.recipient_edit.text().strip()
         try:
-            amt = float(self.amount_edit.text().replace('$', '').replace(',', ''))
+            # Exact cents; no float rounding on the way in
+            amt = to_cents(self.amount_edit.text().replace('$', '').replace(',', ''))
             # Make amount negative for expenses
             if trans_type == 'expense':
                 amt = -abs(amt)
@@ -134,19 +130,9 @@ class ExpenseFormDialog(QDialog):
             return
         pay = self.payment_cb.currentText().strip()
 
-        conn = self.db.connect()
-        cur = conn.cursor()
-        # Insert or reuse house
-        cur.execute('INSERT OR IGNORE INTO houses(address) VALUES(?)', (addr,))
-        conn.commit()
-        cur.execute('SELECT id FROM houses WHERE address=?', (addr,))
-        hid = cur.fetchone()[0]
-        # Insert transaction
-        cur.execute(
-            'INSERT INTO expenses(house_id, date, type, category, expense, recipient, amount, payment) VALUES(?,?,?,?,?,?,?,?)',
-            (hid, date, trans_type, category, exp, rec, amt, pay)
-        )
-        conn.commit()
-        conn.close()
+        # House and transaction are saved together or not at all
+        self.ledger.add_transaction(Transaction(
+            addr, date, trans_type, category, exp, rec, amt, pay
+        ))
         QMessageBox.information(self, 'Saved', 'Transaction recorded!')
         self.accept()
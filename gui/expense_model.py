@@ -0,0 +1,490 @@
+import json
+import sys
+from array import array
+from bisect import bisect_left
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from gui.ledger import ALL_DATES
+from gui.money import format_cents
+
+
+# Rows pulled from SQLite per fetchMore() call
+PAGE_SIZE = 256
+
+SELECT_ROWS = (
+    'SELECT id, date, type, category, expense, recipient, amount, payment'
+    ' FROM expenses'
+)
+
+# (header label, expenses column) in display order; computed columns
+# have no expenses column and can be neither filtered nor sorted on
+COLUMNS = [
+    ('ID', 'id'),
+    ('Date', 'date'),
+    ('Type', 'type'),
+    ('Category', 'category'),
+    ('Description', 'expense'),
+    ('Recipient', 'recipient'),
+    ('Amount', 'amount'),
+    ('Payment', 'payment'),
+    ('Balance', None),
+]
+ID_COLUMN = 0
+DATE_COLUMN = 1
+AMOUNT_COLUMN = 6
+BALANCE_COLUMN = 8
+TEXT_COLUMNS = (1, 2, 3, 4, 5, 7)
+# Low-cardinality text columns whose strings are interned to share storage
+INTERNED_COLUMNS = (2, 3, 7)
+
+
+def format_amount(amount):
+    # For display, show positive numbers with + for income
+    return format_cents(amount, sign=True)
+
+
+def format_value(column, value):
+    if value is None:
+        return ''
+    if column == AMOUNT_COLUMN:
+        return format_amount(value)
+    if column == BALANCE_COLUMN:
+        return format_cents(value)
+    return str(value)
+
+
+def is_computed(column):
+    return COLUMNS[column][1] is None
+
+
+def compile_filters(filters):
+    """Turn {column index: allowed raw values} into a WHERE fragment.
+
+    Each column becomes one set-membership test with a single JSON array
+    parameter, so the statement text (and its cached prepared statement)
+    does not depend on how many values are selected.
+    """
+    clauses, params = [], []
+    for column, values in sorted(filters.items()):
+        name = COLUMNS[column][1]
+        values = set(values)
+        test = f'{name} IN (SELECT value FROM json_each(?))'
+        if None in values:
+            values.discard(None)
+            test = f'({test} OR {name} IS NULL)'
+        clauses.append(test)
+        params.append(json.dumps(list(values)))
+    return ' AND '.join(clauses), params
+
+
+def _stored(column, value):
+    # A row's value as the model keeps it; amounts are never None
+    return (value or 0) if column == AMOUNT_COLUMN else value
+
+
+def _where(house_id, filters, date_range=ALL_DATES):
+    sql, params = 'house_id = ?', [house_id]
+    if not date_range.is_all:
+        range_sql, range_params = date_range.sql()
+        sql += ' AND ' + range_sql
+        params += range_params
+    if filters:
+        filter_sql, filter_params = compile_filters(filters)
+        sql += ' AND ' + filter_sql
+        params += filter_params
+    return sql, params
+
+
+class ExpenseTableModel(QAbstractTableModel):
+    """Read-only, lazily paged view of one house's expenses.
+
+    Rows are pulled from SQLite PAGE_SIZE at a time through
+    canFetchMore()/fetchMore(), each page seeking past the sort key of
+    the last loaded row (keyset paging) so deep pages cost the same as
+    the first. They are kept column-wise: ids and amounts (integer
+    cents) in typed arrays, text columns in plain lists. Cells are only formatted
+    in data(), i.e. when the view actually paints them.
+
+    Only rows within the date range are matched, so a year of a long
+    history costs a year's rows. The running total of the matching rows
+    comes from SQL and is then adjusted by deltas. The Balance column is
+    the running total in chronological (date, id) order from the start
+    of the range, whatever the view is sorted by; it is computed for all
+    matching rows up front and looked up by id.
+    """
+
+    def __init__(self, db_manager, parent=None):
+        super().__init__(parent)
+        self.db = db_manager
+        self.house_id = None
+        self._filters = {}
+        # Only rows dated within this range are shown
+        self.date_range = ALL_DATES
+        self._sort_column = ID_COLUMN
+        self._descending = False
+        # column index -> [(value, row count)] for the current house
+        self._value_counts = {}
+        # Bumped whenever _value_counts is dropped
+        self._values_generation = 0
+        # (date sort key, amount) of rows removed since show()
+        self._removed = []
+        self._clear_store()
+
+    def _clear_store(self):
+        self._ids = array('q')
+        self._amounts = array('q')
+        self._text = {col: [] for col in TEXT_COLUMNS}
+        self._loaded = 0
+        self._total_rows = 0
+        # (sort value, id) of the last loaded row, None before the first
+        self._cursor = None
+        # Net in cents of every row matching house and filters, loaded or not
+        self.total_amount = 0
+        # What query_totals() returned for the rows shown
+        self._totals = (0, 0, array('q'), array('q'))
+        # Matching ids in ascending order and each one's balance
+        self._balance_ids = array('q')
+        self._balance_values = array('q')
+
+    def query_totals(self, house_id, filters, date_range=ALL_DATES):
+        """Totals of a house's rows matching filters, for show().
+
+        Returns (row count, amount sum, ids, balances): every matching
+        id in ascending order with its running balance in date order,
+        all in cents.
+        Touches no model state, so it may run on a worker thread.
+        """
+        ids, balances = array('q'), array('q')
+        if house_id is None:
+            return 0, 0, ids, balances
+        where, params = _where(house_id, filters, date_range)
+        total = 0
+        for expense_id, balance, total in self.db.execute(
+                'SELECT id,'
+                ' SUM(COALESCE(amount, 0)) OVER (ORDER BY date, id),'
+                ' SUM(COALESCE(amount, 0)) OVER ()'
+                f' FROM expenses WHERE {where} ORDER BY id',
+                params):
+            ids.append(expense_id)
+            balances.append(balance)
+        return len(ids), total, ids, balances
+
+    def show(self, house_id, filters, totals, invalidate=False,
+             date_range=ALL_DATES):
+        """Reset to house_id's rows matching filters and date_range,
+        given their totals.
+
+        invalidate says the data itself changed, so cached distinct
+        values are dropped even if the house is the same.
+        """
+        if (invalidate or house_id != self.house_id
+                or date_range != self.date_range):
+            self._forget_values()
+        self.house_id = house_id
+        self._filters = {col: set(values) for col, values in filters.items()}
+        self.date_range = date_range
+        self._removed = []
+        self._reset(totals)
+
+    def query_rows(self, ids):
+        """{id: row} of the expenses with ids, e.g. those loaded, for
+        update_rows(). Touches no model state, so it may run on a worker
+        thread."""
+        if not ids:
+            return {}
+        return {row[ID_COLUMN]: row for row in self.db.query_all(
+            f'{SELECT_ROWS} WHERE id IN (SELECT value FROM json_each(?))',
+            [json.dumps(list(ids))])}
+
+    def loaded_ids(self):
+        return list(self._ids)
+
+    def update_rows(self, house_id, filters, date_range, totals, rows):
+        """Like show(), but refresh the loaded rows in place, given
+        query_rows() of loaded_ids(), so the view keeps its place.
+
+        Only possible for the house, filters and range shown, while the
+        same rows match and keep their places; otherwise nothing is
+        changed and False is returned.
+        """
+        filters = {col: set(values) for col, values in filters.items()}
+        if (house_id != self.house_id or filters != self._filters
+                or date_range != self.date_range or len(rows) != self._loaded):
+            return False
+        # The matching ids, less those remove_row() took out since
+        removed = {key[2] for key, _ in self._removed}
+        if totals[2] != array('q', (expense_id for expense_id in self._balance_ids
+                                    if expense_id not in removed)):
+            return False
+        sort = self._sort_column
+        for row, expense_id in enumerate(self._ids):
+            new = rows.get(expense_id)
+            if new is None or (sort != ID_COLUMN
+                               and _stored(sort, new[sort]) != self.value(row, sort)):
+                return False
+        intern = sys.intern
+        changed = []
+        for row, expense_id in enumerate(self._ids):
+            new = rows[expense_id]
+            if (_stored(AMOUNT_COLUMN, new[AMOUNT_COLUMN]) == self._amounts[row]
+                    and all(new[col] == self._text[col][row] for col in TEXT_COLUMNS)):
+                continue
+            changed.append(row)
+            self._amounts[row] = _stored(AMOUNT_COLUMN, new[AMOUNT_COLUMN])
+            for col, values in self._text.items():
+                value = new[col]
+                if col in INTERNED_COLUMNS and isinstance(value, str):
+                    value = intern(value)
+                values[row] = value
+        self._totals = totals
+        self._total_rows, self.total_amount = totals[:2]
+        self._balance_ids, self._balance_values = totals[2:]
+        # The new balances already leave out the removed rows
+        self._removed = []
+        self._forget_values()
+        last = len(COLUMNS) - 1
+        for row in changed:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, last))
+        if self._loaded:
+            # Any change of amount or date moves later balances
+            self.dataChanged.emit(
+                self.index(0, BALANCE_COLUMN),
+                self.index(self._loaded - 1, BALANCE_COLUMN))
+        return True
+
+    def _reset(self, totals):
+        self.beginResetModel()
+        self._clear_store()
+        self._totals = totals
+        self._total_rows, self.total_amount = totals[:2]
+        self._balance_ids, self._balance_values = totals[2:]
+        self.endResetModel()
+
+    def clear(self):
+        """Show no rows, e.g. while another database is opened."""
+        self.show(None, {}, self.query_totals(None, {}), invalidate=True)
+
+    # Distinct values
+
+    def distinct_values(self, column):
+        """Cached [(raw value, row count)] of a column, or None."""
+        return self._value_counts.get(column)
+
+    def values_key(self):
+        """Identifies the data the distinct values are cached for."""
+        return self.house_id, self._values_generation
+
+    def query_distinct_values(self, house_id, column, date_range=ALL_DATES):
+        """[(raw value, row count)] of a column across a house's rows
+        in date_range.
+
+        Filters are ignored so deselected values can be picked again;
+        columns covered by the house indexes are answered from the index
+        alone. Touches no model state, so it may run on a worker thread.
+        """
+        if house_id is None:
+            return []
+        name = COLUMNS[column][1]
+        where, params = _where(house_id, {}, date_range)
+        return self.db.query_all(
+            f'SELECT {name}, COUNT(*) FROM expenses WHERE {where}'
+            f' GROUP BY {name}',
+            params
+        )
+
+    def cache_distinct_values(self, key, column, values):
+        # Results for a house or data that is gone by now are not kept
+        if key == self.values_key():
+            self._value_counts[column] = values
+
+    def _forget_values(self):
+        self._value_counts = {}
+        self._values_generation += 1
+
+    def export_query(self, apply_filters=True):
+        """(header, sql, params) for the house's rows in display order,
+        with raw values and the date-order balance, in dollars. Without
+        apply_filters neither the filters nor the date range apply."""
+        if apply_filters:
+            where, params = _where(self.house_id, self._filters, self.date_range)
+        else:
+            where, params = _where(self.house_id, {})
+        direction = 'DESC' if self._descending else 'ASC'
+        order = COLUMNS[self._sort_column][1]
+        sql = (
+            'SELECT id, date, type, category, expense, recipient,'
+            ' amount / 100.0, payment,'
+            ' SUM(COALESCE(amount, 0)) OVER (ORDER BY date, id) / 100.0'
+            f' FROM expenses WHERE {where}'
+            f' ORDER BY {order} {direction}, id {direction}'
+        )
+        return [label for label, _ in COLUMNS], sql, params
+
+    # Paging
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self._loaded < self._total_rows
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.house_id is None:
+            return
+        direction = 'DESC' if self._descending else 'ASC'
+        order = COLUMNS[self._sort_column][1]
+        where, params = _where(self.house_id, self._filters, self.date_range)
+        rows = []
+        for condition, bound in self._ranges_after_cursor():
+            rows += self.db.query_all(
+                f'{SELECT_ROWS} WHERE {where} AND {condition}'
+                f' ORDER BY {order} {direction}, id {direction} LIMIT ?',
+                params + bound + [PAGE_SIZE - len(rows)]
+            )
+            if len(rows) == PAGE_SIZE:
+                break
+        if not rows:
+            # Table shrank underneath us; stop asking for more
+            self._total_rows = self._loaded
+            return
+        last = rows[-1]
+        self._cursor = (last[self._sort_column], last[ID_COLUMN])
+        first = self._loaded
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._append(rows)
+        self.endInsertRows()
+
+    def _ranges_after_cursor(self):
+        """[(SQL condition, params)] of the rows still to load, in order.
+
+        Comparisons never match NULL, so rows with a NULL sort key are
+        their own range: first when ascending, last when descending
+        (SQLite's NULL ordering). Every range is a seek on one of the
+        (house_id, column) indexes.
+        """
+        name = COLUMNS[self._sort_column][1]
+        op = '<' if self._descending else '>'
+        if self._sort_column == ID_COLUMN:
+            if self._cursor is None:
+                return [('1', [])]
+            return [(f'id {op} ?', [self._cursor[1]])]
+        kinds = ['null', 'value']
+        if self._descending:
+            kinds.reverse()
+        bound = self._cursor
+        if bound is not None:
+            kinds = kinds[kinds.index('null' if bound[0] is None else 'value'):]
+        ranges = []
+        for kind in kinds:
+            if kind == 'null' and bound is None:
+                ranges.append((f'{name} IS NULL', []))
+            elif kind == 'null':
+                ranges.append((f'{name} IS NULL AND id {op} ?', [bound[1]]))
+            elif bound is None:
+                ranges.append((f'{name} IS NOT NULL', []))
+            else:
+                # Rest of the cursor's value group, then later values
+                ranges.append((f'{name} = ? AND id {op} ?', list(bound)))
+                ranges.append((f'{name} {op} ?', [bound[0]]))
+            # Only the range holding the cursor starts part way through
+            bound = None
+        return ranges
+
+    def _append(self, rows):
+        intern = sys.intern
+        first = self._loaded
+        for row in rows:
+            self._ids.append(row[ID_COLUMN])
+            self._amounts.append(row[AMOUNT_COLUMN] or 0)
+            for col, values in self._text.items():
+                value = row[col]
+                if col in INTERNED_COLUMNS and isinstance(value, str):
+                    value = intern(value)
+                values.append(value)
+        self._loaded += len(rows)
+
+    def remove_row(self, row):
+        """Drop a row deleted from the database without reloading."""
+        amount = self._amounts[row]
+        # Every later row in date order loses this amount from its balance
+        self._removed.append((self._date_key(row), amount))
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._ids[row]
+        del self._amounts[row]
+        for values in self._text.values():
+            del values[row]
+        self._loaded -= 1
+        self._total_rows -= 1
+        self.total_amount -= amount
+        self._forget_values()
+        self.endRemoveRows()
+        if self._loaded:
+            self.dataChanged.emit(
+                self.index(0, BALANCE_COLUMN),
+                self.index(self._loaded - 1, BALANCE_COLUMN)
+            )
+
+    def _date_key(self, row):
+        # Python ordering matching SQLite's ORDER BY date, id
+        date = self._text[DATE_COLUMN][row]
+        return date is not None, date or '', self._ids[row]
+
+    def _balance(self, row):
+        expense_id = self._ids[row]
+        balance = self._balance_values[bisect_left(self._balance_ids, expense_id)]
+        if self._removed:
+            key = self._date_key(row)
+            balance -= sum(amount for removed_key, amount in self._removed
+                           if removed_key < key)
+        return balance
+
+    # Raw accessors
+
+    def expense_id(self, row):
+        return self._ids[row]
+
+    def value(self, row, column):
+        if column == ID_COLUMN:
+            return self._ids[row]
+        if column == AMOUNT_COLUMN:
+            return self._amounts[row]
+        if column == BALANCE_COLUMN:
+            return self._balance(row)
+        return self._text[column][row]
+
+    def display_text(self, row, column):
+        return format_value(column, self.value(row, column))
+
+    # QAbstractTableModel interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            return self.display_text(row, col)
+        if role == Qt.TextAlignmentRole and col in (AMOUNT_COLUMN, BALANCE_COLUMN):
+            return Qt.AlignRight
+        if role == Qt.UserRole:
+            return self.value(row, col)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return COLUMNS[section][0]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # Sorting happens in SQL; drop what is loaded and page in again
+        if is_computed(column):
+            return
+        self._sort_column = column
+        self._descending = order == Qt.DescendingOrder
+        # Same rows in another order, so the totals still hold
+        self._reset((self._total_rows, self.total_amount) + self._totals[2:])
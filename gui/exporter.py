@@ -0,0 +1,75 @@
+import csv
+import os
+from contextlib import contextmanager
+
+
+# Rows pulled from the cursor per fetchmany() call
+CHUNK_SIZE = 5000
+
+# Worksheet row limit, header included
+XLSX_MAX_ROWS = 1048576
+
+
+def export_rows(path, header, cursor, progress=None):
+    """Stream header and a cursor's rows to a .csv or .xlsx file.
+
+    Rows are fetched CHUNK_SIZE at a time and written straight out, so
+    memory use does not grow with the result set. progress(rows so far)
+    is called after each chunk. Returns the number of rows written.
+    """
+    opener = _xlsx_writer if path.lower().endswith('.xlsx') else _csv_writer
+    count = 0
+    try:
+        with opener(path) as write:
+            write([header])
+            while True:
+                rows = cursor.fetchmany(CHUNK_SIZE)
+                if not rows:
+                    break
+                write(rows)
+                count += len(rows)
+                if progress is not None:
+                    progress(count)
+    except BaseException:
+        # Never leave a truncated file behind
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        cursor.close()
+    return count
+
+
+@contextmanager
+def _csv_writer(path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        yield csv.writer(f).writerows
+
+
+@contextmanager
+def _xlsx_writer(path):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ValueError(
+            'Exporting to .xlsx needs the openpyxl package; export to .csv '
+            'or install openpyxl.'
+        ) from None
+    # Write-only workbooks stream rows to disk instead of keeping cells
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    written = 0
+
+    def write(rows):
+        nonlocal written
+        written += len(rows)
+        if written > XLSX_MAX_ROWS:
+            raise ValueError(
+                f'More than {XLSX_MAX_ROWS - 1:,} rows do not fit in an '
+                '.xlsx sheet; export to .csv instead.'
+            )
+        for row in rows:
+            sheet.append(row)
+
+    yield write
+    workbook.save(path)
@@ -1,48 +1,78 @@
 from PySide6.QtWidgets import (
-    QDialog, QVBoxLayout, QCheckBox, QPushButton,
-    QScrollArea, QWidget, QLabel, QHBoxLayout
+    QDialog, QVBoxLayout, QPushButton, QListView,
+    QLineEdit, QLabel, QHBoxLayout
+)
+from PySide6.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel
 )
-from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon
 
 
+# Role the search box matches against (the bare label, without the count)
+LABEL_ROLE = Qt.UserRole
+
+
+class FilterValueModel(QAbstractListModel):
+    """Checkable list of a column's distinct values.
+
+    Check states live in one bytearray instead of a widget per value, and
+    the list view only paints the rows on screen, so columns with many
+    thousands of distinct values open instantly.
+    """
+
+    def __init__(self, values, selected=None, parent=None):
+        super().__init__(parent)
+        values = sorted(values, key=lambda v: v[1].lower())
+        self.values = [value for value, _, _ in values]
+        self.labels = [label or '(Blank)' for _, label, _ in values]
+        self.counts = [count for _, _, count in values]
+        self.checked = bytearray(
+            1 if selected is None or value in selected else 0
+            for value in self.values
+        )
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.values)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.DisplayRole:
+            return f'{self.labels[row]}  ({self.counts[row]:,})'
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if self.checked[row] else Qt.Unchecked
+        if role == LABEL_ROLE:
+            return self.labels[row]
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        self.checked[index.row()] = Qt.CheckState(value) == Qt.Checked
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def set_rows_checked(self, rows, checked):
+        for row in rows:
+            self.checked[row] = checked
+        if self.values:
+            self.dataChanged.emit(
+                self.index(0), self.index(len(self.values) - 1),
+                [Qt.CheckStateRole]
+            )
+
+
 class FilterDialog(QDialog):
-    def __init__(self, column_name, unique_values, parent=None):
+    def __init__(self, column_name, unique_values, parent=None, selected=None):
+        # unique_values holds (raw value, label, row count) tuples;
+        # selected is the set of values to pre-check (all when None)
         super().__init__(parent)
         self.setWindowTitle(f'Filter by {column_name}')
         self.resize(300, 400)
-        self.setStyleSheet("""
-            QDialog {
-                background-color: #2d2d2d;
-                color: white;
-            }
-            QCheckBox {
-                color: white;
-                padding: 4px;
-            }
-            QCheckBox:hover {
-                background-color: #3d3d3d;
-            }
-            QPushButton {
-                padding: 6px 12px;
-                border: 1px solid #1a1a1a;
-                border-radius: 3px;
-                background: #2d2d2d;
-                color: white;
-            }
-            QPushButton:hover {
-                background: #3d3d3d;
-            }
-            QPushButton:pressed {
-                background: #1a1a1a;
-            }
-            QLabel#filterIcon {
-                color: #ffffff;
-                font-size: 16px;
-                font-weight: bold;
-            }
-        """)
-
         layout = QVBoxLayout(self)
 
         # Add filter icon and label
@@ -52,50 +82,30 @@ class FilterDialog(QDialog):
         header_layout.addWidget(filter_icon)
 
         search_label = QLabel(f"Filter by {column_name}:")
-        search_label.setStyleSheet("color: white; font-weight: bold;")
+        search_label.setObjectName("dialogTitle")
         header_layout.addWidget(search_label)
         header_layout.addStretch()
 
         layout.addLayout(header_layout)
 
-        # Create scroll area for checkboxes
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setStyleSheet("""
-            QScrollArea {
-                border: none;
-            }
-            QScrollBar:vertical {
-                border: none;
-                background: #2d2d2d;
-                width: 10px;
-                margin: 0px;
-            }
-            QScrollBar::handle:vertical {
-                background: #3d3d3d;
-                min-height: 20px;
-                border-radius: 5px;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-        """)
-
-        # Create widget to hold checkboxes
-        checkbox_widget = QWidget()
-        checkbox_layout = QVBoxLayout(checkbox_widget)
-        checkbox_layout.setSpacing(2)
-
-        # Create checkboxes for each unique value
-        self.checkboxes = {}
-        for value in sorted(unique_values, key=str.lower):
-            cb = QCheckBox(str(value))
-            cb.setChecked(True)
-            self.checkboxes[value] = cb
-            checkbox_layout.addWidget(cb)
-
-        scroll.setWidget(checkbox_widget)
-        layout.addWidget(scroll)
+        # Type-to-search box narrowing the value list
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText('Search values')
+        self.search_edit.setClearButtonEnabled(True)
+        layout.addWidget(self.search_edit)
+
+        # Virtualized list of checkable values
+        self.value_model = FilterValueModel(unique_values, selected, self)
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(self.value_model)
+        self.proxy.setFilterRole(LABEL_ROLE)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.search_edit.textChanged.connect(self.proxy.setFilterFixedString)
+
+        self.list_view = QListView()
+        self.list_view.setModel(self.proxy)
+        self.list_view.setUniformItemSizes(True)
+        layout.addWidget(self.list_view)
 
         # Add buttons
         button_layout = QHBoxLayout()
@@ -118,8 +128,14 @@ class FilterDialog(QDialog):
         layout.addLayout(button_layout)
 
     def _toggle_all(self, checked):
-        for cb in self.checkboxes.values():
-            cb.setChecked(checked)
+        # Only the values matching the current search are affected
+        rows = (
+            self.proxy.mapToSource(self.proxy.index(row, 0)).row()
+            for row in range(self.proxy.rowCount())
+        )
+        self.value_model.set_rows_checked(rows, checked)
 
     def get_selected_values(self):
-        return [value for value, cb in self.checkboxes.items() if cb.isChecked()]
+        model = self.value_model
+        return [value for value, checked in zip(model.values, model.checked)
+                if checked]
@@ -0,0 +1,234 @@
+import csv
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from gui.money import to_cents
+
+
+# Rows handed to one executemany() call
+BATCH_SIZE = 5000
+
+# Normalized CSV header -> expenses field
+CSV_FIELDS = {
+    'address': 'address',
+    'property': 'address',
+    'house': 'address',
+    'date': 'date',
+    'posted': 'date',
+    'posting date': 'date',
+    'transaction date': 'date',
+    'type': 'type',
+    'category': 'category',
+    'description': 'expense',
+    'expense': 'expense',
+    'memo': 'expense',
+    'recipient': 'recipient',
+    'payee': 'recipient',
+    'name': 'recipient',
+    'amount': 'amount',
+    'payment': 'payment',
+    'payment method': 'payment',
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%m/%d/%y', '%Y%m%d', '%d.%m.%Y')
+
+# OFX TRNTYPE -> payment method used by the expense form
+OFX_PAYMENTS = {
+    'CHECK': 'Check',
+    'CASH': 'Cash',
+    'ATM': 'Cash',
+    'XFER': 'Bank Transfer',
+    'DIRECTDEP': 'Bank Transfer',
+    'DIRECTDEBIT': 'Bank Transfer',
+    'PAYMENT': 'Bank Transfer',
+    'POS': 'Credit Card',
+}
+
+OFX_TAG = re.compile(r'<(/?)([A-Z0-9.]+)>([^<\r\n]*)', re.IGNORECASE)
+
+INSERT_EXPENSE = (
+    'INSERT INTO expenses(house_id, date, type, category, expense,'
+    ' recipient, amount, payment) VALUES(?,?,?,?,?,?,?,?)'
+)
+
+
+class ImportCancelled(Exception):
+    """Raised by a progress callback to abandon an import."""
+
+
+def parse_amount(text):
+    """'$1,234.50', '-12', '(12.00)' -> integer cents."""
+    text = text.strip().replace('$', '').replace(',', '')
+    if text.startswith('(') and text.endswith(')'):
+        text = '-' + text[1:-1]
+    return to_cents(text)
+
+
+# Statements repeat the same few hundred dates; strptime is the slow part
+@lru_cache(maxsize=4096)
+def parse_date(text):
+    """Any of DATE_FORMATS (or an OFX timestamp) -> 'yyyy-MM-dd'."""
+    text = text.strip()
+    if len(text) > 8 and text[:8].isdigit():
+        # OFX: YYYYMMDDHHMMSS[.XXX][TZ]
+        text = text[:8]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    raise ValueError(f'unrecognised date {text!r}')
+
+
+def make_record(address, date, amount, type_=None, category=None,
+                expense=None, recipient=None, payment=None):
+    """One (address, date, type, category, expense, recipient, amount,
+    payment) tuple, signed the way the expense form stores it."""
+    type_ = (type_ or '').strip().lower()
+    if type_ not in ('income', 'expense'):
+        type_ = 'income' if amount > 0 else 'expense'
+    # Expenses are stored negative, income positive
+    amount = abs(amount) if type_ == 'income' else -abs(amount)
+    return (address, date, type_, category or None, expense or None,
+            recipient or None, amount, payment or None)
+
+
+def read_csv(path, address=None):
+    """Yield records from a CSV file with a header row.
+
+    Headers are matched case-insensitively against CSV_FIELDS. Files
+    without an address column need address; a type column is optional,
+    the amount's sign decides otherwise.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        fields = [CSV_FIELDS.get(name.strip().lower()) for name in header]
+        for required in ('date', 'amount'):
+            if required not in fields:
+                raise ValueError(f'{path}: no {required} column')
+        if 'address' not in fields and not address:
+            raise ValueError(f'{path}: no address column and no address given')
+        for line_no, row in enumerate(reader, start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            values = {field: cell.strip()
+                      for field, cell in zip(fields, row) if field}
+            try:
+                yield make_record(
+                    values.get('address') or address,
+                    parse_date(values['date']),
+                    parse_amount(values['amount']),
+                    values.get('type'), values.get('category'),
+                    values.get('expense'), values.get('recipient'),
+                    values.get('payment')
+                )
+            except (KeyError, ValueError) as exc:
+                raise ValueError(f'{path}, line {line_no}: {exc}') from None
+
+
+def read_ofx(path, address):
+    """Yield records for the STMTTRN entries of an OFX statement.
+
+    Handles both SGML (OFX 1.x, unclosed tags) and XML (OFX 2.x) files,
+    reading line by line.
+    """
+    if not address:
+        raise ValueError(f'{path}: OFX statements need an address')
+    transaction = None
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            for closing, tag, value in OFX_TAG.findall(line):
+                tag = tag.upper()
+                if tag == 'STMTTRN':
+                    if not closing:
+                        transaction = {}
+                    elif transaction is not None:
+                        yield _ofx_record(path, address, transaction)
+                        transaction = None
+                elif transaction is not None and not closing and value.strip():
+                    transaction[tag] = value.strip()
+
+
+def _ofx_record(path, address, transaction):
+    try:
+        return make_record(
+            address,
+            parse_date(transaction['DTPOSTED']),
+            parse_amount(transaction['TRNAMT']),
+            expense=transaction.get('MEMO'),
+            recipient=transaction.get('NAME') or transaction.get('PAYEE'),
+            payment=OFX_PAYMENTS.get(transaction.get('TRNTYPE', '').upper())
+        )
+    except (KeyError, ValueError) as exc:
+        raise ValueError(
+            f'{path}: transaction {transaction.get("FITID", "?")}: {exc}'
+        ) from None
+
+
+def needs_address(path):
+    """Whether a statement file carries no addresses of its own."""
+    if os.path.splitext(path)[1].lower() in ('.ofx', '.qfx'):
+        return True
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        header = next(csv.reader(f), [])
+    return 'address' not in (
+        CSV_FIELDS.get(name.strip().lower()) for name in header)
+
+
+def read_statement(path, address=None):
+    """Yield records from a CSV or OFX/QFX file, picked by extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.ofx', '.qfx'):
+        return read_ofx(path, address)
+    return read_csv(path, address)
+
+
+def import_records(db, records, progress=None, batch_size=BATCH_SIZE):
+    """Insert records into the database in one transaction.
+
+    Addresses are resolved to house ids through an in-memory map,
+    creating houses as they first appear; expenses go in through one
+    executemany() per batch. progress(rows so far) is called after each
+    batch and may raise ImportCancelled, which rolls everything back.
+    Returns the number of rows imported.
+    """
+    count = 0
+    with db.transaction():
+        house_ids = {address: house_id for house_id, address
+                     in db.query_all('SELECT id, address FROM houses')}
+        batch = []
+        for record in records:
+            address = record[0]
+            house_id = house_ids.get(address)
+            if house_id is None:
+                house_id = db.execute(
+                    'INSERT INTO houses(address) VALUES(?)', (address,)
+                ).lastrowid
+                house_ids[address] = house_id
+            batch.append((house_id,) + record[1:])
+            if len(batch) >= batch_size:
+                count += _flush(db, batch, progress, count)
+        count += _flush(db, batch, progress, count)
+    return count
+
+
+def _flush(db, batch, progress, done):
+    if batch:
+        db.executemany(INSERT_EXPENSE, batch)
+    flushed = len(batch)
+    batch.clear()
+    if progress is not None:
+        progress(done + flushed)
+    return flushed
+
+
+def import_files(db, paths, address=None, progress=None):
+    """Import several statement files as a single transaction."""
+    def records():
+        for path in paths:
+            yield from read_statement(path, address)
+    return import_records(db, records(), progress)
@@ -0,0 +1,111 @@
+import functools
+import logging
+import logging.handlers
+import re
+import threading
+from time import perf_counter
+
+
+# Operations at least this slow are written to the slow-operation log
+DEFAULT_SLOW_MS = 200
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+
+logger = logging.getLogger('realestate.slow')
+
+
+class OperationStats:
+    __slots__ = ('calls', 'total', 'max', 'rows')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+
+class Instrumentation:
+    """Opt-in timing of SQL statements, worker queries and UI updates.
+
+    Disabled by default, in which case the only cost at each hook is
+    one attribute check. When enabled it keeps call count, total and
+    max wall time and rows returned per (kind, name), and logs every
+    operation slower than slow_ms to a rotating log file.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_ms = DEFAULT_SLOW_MS
+        self.log_path = None
+        self._handler = None
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def configure(self, enabled, slow_ms=DEFAULT_SLOW_MS, log_path=None):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        if log_path != self.log_path:
+            if self._handler is not None:
+                logger.removeHandler(self._handler)
+                self._handler.close()
+                self._handler = None
+            if log_path:
+                self._handler = logging.handlers.RotatingFileHandler(
+                    log_path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                    encoding='utf-8', delay=True)
+                self._handler.setFormatter(logging.Formatter(
+                    '%(asctime)s %(threadName)s %(message)s'))
+                logger.addHandler(self._handler)
+                logger.setLevel(logging.INFO)
+            self.log_path = log_path
+
+    def record(self, kind, name, seconds, rows=None):
+        with self._lock:
+            stats = self._stats.get((kind, name))
+            if stats is None:
+                stats = self._stats[(kind, name)] = OperationStats()
+            stats.calls += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            if rows is not None:
+                stats.rows += rows
+        if seconds * 1000 >= self.slow_ms:
+            logger.info('%s %.1f ms%s %s', kind, seconds * 1000,
+                        '' if rows is None else f' {rows} rows', name)
+
+    def snapshot(self):
+        """[(kind, name, calls, total s, max s, rows)], slowest total first."""
+        with self._lock:
+            rows = [(kind, name, s.calls, s.total, s.max, s.rows)
+                    for (kind, name), s in self._stats.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+
+# Shared by DBManager, QueryExecutor and the windows
+instrumentation = Instrumentation()
+
+
+@functools.lru_cache(maxsize=512)
+def statement_name(sql):
+    """One-line, length-capped form of a statement for stats and logs."""
+    return re.sub(r'\s+', ' ', sql).strip()[:160]
+
+
+def timed(name):
+    """Decorator recording each call of a GUI method as a 'ui' operation."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.enabled:
+                return fn(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                instrumentation.record('ui', name, perf_counter() - start)
+        return wrapper
+    return decorate
@@ -0,0 +1,395 @@
+import calendar
+import re
+from typing import NamedTuple, Optional
+from gui.undo_journal import AFTER, BEFORE, UndoJournal
+
+
+# Most search results returned at once
+SEARCH_LIMIT = 200
+# Searched by the LIKE fallback when SQLite has no FTS5
+_SEARCH_COLUMNS = ('e.expense', 'e.recipient', 'e.category', 'e.payment')
+
+
+class HouseSummary(NamedTuple):
+    address: str
+    # Cents
+    income: int
+    # Negative, as stored
+    expenses: int
+
+    @property
+    def net(self):
+        return self.income + self.expenses
+
+
+class CategoryTotal(NamedTuple):
+    category: str
+    # Cents
+    income: int
+    # Negative, as stored
+    expenses: int
+
+    @property
+    def net(self):
+        return self.income + self.expenses
+
+
+class Transaction(NamedTuple):
+    address: str
+    date: str
+    type: str
+    category: Optional[str]
+    expense: Optional[str]
+    recipient: Optional[str]
+    # Cents, negative for expenses
+    amount: int
+    payment: Optional[str]
+
+
+class SearchResult(NamedTuple):
+    id: int
+    address: str
+    date: Optional[str]
+    category: Optional[str]
+    expense: Optional[str]
+    recipient: Optional[str]
+    # Cents
+    amount: Optional[int]
+    payment: Optional[str]
+
+
+class CashFlow(NamedTuple):
+    """Monthly income and expenses per house, pivoted for display."""
+    # Every 'YYYY-MM' from the first month with a transaction to the
+    # last, so gaps show up as empty months
+    months: list
+    # Houses with transactions in those months, in creation order
+    addresses: list
+    # (address, month) -> (income, expenses) in cents, expenses negative
+    cells: dict
+
+    def month_totals(self):
+        """[(income, expenses)] of all houses together, one per month."""
+        totals = {month: [0, 0] for month in self.months}
+        for (_, month), (income, expenses) in self.cells.items():
+            total = totals[month]
+            total[0] += income
+            total[1] += expenses
+        return [tuple(totals[month]) for month in self.months]
+
+
+def _month_span(first, last):
+    # Every 'YYYY-MM' from first to last inclusive
+    year, month = int(first[:4]), int(first[5:7])
+    months = []
+    while True:
+        key = f'{year:04d}-{month:02d}'
+        months.append(key)
+        if key >= last:
+            return months
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class DateRange(NamedTuple):
+    """Inclusive range of ISO dates; None leaves that end open."""
+    start: Optional[str] = None
+    end: Optional[str] = None
+
+    @classmethod
+    def year(cls, year):
+        return cls(f'{year:04d}-01-01', f'{year:04d}-12-31')
+
+    @classmethod
+    def month(cls, year, month):
+        last = calendar.monthrange(year, month)[1]
+        return cls(f'{year:04d}-{month:02d}-01', f'{year:04d}-{month:02d}-{last:02d}')
+
+    @property
+    def is_all(self):
+        return self.start is None and self.end is None
+
+    def sql(self, column='date'):
+        """(condition, params) keeping column within the range; a
+        bounded range also leaves out rows without a date."""
+        clauses, params = [], []
+        if self.start is not None:
+            clauses.append(f'{column} >= ?')
+            params.append(self.start)
+        if self.end is not None:
+            clauses.append(f'{column} <= ?')
+            params.append(self.end)
+        return ' AND '.join(clauses) or '1', params
+
+
+ALL_DATES = DateRange()
+
+
+def house_totals_sql(date_range, schema='main'):
+    """(sql, params) of (id, address, income, expenses) per house of
+    the schema's file in creation order. All time comes from the
+    rollup, a range from the (house_id, date) index."""
+    if date_range.is_all:
+        return f'''
+            SELECT h.id, h.address,
+                   COALESCE(t.income, 0),
+                   COALESCE(t.expenses, 0)
+            FROM {schema}.houses h
+            LEFT JOIN {schema}.house_totals t ON h.id = t.house_id
+            ORDER BY h.id
+        ''', []
+    condition, params = date_range.sql('e.date')
+    return f'''
+        SELECT h.id, h.address,
+               COALESCE(SUM(CASE WHEN e.type = 'income' THEN e.amount END), 0),
+               COALESCE(SUM(CASE WHEN e.type = 'expense' THEN e.amount END), 0)
+        FROM {schema}.houses h
+        LEFT JOIN {schema}.expenses e ON e.house_id = h.id AND {condition}
+        GROUP BY h.id
+        ORDER BY h.id
+    ''', params
+
+
+def category_totals_sql(address, date_range, schema='main'):
+    """(sql, params) of (category, income, expenses) by category
+    name, of one house or, with address None, of every house in the
+    schema's file."""
+    if address is None:
+        house, params = '1', []
+    else:
+        house, params = 'h.address = ?', [address]
+    if date_range.is_all:
+        return f'''
+            SELECT c.category, SUM(c.income), SUM(c.expenses)
+            FROM {schema}.houses h
+            JOIN {schema}.house_category_totals c ON h.id = c.house_id
+            WHERE {house}
+            GROUP BY c.category
+            ORDER BY c.category
+        ''', params
+    condition, range_params = date_range.sql('e.date')
+    return f'''
+        SELECT COALESCE(e.category, '') AS category,
+               COALESCE(SUM(CASE WHEN e.type = 'income' THEN e.amount END), 0),
+               COALESCE(SUM(CASE WHEN e.type = 'expense' THEN e.amount END), 0)
+        FROM {schema}.houses h
+        JOIN {schema}.expenses e ON e.house_id = h.id
+        WHERE {house} AND {condition}
+        GROUP BY COALESCE(e.category, '')
+        ORDER BY category
+    ''', params + range_params
+
+
+class Ledger:
+    """Houses, transactions and their totals, without any Qt.
+
+    The GUI, the command-line tools and benchmarks all go through this
+    class, so each operation is one method with one definition of its
+    SQL. Every write runs in a single DBManager transaction, which also
+    journals it for undo() and redo(). Methods only use the calling
+    thread's connection, so they are safe to call from worker threads. The reads views repeat (addresses and totals)
+    come from DBManager's result cache while the data is unchanged.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.journal = UndoJournal(db)
+
+    # Houses
+
+    def addresses(self):
+        return [address for (address,) in self.db.query_cached(
+            'SELECT address FROM houses ORDER BY id')]
+
+    def house_id(self, address):
+        row = self.db.query_one(
+            'SELECT id FROM houses WHERE address = ?', (address,))
+        return row[0] if row else None
+
+    def add_house(self, address):
+        """Return the id of the house at address, creating it if needed."""
+        with self.db.transaction():
+            self.db.execute(
+                'INSERT OR IGNORE INTO houses(address) VALUES(?)', (address,))
+            return self.house_id(address)
+
+    def rename_house(self, address, new_address):
+        """Raises sqlite3.IntegrityError if new_address is taken."""
+        with self.db.transaction():
+            house_id = self.house_id(address)
+            if house_id is None:
+                return
+            action = self.journal.begin('Rename House')
+            self.journal.record_houses(action, BEFORE, 'id = ?', (house_id,))
+            self.db.execute(
+                'UPDATE houses SET address = ? WHERE id = ?',
+                (new_address, house_id)
+            )
+            self.journal.record_houses(action, AFTER, 'id = ?', (house_id,))
+
+    def delete_house(self, address):
+        """Delete a house and its transactions; return whether there was
+        such a house."""
+        with self.db.transaction():
+            house_id = self.house_id(address)
+            if house_id is None:
+                return False
+            action = self.journal.begin('Delete House')
+            self.journal.record_houses(action, BEFORE, 'id = ?', (house_id,))
+            self.journal.record_expenses(
+                action, BEFORE, 'house_id = ?', (house_id,))
+            # Its expenses go with it (ON DELETE CASCADE)
+            self.db.execute('DELETE FROM houses WHERE id = ?', (house_id,))
+        return True
+
+    # Transactions
+
+    def add_transaction(self, transaction):
+        """Record a Transaction, creating its house if needed; return
+        the new expense id."""
+        with self.db.transaction():
+            action = self.journal.begin('Add Transaction')
+            house_id = self.house_id(transaction.address)
+            if house_id is None:
+                house_id = self.add_house(transaction.address)
+                self.journal.record_houses(action, AFTER, 'id = ?', (house_id,))
+            expense_id = self.db.execute(
+                'INSERT INTO expenses(house_id, date, type, category, expense,'
+                ' recipient, amount, payment) VALUES(?,?,?,?,?,?,?,?)',
+                (house_id,) + tuple(transaction[1:])
+            ).lastrowid
+            self.journal.record_expenses(action, AFTER, 'id = ?', (expense_id,))
+            return expense_id
+
+    def delete_transaction(self, expense_id):
+        """Delete one expense; return whether there was such an expense."""
+        with self.db.transaction():
+            if self.db.query_one(
+                    'SELECT 1 FROM expenses WHERE id = ?', (expense_id,)) is None:
+                return False
+            action = self.journal.begin('Delete Transaction')
+            self.journal.record_expenses(action, BEFORE, 'id = ?', (expense_id,))
+            self.db.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
+        return True
+
+    # Undo. The journal is kept in the file, so the history outlives
+    # the session
+
+    def undo(self):
+        """Undo the latest action; return its JournalEntry, or None if
+        there is nothing to undo."""
+        return self.journal.undo()
+
+    def redo(self):
+        """Redo the action undone last; return its JournalEntry, or
+        None if there is nothing to redo."""
+        return self.journal.redo()
+
+    # Totals. All-time totals are read from the trigger-maintained rollup
+    # tables; a date range is summed from that range's rows only
+
+    def date_bounds(self):
+        """(first, last) ISO date of any transaction, or (None, None)."""
+        # One index seek per house instead of a scan of every row
+        return tuple(self.db.query_cached('''
+            SELECT MIN((SELECT MIN(date) FROM expenses WHERE house_id = h.id)),
+                   MAX((SELECT MAX(date) FROM expenses WHERE house_id = h.id))
+            FROM houses h
+        ''')[0])
+
+    def house_summaries(self, date_range=ALL_DATES):
+        """[HouseSummary] for every house, in creation order."""
+        return [HouseSummary._make(row[1:]) for row in
+                self.db.query_cached(*house_totals_sql(date_range))]
+
+    def category_totals(self, address, date_range=ALL_DATES):
+        """[CategoryTotal] of one house, by category name."""
+        return [CategoryTotal._make(row) for row in
+                self.db.query_cached(*category_totals_sql(address, date_range))]
+
+    def cash_flow(self, date_range=ALL_DATES):
+        """CashFlow of every house by month, within date_range.
+
+        Read in one query from the trigger-maintained monthly rollup, so
+        the cost grows with houses times months, not with transactions.
+        Months of dates that are not ISO are left out.
+        """
+        clauses = ["m.month GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]'"]
+        params = []
+        # Ranges are whole months or years, so comparing months is exact
+        if date_range.start is not None:
+            clauses.append('m.month >= ?')
+            params.append(date_range.start[:7])
+        if date_range.end is not None:
+            clauses.append('m.month <= ?')
+            params.append(date_range.end[:7])
+        rows = self.db.query_cached(f'''
+            SELECT h.address, m.month, m.income, m.expenses
+            FROM house_month_totals m
+            JOIN houses h ON h.id = m.house_id
+            WHERE {' AND '.join(clauses)}
+            ORDER BY h.id, m.month
+        ''', params)
+        if not rows:
+            return CashFlow([], [], {})
+        addresses = list(dict.fromkeys(address for address, _, _, _ in rows))
+        cells = {(address, month): (income, expenses)
+                 for address, month, income, expenses in rows}
+        months = sorted({month for _, month, _, _ in rows})
+        return CashFlow(_month_span(months[0], months[-1]), addresses, cells)
+
+    # Search
+
+    def search(self, text, date_range=ALL_DATES, limit=SEARCH_LIMIT):
+        """[SearchResult] of transactions in any house, newest first.
+
+        A transaction matches when, for every word of text, one of its
+        description, recipient, category or payment has a word starting
+        with it, so 'plum 2nd' finds "2nd floor plumbing".
+        """
+        words = re.findall(r'\w+', text)
+        if not words:
+            return []
+        condition, params = date_range.sql('e.date')
+        if self.db.has_table('expenses_fts'):
+            # Each word quoted, so FTS5 syntax in the text is just text
+            match = ' '.join('"{}"*'.format(word.replace('"', '""'))
+                             for word in words)
+            source = 'expenses_fts f JOIN expenses e ON e.id = f.rowid'
+            where = 'expenses_fts MATCH ?'
+            params = [match] + params
+        else:
+            source = 'expenses e'
+            where = ' AND '.join(
+                '(' + ' OR '.join(f'{column} LIKE ?' for column in _SEARCH_COLUMNS) + ')'
+                for _ in words)
+            params = [f'%{word}%' for word in words
+                      for _ in _SEARCH_COLUMNS] + params
+        return [SearchResult._make(row) for row in self.db.query_all(f'''
+            SELECT e.id, h.address, e.date, e.category, e.expense,
+                   e.recipient, e.amount, e.payment
+            FROM {source}
+            JOIN houses h ON h.id = e.house_id
+            WHERE {where} AND {condition}
+            ORDER BY e.date DESC, e.id DESC
+            LIMIT ?
+        ''', params + [limit])]
+
+    # Cursors for streaming exports: (header, open cursor), in dollars
+
+    def summary_cursor(self, date_range=ALL_DATES):
+        sql, params = house_totals_sql(date_range)
+        return ['Address', 'Income', 'Expenses', 'Net'], self.db.execute(f'''
+            WITH totals(id, address, income, expenses) AS ({sql})
+            SELECT address, income / 100.0, expenses / 100.0,
+                   (income + expenses) / 100.0
+            FROM totals
+        ''', params)
+
+    def category_cursor(self, address, date_range=ALL_DATES):
+        sql, params = category_totals_sql(address, date_range)
+        return ['Category', 'Income', 'Expenses', 'Net'], self.db.execute(f'''
+            WITH totals(category, income, expenses) AS ({sql})
+            SELECT category, income / 100.0, expenses / 100.0,
+                   (income + expenses) / 100.0
+            FROM totals
+        ''', params)
@@ -1,54 +1,108 @@
+import calendar
 import os
-import shutil
+import threading
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QTabWidget,
     QMenuBar, QComboBox, QPushButton, QTableWidget,
-    QTableWidgetItem, QFileDialog, QMessageBox, QLineEdit,
-    QStyle, QStyleFactory, QLabel, QDialog, QInputDialog
+    QTableWidgetItem, QTableView, QAbstractItemView, QFileDialog,
+    QMessageBox, QLineEdit, QStyle, QLabel, QDialog, QApplication,
+    QInputDialog, QHeaderView, QProgressDialog, QSplitter
 )
-from PySide6.QtGui import QAction, QIcon, QPalette, QColor, QFont
-from PySide6.QtCore import Qt, QSettings
+from PySide6.QtGui import QAction, QIcon, QFont
+from PySide6.QtCore import Qt, QSettings, QObject, Signal, QStandardPaths, QTimer
+from gui.backup import (
+    BackupCancelled, BackupSettings, backup_database, database_signature,
+    list_snapshots, write_snapshot
+)
+from gui.backup_dialog import BackupDialog
+from gui.cash_flow import CashFlowChart, CashFlowModel
+from gui.change_watcher import ChangeWatcher
+from gui.category_dialog import CategoryDialog
 from gui.db_utils import DBManager
+from gui.diagnostics_dialog import DiagnosticsDialog
 from gui.expense_form import ExpenseFormDialog
+from gui.expense_model import (
+    AMOUNT_COLUMN, ExpenseTableModel, format_value, is_computed
+)
 from gui.filter_dialog import FilterDialog
+from gui.exporter import export_rows
+from gui.importer import ImportCancelled, import_files, needs_address
+from gui.instrumentation import DEFAULT_SLOW_MS, instrumentation, timed
+from gui.ledger import ALL_DATES, SEARCH_LIMIT, DateRange, Ledger
+from gui.money import format_cents
+from gui.portfolio_dialog import PortfolioDialog
+from gui.query_executor import QueryExecutor
+from gui.refresh_scheduler import RefreshScheduler
+from gui.theme import apply_theme
 import sqlite3
 
 
+class _Progress(QObject):
+    # Emitted from a worker thread with how far it got: rows imported,
+    # or percent backed up
+    advanced = Signal(int)
+
+
 class MainWindow(QWidget):
-    def __init__(self):
+    SEARCH_HEADERS = ['Address', 'Date', 'Category', 'Description',
+                      'Recipient', 'Amount', 'Payment']
+    DETAILS_TAB = 1
+    SEARCH_TAB = 2
+    CASH_FLOW_TAB = 3
+
+    def __init__(self, db_path='default.db'):
         super().__init__()
         self.setWindowTitle('Real-Estate Tracker')
         self.resize(1200, 800)
 
-        # Set Fusion style and customize palette for dark theme
-        self.setStyle(QStyleFactory.create('Fusion'))
-        palette = QPalette()
-        palette.setColor(QPalette.Window, QColor(53, 53, 53))
-        palette.setColor(QPalette.WindowText, QColor(255, 255, 255))
-        palette.setColor(QPalette.Base, QColor(25, 25, 25))
-        palette.setColor(QPalette.AlternateBase, QColor(53, 53, 53))
-        palette.setColor(QPalette.ToolTipBase, QColor(25, 25, 25))
-        palette.setColor(QPalette.ToolTipText, QColor(255, 255, 255))
-        palette.setColor(QPalette.Text, QColor(255, 255, 255))
-        palette.setColor(QPalette.Button, QColor(53, 53, 53))
-        palette.setColor(QPalette.ButtonText, QColor(255, 255, 255))
-        palette.setColor(QPalette.BrightText, QColor(255, 255, 255))
-        palette.setColor(QPalette.Link, QColor(42, 130, 218))
-        palette.setColor(QPalette.Highlight, QColor(42, 130, 218))
-        palette.setColor(QPalette.HighlightedText, QColor(255, 255, 255))
-        self.setPalette(palette)
+        # Fusion dark theme; one stylesheet, parsed once, for the whole
+        # application
+        apply_theme(QApplication.instance())
 
         # Settings for persisting column widths
         self.settings = QSettings('RealEstateTracker', 'AppSettings')
-        # Track last deleted items for undo
-        self.last_deleted = None
+        self._configure_instrumentation()
+        # Backups read through their own connections on their own thread,
+        # so a long one holds up neither queries nor writes
+        self.backups = QueryExecutor(self, max_threads=1)
+        self._backup_cancelled = threading.Event()
+        # (path, database_signature()) of the last automatic snapshot
+        self._backed_up = None
+        self._backup_timer = QTimer(self)
+        self._backup_timer.timeout.connect(self.auto_backup)
         # Initialize active filters
         self.active_filters = {}
+        # Dates every view is limited to
+        self.date_range = ALL_DATES
+        # Set when a details reload follows a change to the data
+        self._details_changed = False
+        # Last summaries shown, so an unchanged reload skips the redraw
+        self._summaries = None
+        # Set once the first frame is painted and the data is requested
+        self._started = False
 
         # Database manager
-        self.db_path = os.path.abspath('default.db')
+        self.db_path = os.path.abspath(db_path)
         self.db = DBManager(self.db_path)
         self.db.init_db()
+        self.ledger = Ledger(self.db)
+        # Queries run on worker threads; results come back as callbacks
+        self.executor = QueryExecutor(self)
+        self.executor.error.connect(self._on_query_error)
+        self.backups.error.connect(self._on_query_error)
+        self._configure_backups()
+        # Changes mark views dirty; each is reloaded once per event-loop
+        # tick, however many changes asked for it
+        self.refresher = RefreshScheduler(self)
+        self.refresher.register('addresses', self.load_addresses)
+        self.refresher.register('summary', self.load_summary)
+        self.refresher.register('details', self.refresh_details)
+        self.refresher.register('periods', self.load_periods)
+        self.refresher.register('search', self.run_search)
+        self.refresher.register('cashflow', self.load_cash_flow)
+        # Commits by other windows or processes reload what they touched
+        self.watcher = ChangeWatcher(self.db, self.executor, self)
+        self.watcher.changed.connect(self._on_external_change)
 
         # Main layout
         main_layout = QVBoxLayout(self)
@@ -57,39 +111,16 @@ class MainWindow(QWidget):
 
         # Menu bar
         menu_bar = QMenuBar(self)
-        menu_bar.setStyleSheet("""
-            QMenuBar {
-                background-color: #2d2d2d;
-                color: white;
-                border-bottom: 1px solid #1a1a1a;
-            }
-            QMenuBar::item {
-                padding: 4px 8px;
-                background: transparent;
-            }
-            QMenuBar::item:selected {
-                background: #3d3d3d;
-            }
-            QMenu {
-                background-color: #2d2d2d;
-                border: 1px solid #1a1a1a;
-                color: white;
-            }
-            QMenu::item {
-                padding: 4px 20px;
-            }
-            QMenu::item:selected {
-                background-color: #2a82da;
-                color: white;
-            }
-        """)
         file_menu = menu_bar.addMenu('File')
 
         # File menu actions
         new_action = QAction('New', self)
         open_action = QAction('Open', self)
         saveas_action = QAction('Save As', self)
+        portfolio_action = QAction('Open Portfolio…', self)
+        import_action = QAction('Import Statements', self)
         undo_action = QAction('Undo', self)
+        redo_action = QAction('Redo', self)
 
         # Set icons for actions
         new_action.setIcon(self.style().standardIcon(QStyle.SP_FileIcon))
@@ -97,44 +128,79 @@ class MainWindow(QWidget):
             QStyle.SP_DialogOpenButton))
         saveas_action.setIcon(
             self.style().standardIcon(QStyle.SP_DialogSaveButton))
+        portfolio_action.setIcon(
+            self.style().standardIcon(QStyle.SP_DirOpenIcon))
+        import_action.setIcon(
+            self.style().standardIcon(QStyle.SP_ArrowDown))
         undo_action.setIcon(self.style().standardIcon(QStyle.SP_ArrowBack))
+        redo_action.setIcon(self.style().standardIcon(QStyle.SP_ArrowForward))
 
         # Connect actions
         new_action.triggered.connect(self.new_file)
         open_action.triggered.connect(self.open_file)
         saveas_action.triggered.connect(self.save_as)
+        portfolio_action.triggered.connect(self.open_portfolio)
+        import_action.triggered.connect(self.import_statements)
         undo_action.triggered.connect(self.undo)
+        redo_action.triggered.connect(self.redo)
 
         # Add actions to menu
         file_menu.addActions([new_action, open_action, saveas_action])
+        file_menu.addAction(portfolio_action)
         file_menu.addSeparator()
-        file_menu.addAction(undo_action)
+        file_menu.addAction(import_action)
+        export_menu = file_menu.addMenu('Export')
+        export_menu.setIcon(self.style().standardIcon(QStyle.SP_ArrowUp))
+        export_menu.addAction('Details…', self.export_details)
+        export_menu.addAction('Summary…', self.export_summary)
+        export_menu.addAction('Categories…', self.export_categories)
+        file_menu.addSeparator()
+        file_menu.addActions([undo_action, redo_action])
+
+        tools_menu = menu_bar.addMenu('Tools')
+        verify_action = QAction('Verify Totals', self)
+        verify_action.setIcon(self.style().standardIcon(
+            QStyle.SP_BrowserReload))
+        verify_action.triggered.connect(self.verify_totals)
+        tools_menu.addAction(verify_action)
+        diagnostics_action = QAction('Diagnostics', self)
+        diagnostics_action.setIcon(self.style().standardIcon(
+            QStyle.SP_MessageBoxInformation))
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+        tools_menu.addAction(diagnostics_action)
+        tools_menu.addSeparator()
+        backup_now_action = QAction('Back Up Now', self)
+        backup_now_action.setIcon(self.style().standardIcon(
+            QStyle.SP_DriveHDIcon))
+        backup_now_action.triggered.connect(self.backup_now)
+        tools_menu.addAction(backup_now_action)
+        tools_menu.addAction('Backups…', self.show_backups)
 
         main_layout.setMenuBar(menu_bar)
 
-        # Tabs: Summary and Details
+        # Period selector: limits the summary, details and categories
+        period_layout = QHBoxLayout()
+        period_layout.setSpacing(10)
+        period_label = QLabel('Period:')
+        self.year_selector = QComboBox()
+        self.year_selector.setMinimumWidth(110)
+        self.year_selector.addItem('All years', None)
+        self.month_selector = QComboBox()
+        self.month_selector.setMinimumWidth(120)
+        self.month_selector.addItem('All months', None)
+        for month in range(1, 13):
+            self.month_selector.addItem(calendar.month_name[month], month)
+        self.month_selector.setEnabled(False)
+        self.year_selector.currentIndexChanged.connect(self._on_period_changed)
+        self.month_selector.currentIndexChanged.connect(self._on_period_changed)
+        period_layout.addWidget(period_label)
+        period_layout.addWidget(self.year_selector)
+        period_layout.addWidget(self.month_selector)
+        period_layout.addStretch()
+        main_layout.addLayout(period_layout)
+
+        # Tabs: Summary, Details and Search
         self.tabs = QTabWidget()
-        self.tabs.setStyleSheet("""
-            QTabWidget::pane {
-                border: 1px solid #1a1a1a;
-                background: #2d2d2d;
-            }
-            QTabBar::tab {
-                background: #2d2d2d;
-                border: 1px solid #1a1a1a;
-                border-bottom: none;
-                padding: 8px 16px;
-                margin-right: 2px;
-                color: white;
-            }
-            QTabBar::tab:selected {
-                background: #1a1a1a;
-                border-bottom: 1px solid #1a1a1a;
-            }
-            QTabBar::tab:hover {
-                background: #3d3d3d;
-            }
-        """)
 
         # Summary tab
         summary_widget = QWidget()
@@ -151,49 +217,15 @@ class MainWindow(QWidget):
         self.summary_table.cellDoubleClicked.connect(self._show_category_summary)
         # Make summary table read-only
         self.summary_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.summary_table.setStyleSheet("""
-            QTableWidget { 
-                border: 1px solid #1a1a1a;
-                gridline-color: #3d3d3d;
-                background: #1a1a1a;
-                color: white;
-            }
-            QHeaderView::section {
-                background-color: #2d2d2d;
-                padding: 4px;
-                border: 1px solid #1a1a1a;
-                font-weight: bold;
-                color: white;
-            }
-            QTableWidget::item {
-                padding: 4px;
-            }
-            QTableWidget::item:selected {
-                background-color: #2a82da;
-                color: white;
-            }
-        """)
         summary_layout.addWidget(self.summary_table)
 
         # Total sum display
         total_layout = QHBoxLayout()
         total_layout.setContentsMargins(0, 10, 0, 0)
         total_label = QLabel('Total:')
-        total_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-weight: bold;
-                font-size: 14px;
-            }
-        """)
+        total_label.setObjectName('totalLabel')
         self.total_sum_label = QLabel('$0.00')
-        self.total_sum_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-weight: bold;
-                font-size: 14px;
-            }
-        """)
+        self.total_sum_label.setObjectName('totalLabel')
         total_layout.addStretch()
         total_layout.addWidget(total_label)
         total_layout.addWidget(self.total_sum_label)
@@ -201,60 +233,66 @@ class MainWindow(QWidget):
 
         self.tabs.addTab(summary_widget, 'Summary')
 
-        # Details tab
-        details_widget = QWidget()
+        # Details, Search and Cash Flow are built the first time they
+        # are shown.
+        # The address selector and the details model are needed before
+        # that (imports, the expense form), so they exist from the start.
+        self.addr_selector = QComboBox()
+        self.addr_selector.setMinimumWidth(200)
+        self.addr_selector.currentTextChanged.connect(self.load_details)
+        self.details_model = ExpenseTableModel(self.db, self)
+        self.details_table = None
+        self.search_edit = None
+        self.cash_flow_table = None
+        self.tabs.addTab(QWidget(), 'Details')
+        self.tabs.addTab(QWidget(), 'Search')
+        self.tabs.addTab(QWidget(), 'Cash Flow')
+        # tab index -> function filling in its page
+        self._tab_builders = {
+            self.DETAILS_TAB: self._build_details_tab,
+            self.SEARCH_TAB: self._build_search_tab,
+            self.CASH_FLOW_TAB: self._build_cash_flow_tab,
+        }
+        self.tabs.currentChanged.connect(self._build_tab)
+
+        main_layout.addWidget(self.tabs)
+
+        # Loading indicator shown while queries are in flight
+        self.loading_label = QLabel('Loading…')
+        self.loading_label.setObjectName('loadingLabel')
+        self.loading_label.hide()
+        self.executor.busy_changed.connect(self.loading_label.setVisible)
+        main_layout.addWidget(self.loading_label)
+
+        # Restore and persist the summary's column widths. The data is
+        # loaded once the first frame is on screen (see paintEvent).
+        self._restore_summary_column_widths()
+        self.summary_table.horizontalHeader().sectionResized.connect(
+            self._save_summary_column_width)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._started:
+            # The window is on screen; only now ask for what it shows
+            self._started = True
+            self.refresher.mark_dirty('addresses', 'summary', 'periods')
+            self.watcher.start()
+
+    def _build_tab(self, index):
+        build = self._tab_builders.pop(index, None)
+        if build is not None:
+            build(self.tabs.widget(index))
+
+    def _build_details_tab(self, details_widget):
         details_layout = QVBoxLayout(details_widget)
         details_layout.setSpacing(10)
         control_layout = QHBoxLayout()
         control_layout.setSpacing(10)
-
-        # Address selector
-        self.addr_selector = QComboBox()
-        self.addr_selector.setMinimumWidth(200)
-        self.addr_selector.setStyleSheet("""
-            QComboBox {
-                padding: 4px;
-                border: 1px solid #1a1a1a;
-                border-radius: 3px;
-                background: #2d2d2d;
-                color: white;
-            }
-            QComboBox::drop-down {
-                border: none;
-                width: 20px;
-            }
-            QComboBox::down-arrow {
-                image: url(down-arrow.png);
-                width: 12px;
-                height: 12px;
-            }
-            QComboBox QAbstractItemView {
-                background: #2d2d2d;
-                color: white;
-                selection-background-color: #2a82da;
-            }
-        """)
-        self.addr_selector.currentTextChanged.connect(self.load_details)
         control_layout.addWidget(self.addr_selector)
 
         # Add rename address button
         rename_addr_btn = QPushButton('Rename Address')
         rename_addr_btn.setIcon(self.style().standardIcon(QStyle.SP_FileDialogDetailedView))
-        rename_addr_btn.setStyleSheet("""
-            QPushButton {
-                padding: 6px 12px;
-                border: 1px solid #1a1a1a;
-                border-radius: 3px;
-                background: #2d2d2d;
-                color: white;
-            }
-            QPushButton:hover {
-                background: #3d3d3d;
-            }
-            QPushButton:pressed {
-                background: #1a1a1a;
-            }
-        """)
         rename_addr_btn.clicked.connect(self._rename_address)
         control_layout.addWidget(rename_addr_btn)
 
@@ -272,27 +310,6 @@ class MainWindow(QWidget):
         clear_filters_btn.setIcon(
             self.style().standardIcon(QStyle.SP_DialogResetButton))
 
-        # Style buttons
-        button_style = """
-            QPushButton {
-                padding: 6px 12px;
-                border: 1px solid #1a1a1a;
-                border-radius: 3px;
-                background: #2d2d2d;
-                color: white;
-            }
-            QPushButton:hover {
-                background: #3d3d3d;
-            }
-            QPushButton:pressed {
-                background: #1a1a1a;
-            }
-        """
-        add_btn.setStyleSheet(button_style)
-        delete_exp_btn.setStyleSheet(button_style)
-        delete_addr_btn.setStyleSheet(button_style)
-        clear_filters_btn.setStyleSheet(button_style)
-
         add_btn.clicked.connect(self.add_expense)
         delete_exp_btn.clicked.connect(self.delete_expense)
         delete_addr_btn.clicked.connect(self.delete_address)
@@ -305,11 +322,9 @@ class MainWindow(QWidget):
 
         details_layout.addLayout(control_layout)
 
-        self.details_table = QTableWidget()
-        self.details_table.setColumnCount(8)
-        self.details_table.setHorizontalHeaderLabels([
-            'ID', 'Date', 'Type', 'Category', 'Description', 'Recipient', 'Amount', 'Payment'
-        ])
+        # Details are backed by a lazily paged model over the expenses table
+        self.details_table = QTableView()
+        self.details_table.setModel(self.details_model)
         self.details_table.setSortingEnabled(True)
         self.details_table.setAlternatingRowColors(True)
         self.details_table.horizontalHeader().setStretchLastSection(True)
@@ -322,79 +337,98 @@ class MainWindow(QWidget):
         self.details_table.setColumnWidth(5, 150)  # Recipient
         self.details_table.setColumnWidth(6, 100)  # Amount
         self.details_table.setColumnWidth(7, 100)  # Payment
+        self.details_table.setColumnWidth(8, 100)  # Balance
         # Make details table read-only
-        self.details_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.details_table.setStyleSheet("""
-            QTableWidget { 
-                border: 1px solid #1a1a1a;
-                gridline-color: #3d3d3d;
-                background: #1a1a1a;
-                color: white;
-            }
-            QHeaderView::section {
-                background-color: #2d2d2d;
-                padding: 4px;
-                border: 1px solid #1a1a1a;
-                font-weight: bold;
-                color: white;
-            }
-            QHeaderView::section:filtered {
-                background-color: #3d3d3d;
-            }
-            QTableWidget::item {
-                padding: 4px;
-            }
-            QTableWidget::item:selected {
-                background-color: #2a82da;
-                color: white;
-            }
-        """)
+        self.details_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         # Connect header click event
         self.details_table.horizontalHeader().sectionClicked.connect(self._show_filter_dialog)
         details_layout.addWidget(self.details_table)
+        self._restore_column_widths()
+        self.details_table.horizontalHeader().sectionResized.connect(self._save_column_width)
 
         # Add running total display
         total_layout = QHBoxLayout()
         total_layout.setContentsMargins(0, 10, 0, 0)
         total_label = QLabel('Running Total:')
-        total_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-weight: bold;
-                font-size: 14px;
-            }
-        """)
+        total_label.setObjectName('totalLabel')
         self.running_total_label = QLabel('$0.00')
-        self.running_total_label.setStyleSheet("""
-            QLabel {
-                color: white;
-                font-weight: bold;
-                font-size: 14px;
-            }
-        """)
+        self.running_total_label.setObjectName('totalLabel')
         total_layout.addStretch()
         total_layout.addWidget(total_label)
         total_layout.addWidget(self.running_total_label)
         details_layout.addLayout(total_layout)
 
-        self.tabs.addTab(details_widget, 'Details')
-
-        main_layout.addWidget(self.tabs)
+        # Until now a picked house was only remembered; load it
+        if self.addr_selector.count():
+            self.load_details(self.addr_selector.currentText())
 
-        # Load initial data and restore column widths
-        self.load_summary()
-        self.load_addresses()
-        self._restore_column_widths()
-        self._restore_summary_column_widths()
+    def _build_search_tab(self, search_widget):
+        # Full-text search across every house
+        search_layout = QVBoxLayout(search_widget)
+        search_layout.setSpacing(10)
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText(
+            'Search descriptions, recipients, categories and payments…')
+        self.search_edit.setClearButtonEnabled(True)
+        search_layout.addWidget(self.search_edit)
+        self.search_table = QTableWidget(0, len(self.SEARCH_HEADERS))
+        self.search_table.setHorizontalHeaderLabels(self.SEARCH_HEADERS)
+        self.search_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.search_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.search_table.setAlternatingRowColors(True)
+        self.search_table.horizontalHeader().setStretchLastSection(True)
+        self.search_table.cellDoubleClicked.connect(self._open_search_result)
+        search_layout.addWidget(self.search_table)
+        self.search_status = QLabel()
+        self.search_status.setObjectName('statusLabel')
+        search_layout.addWidget(self.search_status)
+        # Search as the user types, once typing pauses
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(150)
+        self._search_timer.timeout.connect(self.run_search)
+        self.search_edit.textChanged.connect(self._search_timer.start)
+
+    def _build_cash_flow_tab(self, cash_flow_widget):
+        # Net per house and month above, the selected row's trend below
+        cash_flow_layout = QVBoxLayout(cash_flow_widget)
+        splitter = QSplitter(Qt.Vertical)
+        self.cash_flow_model = CashFlowModel(self)
+        self.cash_flow_table = QTableView()
+        self.cash_flow_table.setModel(self.cash_flow_model)
+        self.cash_flow_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.cash_flow_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.cash_flow_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.cash_flow_table.horizontalHeader().setDefaultSectionSize(110)
+        self.cash_flow_table.selectionModel().currentRowChanged.connect(
+            self._show_cash_flow_trend)
+        splitter.addWidget(self.cash_flow_table)
+        self.cash_flow_chart = CashFlowChart()
+        splitter.addWidget(self.cash_flow_chart)
+        splitter.setSizes([500, 250])
+        cash_flow_layout.addWidget(splitter)
+        self.load_cash_flow()
+
+    def _configure_instrumentation(self):
+        # Off unless switched on in the Diagnostics dialog
+        log_dir = QStandardPaths.writableLocation(
+            QStandardPaths.AppLocalDataLocation)
+        os.makedirs(log_dir, exist_ok=True)
+        instrumentation.configure(
+            self.settings.value('diagnostics/enabled', False, type=bool),
+            self.settings.value('diagnostics/slow_ms', DEFAULT_SLOW_MS, type=int),
+            os.path.join(log_dir, 'slow_operations.log')
+        )
 
-        # Connect column resize signals for persistence
-        self.details_table.horizontalHeader().sectionResized.connect(self._save_column_width)
-        self.summary_table.horizontalHeader().sectionResized.connect(
-            self._save_summary_column_width)
+    def show_diagnostics(self):
+        dialog = DiagnosticsDialog(self.db, self)
+        dialog.exec()
+        self.settings.setValue('diagnostics/enabled', instrumentation.enabled)
+        self.settings.setValue('diagnostics/slow_ms', instrumentation.slow_ms)
 
     def _restore_column_widths(self):
         # Restore saved widths for details table
-        for i in range(self.details_table.columnCount()):
+        for i in range(self.details_model.columnCount()):
             key = f'details_col_{i}_width'
             width = self.settings.value(key, type=int)
             if width:
@@ -416,100 +450,543 @@ class MainWindow(QWidget):
         key = f'summary_col_{index}_width'
         self.settings.setValue(key, new)
 
+    def closeEvent(self, event):
+        self.watcher.stop()
+        self._backup_timer.stop()
+        self._backup_cancelled.set()
+        self.backups.wait()
+        self.executor.wait()
+        self.db.close()
+        super().closeEvent(event)
+
     def new_file(self):
         filepath, _ = QFileDialog.getSaveFileName(
             self, 'New Database', '', 'Database Files (*.db)'
         )
         if filepath:
             open(filepath, 'w').close()
-            self.db_path = filepath
-            self.db = DBManager(self.db_path)
-            self.db.init_db()
-            self.load_summary()
-            self.load_addresses()
+            self._switch_db(filepath)
 
     def open_file(self):
         filepath, _ = QFileDialog.getOpenFileName(
             self, 'Open Database', '', 'Database Files (*.db)'
         )
         if filepath:
-            self.db_path = filepath
-            self.db = DBManager(self.db_path)
-            self.db.init_db()
-            self.load_summary()
-            self.load_addresses()
+            self._switch_db(filepath)
+
+    def _switch_db(self, filepath):
+        # Re-bind the shared manager so the model and dialogs follow along
+        self.db_path = filepath
+        # Nothing may still be reading the old file when it is closed
+        self.executor.wait()
+        self.details_model.clear()
+        self.active_filters.clear()
+        self.db.rebind(self.db_path)
+        self.db.init_db()
+        self.watcher.reset()
+        # The new file may list the same addresses with other rows
+        self.refresher.mark_dirty(
+            'addresses', 'summary', 'details', 'periods', 'search', 'cashflow')
 
     def save_as(self):
         filepath, _ = QFileDialog.getSaveFileName(
             self, 'Save Database As', '', 'Database Files (*.db)'
         )
-        if filepath:
-            shutil.copyfile(self.db_path, filepath)
+        if not filepath:
+            return
+        if os.path.abspath(filepath) == os.path.abspath(self.db_path):
+            QMessageBox.warning(
+                self, 'Save As', 'Choose another file than the open one.')
+            return
+        self._run_backup(
+            'Save As', 'save-as',
+            lambda progress: backup_database(self.db_path, filepath, progress),
+            lambda path: QMessageBox.information(
+                self, 'Saved', f'Database saved to {path}'))
+
+    # Backups
+
+    def _backup_settings(self):
+        default_directory = os.path.join(QStandardPaths.writableLocation(
+            QStandardPaths.AppLocalDataLocation), 'backups')
+        return BackupSettings(
+            self.settings.value('backup/enabled', True, type=bool),
+            self.settings.value('backup/interval_minutes', 60, type=int),
+            self.settings.value('backup/keep', 10, type=int),
+            self.settings.value('backup/compress', True, type=bool),
+            self.settings.value('backup/directory', '') or default_directory)
+
+    def _configure_backups(self):
+        settings = self._backup_settings()
+        self._backup_timer.setInterval(settings.interval_minutes * 60000)
+        if settings.enabled:
+            self._backup_timer.start()
+        else:
+            self._backup_timer.stop()
+
+    def show_backups(self):
+        settings = self._backup_settings()
+        dialog = BackupDialog(
+            settings, list_snapshots(settings.directory, self.db_path), self)
+        if dialog.exec() != QDialog.Accepted:
+            return
+        for key, value in dialog.backup_settings()._asdict().items():
+            self.settings.setValue(f'backup/{key}', value)
+        self._configure_backups()
+
+    def backup_now(self):
+        settings = self._backup_settings()
+        db_path = self.db_path
+        self._run_backup(
+            'Back Up Now', 'snapshot',
+            lambda progress: write_snapshot(
+                db_path, settings.directory, settings.keep, settings.compress,
+                progress),
+            lambda path: QMessageBox.information(
+                self, 'Back Up Now', f'Snapshot saved to {path}'))
+
+    def auto_backup(self):
+        # Timer; a snapshot only when the file changed since the last one
+        if self.backups.is_busy():
+            return
+        settings = self._backup_settings()
+        db_path = self.db_path
+        state = (db_path, database_signature(db_path))
+        if state == self._backed_up:
+            return
+
+        def done(result):
+            path, error = result
+            if error is not None:
+                QMessageBox.warning(
+                    self, 'Automatic Backup Failed',
+                    f'The database could not be backed up to '
+                    f'{settings.directory}.\n\n{error}')
+            elif path is not None:
+                self._backed_up = state
+
+        self.backups.submit(
+            'snapshot', self._back_up,
+            done, lambda progress: write_snapshot(
+                db_path, settings.directory, settings.keep, settings.compress,
+                progress),
+            self._backup_cancelled, None)
+
+    def _run_backup(self, title, key, write, on_done):
+        # Backs up on the backup thread behind a cancellable progress
+        # dialog; on_done(path) runs once it succeeded
+        progress_dialog = QProgressDialog('Backing up…', 'Cancel', 0, 100, self)
+        progress_dialog.setWindowTitle(title)
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        progress = _Progress(progress_dialog)
+        progress.advanced.connect(progress_dialog.setValue)
+        cancelled = threading.Event()
+        progress_dialog.canceled.connect(cancelled.set)
+
+        def done(result):
+            progress_dialog.close()
+            path, error = result
+            if error is not None:
+                QMessageBox.warning(
+                    self, title, f'The database was not backed up.\n\n{error}')
+            elif path is not None:
+                on_done(path)
+
+        progress_dialog.show()
+        self.backups.submit(key, self._back_up, done, write, cancelled, progress)
+
+    def _back_up(self, write, cancelled, progress):
+        # Backup thread; returns (path written or None if cancelled, error).
+        # Closing the window cancels every backup.
+        def report(done, total):
+            if cancelled.is_set() or self._backup_cancelled.is_set():
+                raise BackupCancelled()
+            if progress is not None:
+                progress.advanced.emit(done * 100 // total if total else 100)
+        try:
+            return write(report), None
+        except BackupCancelled:
+            return None, None
+        except (OSError, sqlite3.Error) as exc:
+            return None, exc
+
+    def open_portfolio(self):
+        # The last portfolio's files, or else the open file to start from
+        paths = [path for path in self.settings.value('portfolio/files', [], type=list)
+                 if os.path.exists(path)] or [self.db_path]
+        dialog = PortfolioDialog(
+            self.executor, paths, self.date_range, self._period_label(), self)
+        dialog.exec()
+        self.settings.setValue('portfolio/files', dialog.paths())
+
+    def import_statements(self):
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, 'Import Statements', '',
+            'Statements (*.csv *.ofx *.qfx);;All Files (*)'
+        )
+        if not paths:
+            return
+        address = None
+        try:
+            ask = any(needs_address(path) for path in paths)
+        except OSError as exc:
+            QMessageBox.warning(self, 'Import Failed', str(exc))
+            return
+        if ask:
+            addresses = [self.addr_selector.itemText(i)
+                         for i in range(self.addr_selector.count())]
+            address, ok = QInputDialog.getItem(
+                self, 'Import Statements',
+                'Address for transactions without one:',
+                addresses, self.addr_selector.currentIndex(), True
+            )
+            address = address.strip()
+            if not ok or not address:
+                return
+
+        progress_dialog = QProgressDialog('Importing…', 'Cancel', 0, 0, self)
+        progress_dialog.setWindowTitle('Import Statements')
+        progress_dialog.setWindowModality(Qt.WindowModal)
+        progress_dialog.setMinimumDuration(0)
+        progress = _Progress(progress_dialog)
+        progress.advanced.connect(
+            lambda count: progress_dialog.setLabelText(
+                f'Imported {count:,} rows…'))
+        cancelled = threading.Event()
+        progress_dialog.canceled.connect(cancelled.set)
+        progress_dialog.show()
+        self.executor.submit_write(
+            'import', self._import_rows,
+            lambda result: self._on_imported(progress_dialog, result),
+            paths, address, cancelled, progress
+        )
+
+    def _import_rows(self, paths, address, cancelled, progress):
+        # Worker thread; returns (rows imported, error)
+        def report(count):
+            if cancelled.is_set():
+                raise ImportCancelled()
+            progress.advanced.emit(count)
+        try:
+            return import_files(self.db, paths, address, report), None
+        except ImportCancelled:
+            return 0, None
+        except (OSError, ValueError) as exc:
+            return 0, exc
+
+    def _on_imported(self, progress_dialog, result):
+        progress_dialog.close()
+        count, error = result
+        if error is not None:
+            QMessageBox.warning(
+                self, 'Import Failed',
+                f'Nothing was imported.\n\n{error}'
+            )
+            return
+        if count:
             QMessageBox.information(
-                self, 'Saved', f'Database saved to {filepath}'
+                self, 'Import Statements', f'Imported {count:,} transactions.'
             )
+            self.refresher.mark_dirty(
+            'addresses', 'summary', 'details', 'periods', 'search', 'cashflow')
 
-    def load_summary(self):
-        conn = self.db.connect()
-        cur = conn.cursor()
-        cur.execute('''
-            SELECT h.address, 
-                   COALESCE(SUM(CASE WHEN e.type = 'expense' THEN e.amount ELSE 0 END), 0) as expenses,
-                   COALESCE(SUM(CASE WHEN e.type = 'income' THEN e.amount ELSE 0 END), 0) as income
-            FROM houses h
-            LEFT JOIN expenses e ON h.id = e.house_id
-            GROUP BY h.id
-        ''')
-        rows = cur.fetchall()
-        conn.close()
+    def _export_path(self, title, name):
+        filepath, selected = QFileDialog.getSaveFileName(
+            self, title, name,
+            'CSV Files (*.csv);;Excel Workbooks (*.xlsx)'
+        )
+        if filepath and not os.path.splitext(filepath)[1]:
+            filepath += '.xlsx' if 'xlsx' in selected else '.csv'
+        return filepath
+
+    def export_details(self):
+        if self.details_table is None:
+            # What is exported is what the tab shows; show it first
+            self.tabs.setCurrentIndex(self.DETAILS_TAB)
+            QMessageBox.information(
+                self, 'Export', 'Export the details once they are shown.')
+            return
+        model = self.details_model
+        if model.house_id is None:
+            QMessageBox.warning(self, 'Export', 'Please select an address first.')
+            return
+        apply_filters = False
+        if self.active_filters or not model.date_range.is_all:
+            reply = QMessageBox.question(
+                self, 'Export Details',
+                'Apply the active filters and period to the export?',
+                QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel
+            )
+            if reply == QMessageBox.Cancel:
+                return
+            apply_filters = reply == QMessageBox.Yes
+        filepath = self._export_path(
+            'Export Details', self.addr_selector.currentText())
+        if filepath:
+            self._export(filepath, self._details_cursor,
+                         *model.export_query(apply_filters))
+
+    def _details_cursor(self, header, sql, params):
+        # Worker thread
+        return header, self.db.execute(sql, params)
+
+    def export_summary(self):
+        filepath = self._export_path(
+            'Export Summary', f'summary {self._period_label()}')
+        if filepath:
+            self._export(filepath, self.ledger.summary_cursor, self.date_range)
+
+    def export_categories(self):
+        address = self.addr_selector.currentText()
+        if not address:
+            QMessageBox.warning(self, 'Export', 'Please select an address first.')
+            return
+        filepath = self._export_path(
+            'Export Categories', f'{address} categories {self._period_label()}')
+        if filepath:
+            self._export(filepath, self.ledger.category_cursor, address,
+                         self.date_range)
+
+    def _export(self, filepath, open_cursor, *args):
+        # open_cursor(*args) runs on the worker and returns (header, cursor)
+        self.executor.submit(
+            'export', self._export_rows,
+            lambda count: QMessageBox.information(
+                self, 'Export', f'Exported {count:,} rows to {filepath}'),
+            filepath, open_cursor, args
+        )
+
+    def _export_rows(self, filepath, open_cursor, args):
+        # Worker thread; rows go from the cursor to the file in chunks
+        header, cursor = open_cursor(*args)
+        return export_rows(filepath, header, cursor)
+
+    def _on_query_error(self, key, exc):
+        QMessageBox.warning(
+            self, 'Database Error', f'The {key} query failed: {exc}'
+        )
+
+    def load_periods(self):
+        self.executor.submit(
+            'periods', self.ledger.date_bounds, self._show_periods)
+
+    def _show_periods(self, bounds):
+        first, last = bounds
+        years = set()
+        if first and last:
+            # Dates are validated ISO, so the year is the first four digits
+            years.update(range(int(first[:4]), int(last[:4]) + 1))
+        selected = self.year_selector.currentData()
+        if selected is not None:
+            # Keep showing the picked year even if its rows are gone
+            years.add(selected)
+        self.year_selector.blockSignals(True)
+        self.year_selector.clear()
+        self.year_selector.addItem('All years', None)
+        for year in sorted(years, reverse=True):
+            self.year_selector.addItem(str(year), year)
+        self.year_selector.setCurrentIndex(
+            max(self.year_selector.findData(selected), 0))
+        self.year_selector.blockSignals(False)
+
+    def _on_period_changed(self):
+        year = self.year_selector.currentData()
+        month = self.month_selector.currentData()
+        self.month_selector.setEnabled(year is not None)
+        if year is None:
+            date_range = ALL_DATES
+        elif month is None:
+            date_range = DateRange.year(year)
+        else:
+            date_range = DateRange.month(year, month)
+        if date_range == self.date_range:
+            return
+        self.date_range = date_range
+        self.refresher.mark_dirty('summary', 'details', 'search', 'cashflow')
+
+    def _period_label(self):
+        if self.date_range.is_all:
+            return 'all dates'
+        if self.month_selector.currentData() is None:
+            return self.year_selector.currentText()
+        return f'{self.month_selector.currentText()} {self.year_selector.currentText()}'
 
+    @timed('load_summary')
+    def load_summary(self):
+        # All-time totals come from the trigger-maintained rollup, one
+        # row per house; a period is summed from its own rows
+        self.executor.submit(
+            'summary', self.ledger.house_summaries, self._show_summary,
+            self.date_range)
+
+    def _show_summary(self, summaries):
+        if summaries == self._summaries:
+            return
+        previous, self._summaries = self._summaries, summaries
         # Calculate total income and expenses
-        total_expenses = sum(row[1] for row in rows)
-        total_income = sum(row[2] for row in rows)
+        total_expenses = sum(house.expenses for house in summaries)
+        total_income = sum(house.income for house in summaries)
         net_total = total_income + total_expenses  # expenses are already negative
 
-        self.total_sum_label.setText(f'Net: ${net_total:,.2f} (Income: ${total_income:,.2f}, Expenses: ${abs(total_expenses):,.2f})')
+        self.total_sum_label.setText(f'Net: {format_cents(net_total)} (Income: {format_cents(total_income)}, Expenses: {format_cents(abs(total_expenses))})')
+
+        if previous is not None and ([house.address for house in previous]
+                                     == [house.address for house in summaries]):
+            # Same houses: only rewrite the totals that changed. The
+            # items are looked up first, as sorting may move their rows.
+            table = self.summary_table
+            total_items = {table.item(row, 0).text(): table.item(row, 1)
+                           for row in range(table.rowCount())}
+            for old, house in zip(previous, summaries):
+                if old != house:
+                    total_items[house.address].setText(format_cents(house.net))
+            return
 
-        self.summary_table.setRowCount(len(rows))
-        for row_index, (address, expenses, income) in enumerate(rows):
+        self.summary_table.setRowCount(len(summaries))
+        for row_index, house in enumerate(summaries):
             self.summary_table.setItem(
-                row_index, 0, QTableWidgetItem(address)
+                row_index, 0, QTableWidgetItem(house.address)
             )
-            net = income + expenses  # expenses are already negative
-            total_item = QTableWidgetItem(f'${net:,.2f}')
+            total_item = QTableWidgetItem(format_cents(house.net))
             total_item.setTextAlignment(Qt.AlignRight)
             self.summary_table.setItem(row_index, 1, total_item)
 
+    @timed('load_cash_flow')
+    def load_cash_flow(self):
+        if self.cash_flow_table is None:
+            # The tab loads the report when it is first shown
+            return
+        self.executor.submit(
+            'cashflow', self.ledger.cash_flow, self._show_cash_flow,
+            self.date_range)
+
+    def _show_cash_flow(self, cash_flow):
+        model = self.cash_flow_model
+        # Stay on the selected house, or the total row, across reloads
+        current = self.cash_flow_table.currentIndex()
+        selected = model.rows[current.row()] if current.isValid() else None
+        model.set_cash_flow(cash_flow)
+        # Totals outgrow the monthly columns
+        self.cash_flow_table.resizeColumnToContents(model.columnCount() - 1)
+        row = model.rows.index(selected) if selected in model.rows else len(model.rows) - 1
+        self.cash_flow_table.setCurrentIndex(model.index(row, 0))
+        # The latest months are the interesting ones
+        self.cash_flow_table.scrollTo(model.index(row, model.columnCount() - 1))
+
+    def _show_cash_flow_trend(self, current, previous):
+        if not current.isValid():
+            return
+        model = self.cash_flow_model
+        self.cash_flow_chart.set_series(
+            f'{model.rows[current.row()]} ({self._period_label()})',
+            model.cash_flow.months, model.series(current.row()))
+
+    @timed('load_addresses')
     def load_addresses(self):
-        conn = self.db.connect()
-        cur = conn.cursor()
-        cur.execute('SELECT address FROM houses')
-        addresses = [r[0] for r in cur.fetchall()]
-        conn.close()
-        self.addr_selector.clear()
-        self.addr_selector.addItems(addresses)
-        if addresses:
-            self.load_details(addresses[0])
+        self.executor.submit(
+            'addresses', self.ledger.addresses, self._show_addresses)
+
+    def _show_addresses(self, addresses):
+        selector = self.addr_selector
+        if addresses == [selector.itemText(i) for i in range(selector.count())]:
+            return
+        # Keep the selected house if it is still there, so its details
+        # (and filters) are only reloaded when the selection moves
+        selected = selector.currentText()
+        selector.blockSignals(True)
+        selector.clear()
+        selector.addItems(addresses)
+        if selected in addresses:
+            selector.setCurrentText(selected)
+        selector.blockSignals(False)
+        if selector.currentText() != selected:
+            self.load_details(selector.currentText())
+
+    def run_search(self):
+        if self.search_edit is None:
+            # Nothing to search for until the tab has been opened
+            return
+        text = self.search_edit.text()
+        if not text.strip():
+            self.executor.cancel('search')
+            self._show_search_results([])
+            return
+        self.executor.submit(
+            'search', self.ledger.search, self._show_search_results,
+            text, self.date_range, SEARCH_LIMIT + 1)
+
+    def _show_search_results(self, results):
+        shown = results[:SEARCH_LIMIT]
+        self.search_table.setSortingEnabled(False)
+        self.search_table.setRowCount(len(shown))
+        for row, result in enumerate(shown):
+            values = [result.address, result.date, result.category,
+                      result.expense, result.recipient,
+                      format_value(AMOUNT_COLUMN, result.amount),
+                      result.payment]
+            for col, value in enumerate(values):
+                self.search_table.setItem(row, col, QTableWidgetItem(value or ''))
+            self.search_table.item(row, 5).setTextAlignment(Qt.AlignRight)
+        self.search_table.setSortingEnabled(True)
+        if not self.search_edit.text().strip():
+            self.search_status.clear()
+        elif len(results) > SEARCH_LIMIT:
+            self.search_status.setText(
+                f'Showing the {SEARCH_LIMIT} newest matches; type more to narrow it down')
+        else:
+            self.search_status.setText(
+                f'{len(results)} match' + ('' if len(results) == 1 else 'es'))
+
+    def _open_search_result(self, row, column):
+        # Show the result's house on the Details tab
+        address = self.search_table.item(row, 0).text()
+        self.addr_selector.setCurrentText(address)
+        self.tabs.setCurrentIndex(self.DETAILS_TAB)
 
     def _show_filter_dialog(self, column_index):
-        # Get unique values for the column
-        unique_values = set()
-        for row in range(self.details_table.rowCount()):
-            item = self.details_table.item(row, column_index)
-            if item:
-                unique_values.add(item.text())
+        if is_computed(column_index):
+            return
+        model = self.details_model
+        cached = model.distinct_values(column_index)
+        if cached is not None:
+            self._open_filter_dialog(column_index, cached)
+            return
+        # Count the column's values on a worker, then open the dialog
+        key = model.values_key()
+        self.executor.submit(
+            'filter-values', model.query_distinct_values,
+            lambda values: self._on_distinct_values(key, column_index, values),
+            model.house_id, column_index, model.date_range
+        )
+
+    def _on_distinct_values(self, key, column_index, values):
+        model = self.details_model
+        model.cache_distinct_values(key, column_index, values)
+        if key == model.values_key():
+            self._open_filter_dialog(column_index, values)
+
+    def _open_filter_dialog(self, column_index, values):
+        # Get unique values (with row counts) for the column
+        model = self.details_model
+        unique_values = [
+            (value, format_value(column_index, value), count)
+            for value, count in values
+        ]
 
         if not unique_values:
             return
 
         # Show filter dialog
-        column_name = self.details_table.horizontalHeaderItem(
-            column_index).text()
-        dialog = FilterDialog(column_name, unique_values, self)
+        column_name = model.headerData(column_index, Qt.Horizontal)
+        dialog = FilterDialog(
+            column_name, unique_values, self,
+            selected=self.active_filters.get(column_index)
+        )
         if dialog.exec():
-            selected_values = dialog.get_selected_values()
-            # Update active filters
-            if selected_values:
+            selected_values = set(dialog.get_selected_values())
+            # Update active filters; selecting everything is no filter
+            if selected_values and len(selected_values) < len(unique_values):
                 self.active_filters[column_index] = selected_values
             else:
                 self.active_filters.pop(column_index, None)
@@ -517,85 +994,75 @@ class MainWindow(QWidget):
             # Apply all active filters
             self._apply_filters()
 
-            # Update header style
+            # Let filtered columns take up the spare width
             header = self.details_table.horizontalHeader()
-            for col in range(self.details_table.columnCount()):
-                if col in self.active_filters:
-                    header.setSectionResizeMode(col, header.Stretch)
-                    header.setStyleSheet("""
-                        QHeaderView::section:filtered {
-                            background-color: #3d3d3d;
-                        }
-                    """)
-                else:
-                    header.setStyleSheet("")
+            for col in self.active_filters:
+                header.setSectionResizeMode(col, QHeaderView.Stretch)
 
+    @timed('_apply_filters')
     def _apply_filters(self):
-        # First, show all rows
-        for row in range(self.details_table.rowCount()):
-            self.details_table.setRowHidden(row, False)
-
-        # Then apply each filter
-        for column_index, selected_values in self.active_filters.items():
-            for row in range(self.details_table.rowCount()):
-                if not self.details_table.isRowHidden(row):
-                    item = self.details_table.item(row, column_index)
-                    if item:
-                        self.details_table.setRowHidden(
-                            row, item.text() not in selected_values
-                        )
-
-        self._update_running_total()
+        # Filters are compiled into the model's SQL, so rows they exclude
+        # are never fetched, let alone hidden one by one
+        self._request_details(self.addr_selector.currentText())
 
     def clear_filters(self):
         # Clear all filters
         self.active_filters.clear()
+        self._apply_filters()
 
-        # Show all rows
-        for row in range(self.details_table.rowCount()):
-            self.details_table.setRowHidden(row, False)
+    @timed('load_details')
+    def load_details(self, address):
+        # A newly picked house starts unfiltered
+        self.active_filters.clear()
+        if self.details_table is None:
+            # The tab loads the picked house when it is first shown
+            return
+        self._request_details(address)
 
-        # Reset header styles
-        header = self.details_table.horizontalHeader()
-        header.setStyleSheet("")
+    def refresh_details(self):
+        # Same house and filters, but the rows changed underneath; the
+        # rows loaded are read again to update them in place if they
+        # still match
+        if self.details_table is None:
+            return
+        self._details_changed = True
+        self._request_details(
+            self.addr_selector.currentText(), self.details_model.loaded_ids())
+
+    def _request_details(self, address, loaded_ids=()):
+        # Superseded requests are dropped, so fast address switching only
+        # pays for the last address picked. The house is looked up inside
+        # the task, so filters applied while a switch is still pending
+        # land on the house being switched to.
+        self.executor.submit(
+            'details', self._query_details, self._show_details,
+            address, dict(self.active_filters), self.date_range, loaded_ids
+        )
 
+    def _query_details(self, address, filters, date_range, loaded_ids):
+        # Worker thread
+        house_id = self.ledger.house_id(address)
+        totals = self.details_model.query_totals(house_id, filters, date_range)
+        rows = self.details_model.query_rows(loaded_ids)
+        return house_id, filters, date_range, totals, rows
+
+    def _show_details(self, result):
+        house_id, filters, date_range, totals, rows = result
+        if self._details_changed and self.details_model.update_rows(
+                house_id, filters, date_range, totals, rows):
+            self._details_changed = False
+            self._update_running_total()
+            return
+        new_house = house_id != self.details_model.house_id
+        # Rows are paged in by the model as the view scrolls
+        self.details_model.show(
+            house_id, filters, totals, invalidate=self._details_changed,
+            date_range=date_range)
+        self._details_changed = False
         self._update_running_total()
+        if not new_house:
+            return
 
-    def load_details(self, address):
-        conn = self.db.connect()
-        cur = conn.cursor()
-        cur.execute(
-            'SELECT id FROM houses WHERE address = ?', (address,)
-        )
-        result = cur.fetchone()
-        rows = []
-        if result:
-            house_id = result[0]
-            cur.execute(
-                'SELECT id, date, type, category, expense, recipient, amount, payment'
-                ' FROM expenses WHERE house_id = ?',
-                (house_id,)
-            )
-            rows = cur.fetchall()
-        conn.close()
-        self.details_table.setRowCount(len(rows))
-        for row_index, row_data in enumerate(rows):
-            for col_index, value in enumerate(row_data):
-                item = QTableWidgetItem(str(value))
-                if col_index == 6:  # Amount column
-                    item.setTextAlignment(Qt.AlignRight)
-                    # Format amount with $ and commas
-                    try:
-                        amount = float(value)
-                        # For display, show positive numbers with + for income
-                        if amount >= 0:
-                            item.setText(f'+${amount:,.2f}')
-                        else:
-                            item.setText(f'-${abs(amount):,.2f}')
-                    except ValueError:
-                        pass
-                self.details_table.setItem(row_index, col_index, item)
-        
         # Resize columns to content after loading data
         self.details_table.resizeColumnsToContents()
         # Ensure minimum widths for better readability
@@ -607,220 +1074,135 @@ class MainWindow(QWidget):
             4: 200,  # Description
             5: 150,  # Recipient
             6: 100,  # Amount
-            7: 100   # Payment
+            7: 100,  # Payment
+            8: 100   # Balance
         }
         for col, min_width in min_widths.items():
             if self.details_table.columnWidth(col) < min_width:
                 self.details_table.setColumnWidth(col, min_width)
-        
-        self.load_summary()
-        self._update_running_total()
-        # Clear filters when loading new data
-        self.clear_filters()
 
+    @timed('_update_running_total')
     def _update_running_total(self):
-        total = 0.0
-        for row in range(self.details_table.rowCount()):
-            if not self.details_table.isRowHidden(row):
-                amount_item = self.details_table.item(row, 6)  # Amount column
-                if amount_item:
-                    try:
-                        amount = float(amount_item.text().replace('$', '').replace(',', ''))
-                        total += amount
-                    except ValueError:
-                        pass
-        self.running_total_label.setText(f'Net: ${total:,.2f}')
+        # The model sums the filtered rows in SQL when it resets
+        total = self.details_model.total_amount
+        self.running_total_label.setText(f'Net: {format_cents(total)}')
 
     def add_expense(self):
-        dialog = ExpenseFormDialog(self.db, self)
-        if dialog.exec():
-            self.load_addresses()
-            self.load_summary()
+        dialog = ExpenseFormDialog(self.ledger, self)
+        if not dialog.exec():
+            return
+        address = dialog.address_cb.currentText().strip()
+        # The date may fall outside the years offered so far, the new
+        # row may match the search, and it adds to a month's cash flow
+        self.refresher.mark_dirty('periods', 'search', 'cashflow')
+        if self.addr_selector.findText(address) < 0:
+            # A new house; listing it is enough, as it is not shown yet
+            self.refresher.mark_dirty('addresses', 'summary')
+        elif address == self.addr_selector.currentText():
+            self.refresher.mark_dirty('details', 'summary')
+        else:
+            self.refresher.mark_dirty('summary')
 
     def delete_expense(self):
-        row = self.details_table.currentRow()
-        if row < 0:
+        index = self.details_table.currentIndex()
+        if not index.isValid():
             QMessageBox.warning(
                 self, 'Error', 'Please select an expense to delete.'
             )
             return
-        expense_id = int(self.details_table.item(row, 0).text())
+        row = index.row()
+        expense_id = self.details_model.expense_id(row)
         reply = QMessageBox.question(
             self, 'Delete Expense',
             'Are you sure you want to delete this expense?',
             QMessageBox.Yes | QMessageBox.No
         )
         if reply == QMessageBox.Yes:
-            conn = self.db.connect()
-            cur = conn.cursor()
-            # Get expense data before deleting
-            cur.execute('SELECT * FROM expenses WHERE id = ?', (expense_id,))
-            expense_data = cur.fetchone()
-            if expense_data:
-                self.last_deleted = ('expense', expense_data)
-            cur.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
-            conn.commit()
-            conn.close()
-            current_address = self.addr_selector.currentText()
-            self.load_details(current_address)
+            self.executor.submit_write(
+                'delete', self.ledger.delete_transaction,
+                lambda deleted: self._on_expense_deleted(row, expense_id),
+                expense_id)
+
+    def _on_expense_deleted(self, row, expense_id):
+        model = self.details_model
+        if row < model.rowCount() and model.expense_id(row) == expense_id:
+            # Apply the deletion as a delta instead of reloading the house
+            model.remove_row(row)
+            self._update_running_total()
+        else:
+            # The view was reloaded meanwhile; the row may be anywhere
+            self.refresher.mark_dirty('details')
+        self.refresher.mark_dirty('summary', 'search', 'cashflow')
 
     def delete_address(self):
         address = self.addr_selector.currentText()
         reply = QMessageBox.question(
             self, 'Delete Address',
-            f'Are you sure you want to delete "{
-                address}" and all its expenses?',
+            f'Are you sure you want to delete "{address}" and all its expenses?',
             QMessageBox.Yes | QMessageBox.No
         )
         if reply == QMessageBox.Yes:
-            conn = self.db.connect()
-            cur = conn.cursor()
-            # Get house data before deleting
-            cur.execute('SELECT * FROM houses WHERE address = ?', (address,))
-            house_data = cur.fetchone()
-            if house_data:
-                # Get all expenses for this house
-                cur.execute(
-                    'SELECT * FROM expenses WHERE house_id = ?', (house_data[0],))
-                expenses_data = cur.fetchall()
-                self.last_deleted = ('address', (house_data, expenses_data))
-
-            cur.execute(
-                'DELETE FROM expenses WHERE house_id IN (SELECT id FROM houses WHERE address = ?)', (address,))
-            cur.execute('DELETE FROM houses WHERE address = ?', (address,))
-            conn.commit()
-            conn.close()
-            self.load_addresses()
-            self.load_summary()
+            self.executor.submit_write(
+                'delete', self.ledger.delete_house,
+                self._on_address_deleted, address)
+
+    def _on_address_deleted(self, deleted):
+        self.refresher.mark_dirty('addresses', 'summary', 'search', 'cashflow')
 
     def undo(self):
-        if not self.last_deleted:
-            QMessageBox.information(self, 'Undo', 'Nothing to undo')
+        # The journal is in the file, so this also undoes actions of
+        # earlier sessions
+        self.executor.submit_write(
+            'undo', self.ledger.undo,
+            lambda entry: self._on_replayed('Undo', entry))
+
+    def redo(self):
+        self.executor.submit_write(
+            'redo', self.ledger.redo,
+            lambda entry: self._on_replayed('Redo', entry))
+
+    def _on_replayed(self, title, entry):
+        if entry is None:
+            QMessageBox.information(self, title, f'Nothing to {title.lower()}')
             return
+        # Views reload as they do for another window's change
+        self._on_external_change(entry.house_ids, entry.houses_changed)
 
-        action_type, data = self.last_deleted
-
-        if action_type == 'expense':
-            conn = self.db.connect()
-            cur = conn.cursor()
-            cur.execute(
-                'INSERT OR IGNORE INTO expenses(id, house_id, date, expense, recipient, amount, payment) VALUES(?,?,?,?,?,?,?)',
-                data
-            )
-            conn.commit()
-            conn.close()
-            self.load_details(self.addr_selector.currentText())
-            self.load_summary()
-
-        elif action_type == 'address':
-            house_data, expenses_data = data
-            conn = self.db.connect()
-            cur = conn.cursor()
-            # Restore house
-            cur.execute(
-                'INSERT OR IGNORE INTO houses(id, address) VALUES(?,?)',
-                (house_data[0], house_data[1])
-            )
-            # Restore expenses
-            for expense in expenses_data:
-                cur.execute(
-                    'INSERT OR IGNORE INTO expenses(id, house_id, date, expense, recipient, amount, payment) VALUES(?,?,?,?,?,?,?)',
-                    expense
-                )
-            conn.commit()
-            conn.close()
-            self.load_addresses()
-            self.load_summary()
-
-        self.last_deleted = None
+    def _on_external_change(self, house_ids, houses_changed):
+        # Another window or process committed to this file
+        self.refresher.mark_dirty('summary', 'periods', 'search', 'cashflow')
+        if houses_changed:
+            self.refresher.mark_dirty('addresses')
+        if self.details_model.house_id in house_ids:
+            self.refresher.mark_dirty('details')
 
     def _show_category_summary(self, row, column):
         address = self.summary_table.item(row, 0).text()
-        dialog = QDialog(self)
-        dialog.setWindowTitle(f'Category Summary - {address}')
-        dialog.resize(400, 500)
-        layout = QVBoxLayout(dialog)
-
-        # Create table for category summary
-        table = QTableWidget()
-        table.setColumnCount(3)
-        table.setHorizontalHeaderLabels(['Category', 'Income', 'Expenses'])
-        table.setStyleSheet("""
-            QTableWidget { 
-                border: 1px solid #1a1a1a;
-                gridline-color: #3d3d3d;
-                background: #1a1a1a;
-                color: white;
-            }
-            QHeaderView::section {
-                background-color: #2d2d2d;
-                padding: 4px;
-                border: 1px solid #1a1a1a;
-                font-weight: bold;
-                color: white;
-            }
-            QTableWidget::item {
-                padding: 4px;
-            }
-            QTableWidget::item:selected {
-                background-color: #2a82da;
-                color: white;
-            }
-        """)
-
-        # Get category summary data
-        conn = self.db.connect()
-        cur = conn.cursor()
-        cur.execute('''
-            SELECT e.category,
-                   SUM(CASE WHEN e.type = 'income' THEN e.amount ELSE 0 END) as income,
-                   SUM(CASE WHEN e.type = 'expense' THEN ABS(e.amount) ELSE 0 END) as expenses
-            FROM houses h
-            JOIN expenses e ON h.id = e.house_id
-            WHERE h.address = ?
-            GROUP BY e.category
-            ORDER BY e.category
-        ''', (address,))
-        rows = cur.fetchall()
-        conn.close()
-
-        # Populate table
-        table.setRowCount(len(rows))
-        for row_idx, (category, income, expenses) in enumerate(rows):
-            table.setItem(row_idx, 0, QTableWidgetItem(category))
-            table.setItem(row_idx, 1, QTableWidgetItem(f'${income:,.2f}'))
-            table.setItem(row_idx, 2, QTableWidgetItem(f'${expenses:,.2f}'))
-
-        # Add totals row
-        total_income = sum(row[1] for row in rows)
-        total_expenses = sum(row[2] for row in rows)
-        net = total_income - total_expenses
-
-        table.setRowCount(len(rows) + 1)
-        table.setItem(len(rows), 0, QTableWidgetItem('TOTAL'))
-        table.setItem(len(rows), 1, QTableWidgetItem(f'${total_income:,.2f}'))
-        table.setItem(len(rows), 2, QTableWidgetItem(f'${total_expenses:,.2f}'))
-
-        # Add net row
-        table.setRowCount(len(rows) + 2)
-        table.setItem(len(rows) + 1, 0, QTableWidgetItem('NET'))
-        net_item = QTableWidgetItem(f'${net:,.2f}')
-        net_item.setForeground(QColor('green') if net >= 0 else QColor('red'))
-        table.setItem(len(rows) + 1, 1, net_item)
-
-        # Set column widths
-        table.horizontalHeader().setStretchLastSection(True)
-        for i in range(3):
-            table.setColumnWidth(i, 120)
-
-        layout.addWidget(table)
-
-        # Add close button
-        close_btn = QPushButton('Close')
-        close_btn.clicked.connect(dialog.accept)
-        layout.addWidget(close_btn)
-
-        dialog.exec()
+        period = self._period_label()
+        self.executor.submit(
+            'categories', self.ledger.category_totals,
+            lambda rows: self._show_category_dialog(address, period, rows),
+            address, self.date_range)
+
+    def _show_category_dialog(self, address, period, rows):
+        CategoryDialog(
+            f'Category Summary - {address} ({period})', rows, self).exec()
+
+    def verify_totals(self):
+        stale = self.db.verify_rollups()
+        if not stale:
+            QMessageBox.information(
+                self, 'Verify Totals', 'All totals are up to date.'
+            )
+            return
+        reply = QMessageBox.question(
+            self, 'Verify Totals',
+            f'Totals for {len(stale)} address(es) are out of date. Rebuild them now?',
+            QMessageBox.Yes | QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.db.rebuild_rollups()
+            self.refresher.mark_dirty('summary', 'cashflow')
 
     def _rename_address(self):
         current_address = self.addr_selector.currentText()
@@ -835,20 +1217,16 @@ class MainWindow(QWidget):
         )
 
         if ok and new_address and new_address != current_address:
-            conn = self.db.connect()
-            cur = conn.cursor()
             try:
-                cur.execute(
-                    'UPDATE houses SET address = ? WHERE address = ?',
-                    (new_address, current_address)
-                )
-                conn.commit()
-                self.load_addresses()
-                self.load_summary()
+                self.ledger.rename_house(current_address, new_address)
+                # Same house, so the details shown stay valid
+                self.addr_selector.blockSignals(True)
+                self.addr_selector.setItemText(
+                    self.addr_selector.currentIndex(), new_address)
+                self.addr_selector.blockSignals(False)
+                self.refresher.mark_dirty('addresses', 'summary', 'search', 'cashflow')
             except sqlite3.IntegrityError:
                 QMessageBox.warning(
                     self, 'Error',
                     'An address with that name already exists.'
                 )
-            finally:
-                conn.close()
@@ -0,0 +1,37 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+# Amounts are stored and summed as integer cents; dollars only appear
+# when parsing input and formatting output
+CENT = Decimal('0.01')
+
+
+def to_cents(value):
+    """Exact integer cents of an amount in dollars.
+
+    Takes a str, int, float or Decimal; '12.345' rounds half up to 1235.
+    Floats go through their shortest repr, so 0.1 is 10 cents rather
+    than its binary approximation. Raises ValueError for anything that
+    is not a number.
+    """
+    try:
+        dollars = Decimal(str(value).strip())
+        if not dollars.is_finite():
+            raise InvalidOperation
+    except InvalidOperation:
+        raise ValueError(f'not an amount: {value!r}') from None
+    return int(dollars.quantize(CENT, ROUND_HALF_UP).scaleb(2))
+
+
+def to_dollars(cents):
+    """Decimal dollars of integer cents, e.g. 1234 -> Decimal('12.34')."""
+    return Decimal(cents).scaleb(-2)
+
+
+def format_cents(cents, sign=False):
+    """1234567 -> '$12,345.67', -5 -> '-$0.05'; sign adds '+' to the rest."""
+    dollars, rest = divmod(abs(cents), 100)
+    text = f'${dollars:,}.{rest:02d}'
+    if cents < 0:
+        return '-' + text
+    return '+' + text if sign else text
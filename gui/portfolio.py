@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import NamedTuple
+from gui.db_utils import MIGRATIONS, STATEMENT_CACHE_SIZE, DBManager
+from gui.ledger import (
+    ALL_DATES, CategoryTotal, HouseSummary, category_totals_sql,
+    house_totals_sql
+)
+from gui.query_cache import QueryCache
+
+
+class PortfolioHouse(NamedTuple):
+    path: str
+    summary: HouseSummary
+
+
+class Portfolio:
+    """Several ledger files read together, one per client or entity.
+
+    The files are ATTACHed read-only to an in-memory connection, and a
+    report is one UNION ALL query with an arm per file, so a portfolio
+    comes back in a single round trip rather than one per file. SQLite
+    attaches at most SQLITE_LIMIT_ATTACHED files (10 in most builds) to
+    a connection; larger portfolios are split into that many per
+    connection and query.
+
+    Results are cached per file and only the files that changed since
+    are queried again: each file's PRAGMA data_version, which moves
+    whenever another connection commits to it, stamps its entries. Like
+    Ledger, the methods only use the calling thread's connections and
+    are safe to call from worker threads.
+    """
+
+    def __init__(self, paths):
+        # Each file once, in the order given
+        self.paths = list(dict.fromkeys(os.path.abspath(path) for path in paths))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        # path -> generation, bumped when the file is seen to change
+        self._generations = {}
+        self.cache = QueryCache()
+        self.queries = 0
+
+    def upgrade(self):
+        """Bring every file to the latest schema, as opening it in the
+        app would; the reports need its rollup tables."""
+        for path in self.paths:
+            if not os.path.exists(path):
+                # Opening it would create an empty ledger
+                raise FileNotFoundError(f'No such ledger: {path}')
+            db = DBManager(path)
+            try:
+                if db.schema_version() < len(MIGRATIONS):
+                    db.init_db()
+            finally:
+                db.close()
+
+    # Connections
+
+    def _batches(self):
+        """[(connection, [(schema, path)])] covering every file, for the
+        calling thread."""
+        batches = getattr(self._local, 'batches', None)
+        if batches is None:
+            batches = self._local.batches = []
+            self._local.versions = {}
+            remaining = list(self.paths)
+            while remaining:
+                conn = sqlite3.connect(
+                    ':memory:', uri=True,
+                    cached_statements=STATEMENT_CACHE_SIZE,
+                    check_same_thread=False)
+                with self._lock:
+                    self._connections.append(conn)
+                limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+                batch, remaining = remaining[:limit], remaining[limit:]
+                schemas = []
+                for index, path in enumerate(batch):
+                    schema = f'f{index}'
+                    conn.execute(f'ATTACH DATABASE ? AS {schema}',
+                                 (Path(path).as_uri() + '?mode=ro',))
+                    schemas.append((schema, path))
+                batches.append((conn, schemas))
+        return batches
+
+    def _generation(self, conn, schema, path):
+        # Another connection's commit moves data_version; the first check
+        # on a connection counts as a change, as nothing saw the file
+        # before it was attached
+        version = conn.execute(f'PRAGMA {schema}.data_version').fetchone()[0]
+        versions = self._local.versions
+        with self._lock:
+            if versions.get(path) != version:
+                versions[path] = version
+                self._generations[path] = self._generations.get(path, 0) + 1
+            return self._generations[path]
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+        self.cache.invalidate()
+
+    # Queries
+
+    def _per_file(self, build, paths=None):
+        """{path: rows} of the query build(schema) -> (sql, params) run
+        on each file in paths (default all), from the cache where the
+        file is unchanged. The query's first column must order its rows.
+        """
+        wanted = set(self.paths if paths is None else paths)
+        results = {}
+        for conn, schemas in self._batches():
+            stale = []
+            for schema, path in schemas:
+                if path not in wanted:
+                    continue
+                sql, params = build(schema)
+                key = (path, self._generation(conn, schema, path), sql, tuple(params))
+                rows = self.cache.get(key)
+                if rows is None:
+                    stale.append((schema, path, key))
+                else:
+                    results[path] = rows
+            if not stale:
+                continue
+            # One query for every changed file of the batch
+            arms, params = [], []
+            for index, (schema, _, key) in enumerate(stale):
+                arms.append(f'SELECT {index} AS file, * FROM ({key[2]})')
+                params.extend(key[3])
+            generation = self.cache.generation
+            rows = conn.execute(
+                ' UNION ALL '.join(arms) + ' ORDER BY 1, 2', params).fetchall()
+            with self._lock:
+                self.queries += 1
+            grouped = [[] for _ in stale]
+            for row in rows:
+                grouped[row[0]].append(row[1:])
+            for (_, path, key), file_rows in zip(stale, grouped):
+                file_rows = tuple(file_rows)
+                self.cache.put(key, generation, file_rows)
+                results[path] = file_rows
+        return results
+
+    def houses(self, date_range=ALL_DATES):
+        """[PortfolioHouse] of every house in every file, file by file
+        and in creation order within a file."""
+        results = self._per_file(
+            lambda schema: house_totals_sql(date_range, schema))
+        return [PortfolioHouse(path, HouseSummary._make(row[1:]))
+                for path in self.paths for row in results[path]]
+
+    def category_totals(self, date_range=ALL_DATES, path=None, address=None):
+        """[CategoryTotal] by category name, added up over every file,
+        or of one house when path and address are given."""
+        results = self._per_file(
+            lambda schema: category_totals_sql(address, date_range, schema),
+            None if path is None else [path])
+        totals = {}
+        for rows in results.values():
+            for category, income, expenses in rows:
+                total = totals.setdefault(category, [0, 0])
+                total[0] += income
+                total[1] += expenses
+        return [CategoryTotal(category, income, expenses)
+                for category, (income, expenses) in sorted(totals.items())]
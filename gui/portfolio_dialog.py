@@ -0,0 +1,165 @@
+import os
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget,
+    QTableWidgetItem, QAbstractItemView, QFileDialog, QListWidget, QLabel,
+    QSplitter, QWidget
+)
+from PySide6.QtCore import Qt
+from gui.category_dialog import CategoryDialog
+from gui.money import format_cents
+from gui.portfolio import Portfolio
+
+
+class PortfolioDialog(QDialog):
+    """Every house of several ledger files in one table, for an owner
+    who keeps a file per client or entity.
+
+    The reports run on the window's executor like its own views; see
+    Portfolio for how the files are read together.
+    """
+
+    HEADERS = ['File', 'Address', 'Income', 'Expenses', 'Net']
+
+    def __init__(self, executor, paths, date_range, period, parent=None):
+        super().__init__(parent)
+        self.executor = executor
+        self.date_range = date_range
+        self.period = period
+        self.portfolio = None
+        self.houses = []
+        self.setWindowTitle(f'Portfolio ({period})')
+        self.resize(900, 600)
+        layout = QVBoxLayout(self)
+
+        splitter = QSplitter(Qt.Vertical)
+        files_widget = QWidget()
+        files_layout = QHBoxLayout(files_widget)
+        files_layout.setContentsMargins(0, 0, 0, 0)
+        self.file_list = QListWidget()
+        self.file_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        files_layout.addWidget(self.file_list)
+        file_buttons = QVBoxLayout()
+        add_btn = QPushButton('Add Files…')
+        add_btn.clicked.connect(self._add_files)
+        file_buttons.addWidget(add_btn)
+        remove_btn = QPushButton('Remove')
+        remove_btn.clicked.connect(self._remove_files)
+        file_buttons.addWidget(remove_btn)
+        file_buttons.addStretch()
+        files_layout.addLayout(file_buttons)
+        splitter.addWidget(files_widget)
+
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setAlternatingRowColors(True)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 200)
+        self.table.setColumnWidth(1, 250)
+        self.table.cellDoubleClicked.connect(self._show_house_categories)
+        splitter.addWidget(self.table)
+        splitter.setStretchFactor(1, 1)
+        layout.addWidget(splitter)
+
+        bottom = QHBoxLayout()
+        categories_btn = QPushButton('Categories…')
+        categories_btn.clicked.connect(self._show_categories)
+        bottom.addWidget(categories_btn)
+        refresh_btn = QPushButton('Refresh')
+        refresh_btn.clicked.connect(self.refresh)
+        bottom.addWidget(refresh_btn)
+        bottom.addStretch()
+        self.total_label = QLabel()
+        self.total_label.setObjectName('totalLabel')
+        bottom.addWidget(self.total_label)
+        layout.addLayout(bottom)
+
+        close_btn = QPushButton('Close')
+        close_btn.clicked.connect(self.accept)
+        layout.addWidget(close_btn)
+
+        self._set_paths(paths)
+
+    def paths(self):
+        return [self.file_list.item(i).text()
+                for i in range(self.file_list.count())]
+
+    def _set_paths(self, paths):
+        self._close_portfolio()
+        self.portfolio = portfolio = Portfolio(paths)
+        self.file_list.clear()
+        self.file_list.addItems(portfolio.paths)
+        # Files from older versions get their rollups first, as the
+        # window would on opening them; reports wait for that
+        self.executor.submit_write(
+            'portfolio-upgrade', portfolio.upgrade,
+            lambda _: self.refresh() if portfolio is self.portfolio else None)
+
+    def _close_portfolio(self):
+        if self.portfolio is None:
+            return
+        self.executor.cancel('portfolio')
+        self.executor.cancel('portfolio-categories')
+        # Nothing may still be reading its connections
+        self.executor.wait()
+        self.portfolio.close()
+        self.portfolio = None
+
+    def _add_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(
+            self, 'Add to Portfolio', '', 'Database Files (*.db)')
+        if paths:
+            self._set_paths(self.paths() + paths)
+
+    def _remove_files(self):
+        selected = {item.text() for item in self.file_list.selectedItems()}
+        if selected:
+            self._set_paths(
+                [path for path in self.paths() if path not in selected])
+
+    def refresh(self):
+        self.executor.submit(
+            'portfolio', self.portfolio.houses, self._show_houses,
+            self.date_range)
+
+    def _show_houses(self, houses):
+        self.houses = houses
+        self.table.setRowCount(len(houses))
+        for row, house in enumerate(houses):
+            summary = house.summary
+            file_item = QTableWidgetItem(os.path.basename(house.path))
+            file_item.setToolTip(house.path)
+            self.table.setItem(row, 0, file_item)
+            self.table.setItem(row, 1, QTableWidgetItem(summary.address))
+            for column, cents in enumerate(
+                    (summary.income, abs(summary.expenses), summary.net), 2):
+                item = QTableWidgetItem(format_cents(cents))
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+        income = sum(house.summary.income for house in houses)
+        expenses = sum(house.summary.expenses for house in houses)
+        self.total_label.setText(
+            f'{len(self.portfolio.paths)} files, {len(houses)} houses — '
+            f'Net: {format_cents(income + expenses)} (Income: '
+            f'{format_cents(income)}, Expenses: {format_cents(abs(expenses))})')
+
+    def _show_categories(self):
+        title = f'Category Summary - Portfolio ({self.period})'
+        self.executor.submit(
+            'portfolio-categories', self.portfolio.category_totals,
+            lambda rows: CategoryDialog(title, rows, self).exec(),
+            self.date_range)
+
+    def _show_house_categories(self, row, column):
+        house = self.houses[row]
+        title = (f'Category Summary - {house.summary.address}, '
+                 f'{os.path.basename(house.path)} ({self.period})')
+        self.executor.submit(
+            'portfolio-categories', self.portfolio.category_totals,
+            lambda rows: CategoryDialog(title, rows, self).exec(),
+            self.date_range, house.path, house.summary.address)
+
+    def done(self, result):
+        self._close_portfolio()
+        super().done(result)
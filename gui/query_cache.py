@@ -0,0 +1,89 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+# Default budget for cached result rows, as estimated by result_size()
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def result_size(rows):
+    """Rough bytes held by a result: the tuples and the values in them.
+
+    Interned and shared values are counted once per reference, so this
+    errs on the high side.
+    """
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        for value in row:
+            size += sys.getsizeof(value)
+    return size
+
+
+class QueryCache:
+    """Least-recently-used cache of query results, bounded by memory.
+
+    Entries are keyed by (sql, params) and stamped with the data
+    generation they were read at; an entry from an older generation is
+    never returned, so a result read before a change and stored after
+    it is dropped too. Callers invalidate() whenever the database may
+    have changed. Safe to share between threads.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # (sql, params) -> (generation, rows, size), oldest use first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the cached rows for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != self.generation:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, generation, rows):
+        """Cache rows read at generation, evicting the least recently
+        used entries to stay within max_bytes."""
+        size = result_size(rows)
+        with self._lock:
+            if generation != self.generation or size > self.max_bytes:
+                # Already stale, or would push out everything else
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (generation, rows, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self):
+        """Forget every entry; results read before this are stale."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'cache_entries': len(self._entries),
+                'cache_bytes': self._bytes,
+                'cache_hits': self.hits,
+                'cache_misses': self.misses,
+                'cache_evictions': self.evictions,
+            }
@@ -0,0 +1,161 @@
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from time import perf_counter
+from PySide6.QtCore import QObject, Qt, Signal
+from gui.instrumentation import instrumentation
+
+
+class _Relay(QObject):
+    # Emitted from pool threads; always delivered queued on the GUI thread
+    finished = Signal(object, object)
+    failed = Signal(object, object)
+
+
+class QueryExecutor(QObject):
+    """Runs database work on worker threads, off the GUI thread.
+
+    Reads are submitted under a key such as 'summary' or 'details'. A new
+    read supersedes the previous one for the same key: if that one has
+    not started it is cancelled, otherwise its result is discarded when
+    it arrives. Writes are never superseded or cancelled; they run one at
+    a time in submission order and their callbacks always run.
+
+    Callbacks run on the GUI thread. The pool threads are plain Python
+    threads that live as long as the executor, so the thread-local
+    connection DBManager opens for each of them is reused.
+    """
+
+    busy_changed = Signal(bool)
+    error = Signal(str, object)
+
+    def __init__(self, parent=None, max_threads=2):
+        super().__init__(parent)
+        self._reads = ThreadPoolExecutor(
+            max_threads, thread_name_prefix='db-read')
+        self._writes = ThreadPoolExecutor(1, thread_name_prefix='db-write')
+        self._relay = _Relay(self)
+        self._relay.finished.connect(self._on_finished, Qt.QueuedConnection)
+        self._relay.failed.connect(self._on_failed, Qt.QueuedConnection)
+        self._serial = 0
+        # key -> (ticket, callback) of the latest read
+        self._current = {}
+        # ticket -> callback of every write not yet reported
+        self._write_callbacks = {}
+        # ticket -> future of everything submitted and not yet reported
+        self._inflight = {}
+        # ticket -> submit time, kept while instrumentation is on
+        self._submitted = {}
+
+    def submit(self, key, fn, callback, *args):
+        """Run the read fn(*args) and pass its result to callback."""
+        self.cancel(key)
+        ticket = self._ticket(key)
+        self._current[key] = (ticket, callback)
+        self._start(self._reads, ticket, fn, args)
+
+    def submit_write(self, key, fn, callback, *args):
+        """Run fn(*args), which changes the database; see the class doc."""
+        ticket = self._ticket(key)
+        self._write_callbacks[ticket] = callback
+        self._start(self._writes, ticket, fn, args)
+
+    def cancel(self, key):
+        """Drop the pending read for key, if any."""
+        entry = self._current.pop(key, None)
+        if entry is None:
+            return
+        ticket = entry[0]
+        future = self._inflight.get(ticket)
+        if future is not None and future.cancel():
+            # Never started, so it will not report back
+            self._untrack(ticket)
+
+    def cancel_all(self):
+        for key in list(self._current):
+            self.cancel(key)
+
+    def wait(self):
+        """Block until submitted work is done.
+
+        Pending reads are cancelled and their results dropped; writes all
+        run to completion and their callbacks still run afterwards.
+        """
+        self.cancel_all()
+        wait_futures(list(self._inflight.values()))
+
+    def is_busy(self):
+        return bool(self._inflight)
+
+    def _ticket(self, key):
+        self._serial += 1
+        return key, self._serial
+
+    def _start(self, pool, ticket, fn, args):
+        if instrumentation.enabled:
+            self._submitted[ticket] = perf_counter()
+            future = pool.submit(_timed_call, ticket[0], fn, args)
+        else:
+            future = pool.submit(fn, *args)
+        self._track(ticket, future)
+        future.add_done_callback(lambda f: self._report(ticket, f))
+
+    def _report(self, ticket, future):
+        # Pool thread, or the GUI thread for a cancelled future
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            self._relay.failed.emit(ticket, exc)
+        else:
+            self._relay.finished.emit(ticket, future.result())
+
+    def _track(self, ticket, future):
+        was_busy = self.is_busy()
+        self._inflight[ticket] = future
+        if not was_busy:
+            self.busy_changed.emit(True)
+
+    def _untrack(self, ticket):
+        self._inflight.pop(ticket, None)
+        self._submitted.pop(ticket, None)
+        if not self.is_busy():
+            self.busy_changed.emit(False)
+
+    def _take_callback(self, ticket):
+        # Returns the callback if ticket is a write or still the latest
+        # read for its key
+        self._untrack(ticket)
+        if ticket in self._write_callbacks:
+            return self._write_callbacks.pop(ticket)
+        entry = self._current.get(ticket[0])
+        if entry is None or entry[0] != ticket:
+            return None
+        del self._current[ticket[0]]
+        return entry[1]
+
+    def _on_finished(self, ticket, result):
+        submitted = self._submitted.get(ticket)
+        callback = self._take_callback(ticket)
+        if callback is None:
+            return
+        if submitted is None or not instrumentation.enabled:
+            callback(result)
+            return
+        start = perf_counter()
+        callback(result)
+        end = perf_counter()
+        # GUI-thread update, and submit-to-screen time
+        instrumentation.record('update', ticket[0], end - start)
+        instrumentation.record('latency', ticket[0], end - submitted)
+
+    def _on_failed(self, ticket, exc):
+        if self._take_callback(ticket) is not None:
+            self.error.emit(ticket[0], exc)
+
+
+def _timed_call(key, fn, args):
+    # Pool thread; the query's own run time, without queueing
+    start = perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        instrumentation.record('query', key, perf_counter() - start)
@@ -0,0 +1,46 @@
+from PySide6.QtCore import QObject, QTimer
+
+
+class RefreshScheduler(QObject):
+    """Coalesces view refreshes into one pass per event-loop tick.
+
+    Each view registers the function that reloads it under a name such
+    as 'summary'. Code that changes data marks the views showing that
+    data dirty instead of reloading them itself; however many times a
+    view is marked before control returns to the event loop, it is
+    reloaded once. Dirty views are refreshed in registration order.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # name -> refresh function, in registration order
+        self._views = {}
+        self._dirty = set()
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self.flush)
+
+    def register(self, name, refresh):
+        self._views[name] = refresh
+
+    def mark_dirty(self, *names):
+        """Refresh the named views on the next pass of the event loop."""
+        for name in names:
+            if name not in self._views:
+                raise KeyError(f'No view registered as {name!r}')
+        self._dirty.update(names)
+        if self._dirty and not self._timer.isActive():
+            self._timer.start()
+
+    def is_dirty(self, name):
+        return name in self._dirty
+
+    def flush(self):
+        """Refresh every dirty view now."""
+        self._timer.stop()
+        # Views marked while these refresh wait for the next pass
+        dirty, self._dirty = self._dirty, set()
+        for name, refresh in self._views.items():
+            if name in dirty:
+                refresh()
@@ -0,0 +1,43 @@
+import os
+from PySide6.QtGui import QColor, QPalette
+from PySide6.QtWidgets import QStyleFactory
+
+
+STYLE_SHEET = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'resources', 'style.qss')
+
+
+def dark_palette():
+    palette = QPalette()
+    palette.setColor(QPalette.Window, QColor(53, 53, 53))
+    palette.setColor(QPalette.WindowText, QColor(255, 255, 255))
+    palette.setColor(QPalette.Base, QColor(25, 25, 25))
+    palette.setColor(QPalette.AlternateBase, QColor(53, 53, 53))
+    palette.setColor(QPalette.ToolTipBase, QColor(25, 25, 25))
+    palette.setColor(QPalette.ToolTipText, QColor(255, 255, 255))
+    palette.setColor(QPalette.Text, QColor(255, 255, 255))
+    palette.setColor(QPalette.Button, QColor(53, 53, 53))
+    palette.setColor(QPalette.ButtonText, QColor(255, 255, 255))
+    palette.setColor(QPalette.BrightText, QColor(255, 255, 255))
+    palette.setColor(QPalette.Link, QColor(42, 130, 218))
+    palette.setColor(QPalette.Highlight, QColor(42, 130, 218))
+    palette.setColor(QPalette.HighlightedText, QColor(255, 255, 255))
+    return palette
+
+
+def apply_theme(app):
+    """Give the whole application the Fusion dark theme.
+
+    The stylesheet is set once on the application, so Qt parses it once
+    and every widget and dialog shares it; a stylesheet set on a widget
+    is parsed again for each widget it is set on. Calling this again is
+    a no-op.
+    """
+    if app.property('themed'):
+        return
+    app.setStyle(QStyleFactory.create('Fusion'))
+    app.setPalette(dark_palette())
+    with open(STYLE_SHEET, encoding='utf-8') as f:
+        app.setStyleSheet(f.read())
+    app.setProperty('themed', True)
@@ -0,0 +1,135 @@
+from typing import NamedTuple
+
+
+# Columns of an expenses row as journaled for undo, in insert order
+EXPENSE_FIELDS = (
+    'id', 'house_id', 'date', 'type', 'category', 'expense', 'recipient',
+    'amount', 'payment'
+)
+_EXPENSE_COLUMNS = ', '.join(EXPENSE_FIELDS)
+_EXPENSE_PLACEHOLDERS = ', '.join('?' * len(EXPENSE_FIELDS))
+_EXPENSE_UPDATES = ', '.join(
+    f'{field} = excluded.{field}' for field in EXPENSE_FIELDS[1:])
+
+# Which side of an action a journaled row shows
+BEFORE = 'before'
+AFTER = 'after'
+
+
+class JournalEntry(NamedTuple):
+    """An action undone or redone, and what it touched."""
+    label: str
+    # Houses whose transactions changed
+    house_ids: set
+    # Whether a house was added, renamed or removed
+    houses_changed: bool
+
+
+class UndoJournal:
+    """Undo and redo history of a ledger file, kept in the file itself.
+
+    Each action journals the houses and expenses rows it changes as they
+    were before it and as they are after it, in the action's own
+    transaction, so the history can never disagree with the data. The
+    rows are copied with INSERT ... SELECT and replayed with one
+    executemany() per table, fed by a cursor over the journal, so even undoing the
+    deletion of a house with years of transactions never holds them in
+    memory. Nothing limits how far back undo goes; recording a new
+    action forgets what was undone before it, as redo no longer applies.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def begin(self, label):
+        """Start journaling an action; return its id for
+        record_houses() and record_expenses()."""
+        self._forget_undone()
+        return self.db.execute(
+            'INSERT INTO undo_actions(label) VALUES(?)', (label,)).lastrowid
+
+    def record_houses(self, action_id, phase, where, params=()):
+        """Journal the houses matching where as they are now, on the
+        phase (BEFORE or AFTER) side of the action."""
+        self.db.execute(f'''
+            INSERT INTO undo_houses(action_id, phase, id, address)
+            SELECT ?, ?, id, address FROM houses WHERE {where}
+        ''', (action_id, phase) + tuple(params))
+
+    def record_expenses(self, action_id, phase, where, params=()):
+        """Like record_houses(), for the expenses matching where."""
+        self.db.execute(f'''
+            INSERT INTO undo_expenses(action_id, phase, {_EXPENSE_COLUMNS})
+            SELECT ?, ?, {_EXPENSE_COLUMNS} FROM expenses WHERE {where}
+        ''', (action_id, phase) + tuple(params))
+
+    def _forget_undone(self):
+        undone = 'SELECT id FROM undo_actions WHERE undone'
+        self.db.execute(f'DELETE FROM undo_houses WHERE action_id IN ({undone})')
+        self.db.execute(f'DELETE FROM undo_expenses WHERE action_id IN ({undone})')
+        self.db.execute('DELETE FROM undo_actions WHERE undone')
+
+    # Undo and redo
+
+    def undo(self):
+        """Undo the latest action not undone yet; return its
+        JournalEntry, or None if there is nothing to undo."""
+        with self.db.transaction():
+            action = self.db.query_one(
+                'SELECT id, label FROM undo_actions WHERE NOT undone'
+                ' ORDER BY id DESC LIMIT 1')
+            if action is None:
+                return None
+            self._replay(action[0], BEFORE, AFTER)
+            self.db.execute(
+                'UPDATE undo_actions SET undone = 1 WHERE id = ?', (action[0],))
+            return self._entry(*action)
+
+    def redo(self):
+        """Redo the earliest undone action; return its JournalEntry, or
+        None if there is nothing to redo."""
+        with self.db.transaction():
+            action = self.db.query_one(
+                'SELECT id, label FROM undo_actions WHERE undone'
+                ' ORDER BY id LIMIT 1')
+            if action is None:
+                return None
+            self._replay(action[0], AFTER, BEFORE)
+            self.db.execute(
+                'UPDATE undo_actions SET undone = 0 WHERE id = ?', (action[0],))
+            return self._entry(*action)
+
+    def _replay(self, action_id, restore, discard):
+        # Bring back the rows of the restore side, then remove those only
+        # the discard side has; houses go in before and out after their
+        # expenses. Rows are upserted by id, so a renamed house keeps its
+        # expenses.
+        self.db.executemany('''
+            INSERT INTO houses(id, address) VALUES(?, ?)
+            ON CONFLICT(id) DO UPDATE SET address = excluded.address
+        ''', self.db.execute(
+            'SELECT id, address FROM undo_houses'
+            ' WHERE action_id = ? AND phase = ?', (action_id, restore)))
+        self.db.executemany(f'''
+            INSERT INTO expenses({_EXPENSE_COLUMNS})
+            VALUES({_EXPENSE_PLACEHOLDERS})
+            ON CONFLICT(id) DO UPDATE SET {_EXPENSE_UPDATES}
+        ''', self.db.execute(
+            f'SELECT {_EXPENSE_COLUMNS} FROM undo_expenses'
+            ' WHERE action_id = ? AND phase = ?', (action_id, restore)))
+        for table in ('expenses', 'houses'):
+            self.db.execute(f'''
+                DELETE FROM {table} WHERE id IN (
+                    SELECT id FROM undo_{table} WHERE action_id = ? AND phase = ?
+                    EXCEPT
+                    SELECT id FROM undo_{table} WHERE action_id = ? AND phase = ?)
+            ''', (action_id, discard, action_id, restore))
+
+    def _entry(self, action_id, label):
+        house_ids = {house_id for (house_id,) in self.db.query_all(
+            'SELECT DISTINCT house_id FROM undo_expenses'
+            ' WHERE action_id = ? AND house_id IS NOT NULL', (action_id,))}
+        houses_changed = self.db.query_one(
+            'SELECT 1 FROM undo_houses WHERE action_id = ? LIMIT 1',
+            (action_id,)) is not None
+        return JournalEntry(label, house_ids, houses_changed)
@@ -0,0 +1,36 @@
+import argparse
+import sys
+from gui.db_utils import DBManager
+from gui.importer import import_files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Import CSV or OFX statements into a tracker database.')
+    parser.add_argument('database', help='SQLite database file')
+    parser.add_argument('files', nargs='+', help='CSV, OFX or QFX files')
+    parser.add_argument(
+        '--address',
+        help='address for rows without one (required for OFX files)')
+    args = parser.parse_args(argv)
+
+    db = DBManager(args.database)
+    db.init_db()
+
+    def progress(count):
+        print(f'\rImported {count:,} rows', end='', file=sys.stderr)
+
+    try:
+        count = import_files(db, args.files, args.address, progress)
+    except (OSError, ValueError) as exc:
+        print(f'\nImport failed, nothing was saved: {exc}', file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print(f'\rImported {count:,} rows from {len(args.files)} file(s)',
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import gzip
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from gui.backup import (
+    BackupCancelled, backup_database, database_signature, list_snapshots,
+    write_snapshot
+)
+from gui.db_utils import DBManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DBManager(str(tmp_path / 'ledger.db'))
+    db.init_db()
+    with db.transaction():
+        db.execute("INSERT INTO houses(address) VALUES('a')")
+        db.executemany(
+            "INSERT INTO expenses(house_id, date, type, expense, amount)"
+            " VALUES(1, '2024-01-01', 'expense', ?, -1)",
+            ((str(i) * 50,) for i in range(3000)))
+    yield db
+    db.close()
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute('PRAGMA integrity_check').fetchone() == ('ok',)
+        return conn.execute('SELECT COUNT(*) FROM expenses').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_backup_copies_the_snapshot_it_started_from(db, tmp_path):
+    target = str(tmp_path / 'copy.db')
+    reports = []
+
+    def progress(done, total):
+        reports.append((done, total))
+        # Commits during the copy are not in it and do not restart it
+        with db.transaction():
+            db.execute("INSERT INTO expenses(house_id, type, amount)"
+                       " VALUES(1, 'expense', -1)")
+
+    backup_database(db.path, target, progress, pages=16)
+    assert count_rows(target) == 3000
+    assert len(reports) > 2
+    assert [done for done, _ in reports] == sorted(done for done, _ in reports)
+    assert reports[-1][0] == reports[-1][1]
+    assert sorted(os.listdir(tmp_path)) == ['copy.db', 'ledger.db', 'ledger.db-shm',
+                                            'ledger.db-wal']
+
+
+def test_cancelled_backup_keeps_the_earlier_file(db, tmp_path):
+    target = tmp_path / 'copy.db'
+    target.write_bytes(b'earlier')
+
+    def progress(done, total):
+        raise BackupCancelled()
+
+    with pytest.raises(BackupCancelled):
+        backup_database(db.path, str(target), progress, pages=16)
+    assert target.read_bytes() == b'earlier'
+    assert not os.path.exists(str(target) + '.part')
+
+
+def test_snapshots_are_compressed_and_rotated(db, tmp_path):
+    directory = str(tmp_path / 'backups')
+    start = datetime(2024, 5, 1, 12, 0, 0)
+    paths = [write_snapshot(db.path, directory, keep=2,
+                            when=start + timedelta(hours=hour))
+             for hour in range(3)]
+
+    assert list_snapshots(directory, db.path) == paths[1:]
+    assert os.path.basename(paths[-1]) == 'ledger-20240501-140000.db.gz'
+    restored = str(tmp_path / 'restored.db')
+    with gzip.open(paths[-1]) as src, open(restored, 'wb') as dst:
+        dst.write(src.read())
+    assert count_rows(restored) == 3000
+    assert os.path.getsize(paths[-1]) < os.path.getsize(restored) / 3
+    assert sorted(os.listdir(directory)) == [os.path.basename(p) for p in paths[1:]]
+
+
+def test_signature_follows_commits(db):
+    before = database_signature(db.path)
+    assert database_signature(db.path) == before
+    with db.transaction():
+        db.execute("INSERT INTO houses(address) VALUES('b')")
+    assert database_signature(db.path) != before
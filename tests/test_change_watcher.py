@@ -0,0 +1,85 @@
+import time
+
+import pytest
+from PySide6.QtCore import QCoreApplication
+
+from gui.change_watcher import ChangeWatcher
+from gui.db_utils import DBManager
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DBManager(str(tmp_path / 'test.db'))
+    db.init_db()
+    with db.transaction():
+        db.execute("INSERT INTO houses(address) VALUES('a'), ('b')")
+        db.execute(
+            "INSERT INTO expenses(house_id, date, type, amount)"
+            " VALUES(1, '2024-01-01', 'expense', -100), (2, '2024-01-01', 'expense', -5)")
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def other(db):
+    # Another window's connection to the same file
+    other = DBManager(db.path)
+    yield other
+    other.close()
+
+
+class InlineExecutor:
+    # Runs reads on the calling thread as they are submitted
+    def submit(self, key, fn, callback, *args):
+        callback(fn(*args))
+
+    def cancel(self, key):
+        pass
+
+
+def test_database_is_in_wal_mode_and_readers_do_not_wait(db, other):
+    assert db.journal_mode == 'wal'
+    with other.transaction():
+        other.execute("INSERT INTO houses(address) VALUES('c')")
+        # The writer holds its lock; reading neither waits nor sees it
+        start = time.monotonic()
+        assert db.query_all('SELECT address FROM houses ORDER BY id') == [('a',), ('b',)]
+        assert time.monotonic() - start < 1
+    assert db.query_all('SELECT COUNT(*) FROM houses') == [(3,)]
+
+
+def test_reports_houses_changed_by_other_connections(app, db, other):
+    watcher = ChangeWatcher(db, InlineExecutor())
+    reports = []
+    watcher.changed.connect(lambda ids, houses: reports.append((ids, houses)))
+    watcher.start()
+    watcher.poll()
+    assert reports == []
+
+    with other.transaction():
+        other.execute("UPDATE expenses SET expense = 'roof' WHERE house_id = 2")
+    watcher.poll()
+    assert reports == [({2}, False)]
+
+    with other.transaction():
+        other.execute("UPDATE houses SET address = 'c' WHERE id = 1")
+    watcher.poll()
+    assert reports[1:] == [(set(), True)]
+    watcher.stop()
+
+
+def test_own_connection_commits_are_not_reported(app, db):
+    watcher = ChangeWatcher(db, InlineExecutor())
+    reports = []
+    watcher.changed.connect(lambda ids, houses: reports.append((ids, houses)))
+    watcher.start()
+    with db.transaction():
+        db.execute("DELETE FROM expenses WHERE house_id = 1")
+    watcher.poll()
+    assert reports == []
+    watcher.stop()
@@ -0,0 +1,55 @@
+import csv
+import sqlite3
+
+import pytest
+
+from gui import exporter
+from gui.exporter import export_rows
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE t (n INTEGER, label TEXT)')
+    conn.executemany('INSERT INTO t VALUES (?, ?)',
+                     ((n, f'row {n}') for n in range(12)))
+    yield conn
+    conn.close()
+
+
+def test_csv_export_streams_in_chunks(conn, tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, 'CHUNK_SIZE', 5)
+    path = str(tmp_path / 'out.csv')
+    seen = []
+
+    count = export_rows(path, ['N', 'Label'],
+                        conn.execute('SELECT n, label FROM t ORDER BY n'),
+                        seen.append)
+
+    assert count == 12
+    assert seen == [5, 10, 12]
+    with open(path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['N', 'Label']
+    assert rows[1:] == [[str(n), f'row {n}'] for n in range(12)]
+
+
+def test_failed_export_leaves_no_file(conn, tmp_path):
+    path = tmp_path / 'out.csv'
+
+    def fail(count):
+        raise RuntimeError('disk full')
+    with pytest.raises(RuntimeError):
+        export_rows(str(path), ['N'], conn.execute('SELECT n FROM t'), fail)
+    assert not path.exists()
+
+
+def test_xlsx_export(conn, tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    path = str(tmp_path / 'out.xlsx')
+
+    assert export_rows(path, ['N', 'Label'],
+                       conn.execute('SELECT n, label FROM t ORDER BY n')) == 12
+    sheet = openpyxl.load_workbook(path).active
+    assert [cell.value for cell in sheet[1]] == ['N', 'Label']
+    assert [cell.value for cell in sheet[13]] == [11, 'row 11']
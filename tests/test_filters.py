@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+from gui.expense_model import AMOUNT_COLUMN, compile_filters
+
+CATEGORY_COLUMN = 3
+PAYMENT_COLUMN = 7
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute(
+        'CREATE TABLE expenses (id INTEGER PRIMARY KEY, house_id INTEGER,'
+        ' date TEXT, type TEXT, category TEXT, expense TEXT,'
+        ' recipient TEXT, amount REAL, payment TEXT)')
+    conn.executemany(
+        'INSERT INTO expenses(id, category, amount, payment)'
+        ' VALUES(?, ?, ?, ?)',
+        [
+            (1, 'Repairs', -100.0, 'Cash'),
+            (2, 'Taxes', -250.5, 'Check'),
+            (3, None, 1000.0, 'Cash'),
+            (4, 'Repairs', 1000.0, None),
+            (5, '', -5.0, 'Check'),
+        ])
+    yield conn
+    conn.close()
+
+
+def matching_ids(conn, filters):
+    where, params = compile_filters(filters)
+    return [expense_id for (expense_id,) in conn.execute(
+        f'SELECT id FROM expenses WHERE {where} ORDER BY id', params)]
+
+
+def test_statement_text_does_not_depend_on_value_count():
+    one, _ = compile_filters({CATEGORY_COLUMN: ['Repairs']})
+    many, params = compile_filters(
+        {CATEGORY_COLUMN: ['Repairs', 'Taxes', 'Utilities']})
+    assert one == many
+    assert len(params) == 1
+
+
+def test_columns_are_combined_in_column_order():
+    where, params = compile_filters(
+        {PAYMENT_COLUMN: ['Cash'], CATEGORY_COLUMN: ['Repairs']})
+    assert where.index('category') < where.index('payment')
+    assert len(params) == 2
+
+
+def test_text_values(conn):
+    assert matching_ids(conn, {CATEGORY_COLUMN: {'Repairs', 'Taxes'}}) == [1, 2, 4]
+
+
+def test_none_matches_null_but_not_empty_string(conn):
+    assert matching_ids(conn, {CATEGORY_COLUMN: {None}}) == [3]
+    assert matching_ids(conn, {CATEGORY_COLUMN: {None, 'Taxes'}}) == [2, 3]
+    assert matching_ids(conn, {CATEGORY_COLUMN: {''}}) == [5]
+
+
+def test_numeric_values(conn):
+    assert matching_ids(conn, {AMOUNT_COLUMN: {1000.0}}) == [3, 4]
+    assert matching_ids(conn, {AMOUNT_COLUMN: {-250.5, -5.0}}) == [2, 5]
+
+
+def test_filters_on_several_columns_intersect(conn):
+    filters = {CATEGORY_COLUMN: {'Repairs', None}, PAYMENT_COLUMN: {'Cash', None}}
+    assert matching_ids(conn, filters) == [1, 3, 4]
+
@@ -0,0 +1,91 @@
+import pytest
+
+from gui.db_utils import DBManager
+from gui.importer import (
+    ImportCancelled, import_files, import_records, parse_amount, parse_date
+)
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DBManager(str(tmp_path / 'test.db'))
+    manager.init_db()
+    yield manager
+    manager.close()
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def expenses(db):
+    return db.query_all(
+        'SELECT h.address, e.date, e.type, e.category, e.expense,'
+        ' e.recipient, e.amount, e.payment'
+        ' FROM expenses e JOIN houses h ON h.id = e.house_id ORDER BY e.id')
+
+
+def test_parse_amount_and_date():
+    assert parse_amount('$1,234.50') == 123450
+    assert parse_amount('(12.00)') == -1200
+    assert parse_amount('0.1') + parse_amount('0.2') == parse_amount('0.3')
+    assert parse_date('01/15/2024') == '2024-01-15'
+    assert parse_date('20240115120000[-5:EST]') == '2024-01-15'
+
+
+def test_csv_import_resolves_and_creates_houses(db, tmp_path):
+    with db.transaction():
+        db.execute("INSERT INTO houses(address) VALUES('1 Main St')")
+    path = write(tmp_path, 'rows.csv',
+                 'Address,Date,Category,Description,Payee,Amount,Payment\n'
+                 '1 Main St,2024-01-02,Repairs,Sink,Plumber,-80,Check\n'
+                 '2 Oak Ave,01/03/2024,Rents received,Jan,Tenant,"$1,200",\n'
+                 '\n')
+
+    assert import_files(db, [path]) == 2
+    assert expenses(db) == [
+        ('1 Main St', '2024-01-02', 'expense', 'Repairs', 'Sink', 'Plumber', -8000, 'Check'),
+        ('2 Oak Ave', '2024-01-03', 'income', 'Rents received', 'Jan', 'Tenant', 120000, None),
+    ]
+    assert db.verify_rollups() == []
+
+
+def test_ofx_import_uses_given_address(db, tmp_path):
+    path = write(tmp_path, 'bank.ofx',
+                 '<OFX><BANKTRANLIST>\n'
+                 '<STMTTRN><TRNTYPE>CHECK<DTPOSTED>20240115<TRNAMT>-125.50'
+                 '<NAME>Plumber<MEMO>Fix sink\n</STMTTRN>\n'
+                 '<STMTTRN><TRNTYPE>DIRECTDEP</TRNTYPE><DTPOSTED>20240201'
+                 '</DTPOSTED><TRNAMT>1500.00</TRNAMT><NAME>Tenant</NAME>'
+                 '</STMTTRN>\n</BANKTRANLIST></OFX>\n')
+
+    assert import_files(db, [path], address='9 Elm') == 2
+    assert expenses(db) == [
+        ('9 Elm', '2024-01-15', 'expense', None, 'Fix sink', 'Plumber', -12550, 'Check'),
+        ('9 Elm', '2024-02-01', 'income', None, None, 'Tenant', 150000, 'Bank Transfer'),
+    ]
+
+
+def test_bad_row_rolls_back_whole_import(db, tmp_path):
+    good = write(tmp_path, 'good.csv', 'Address,Date,Amount\nA,2024-01-01,5\n')
+    bad = write(tmp_path, 'bad.csv', 'Address,Date,Amount\nB,2024-01-01,abc\n')
+
+    with pytest.raises(ValueError, match='line 2'):
+        import_files(db, [good, bad])
+    assert expenses(db) == []
+    assert db.query_all('SELECT * FROM houses') == []
+
+
+def test_progress_is_batched_and_can_cancel(db):
+    records = [('A', '2024-01-01', 'expense', None, None, None, -1.0, None)] * 25
+    seen = []
+    assert import_records(db, records, seen.append, batch_size=10) == 25
+    assert seen == [10, 20, 25]
+
+    def cancel(count):
+        raise ImportCancelled()
+    with pytest.raises(ImportCancelled):
+        import_records(db, records, cancel, batch_size=10)
+    assert db.query_one('SELECT COUNT(*) FROM expenses')[0] == 25
@@ -0,0 +1,44 @@
+import pytest
+
+from gui.db_utils import DBManager
+from gui.instrumentation import instrumentation
+
+
+@pytest.fixture
+def recording(tmp_path):
+    log_path = str(tmp_path / 'slow.log')
+    instrumentation.reset()
+    instrumentation.configure(True, 0, log_path)
+    yield log_path
+    instrumentation.configure(False)
+    instrumentation.reset()
+
+
+def test_disabled_by_default_records_nothing(tmp_path):
+    db = DBManager(str(tmp_path / 'test.db'))
+    db.init_db()
+    db.query_all('SELECT * FROM houses')
+    db.close()
+    assert instrumentation.snapshot() == []
+
+
+def test_statements_are_timed_with_row_counts(tmp_path, recording):
+    db = DBManager(str(tmp_path / 'test.db'))
+    db.init_db()
+    with db.transaction():
+        db.executemany('INSERT INTO houses(address) VALUES(?)',
+                       [('a',), ('b',), ('c',)])
+    for _ in range(2):
+        db.query_all('SELECT   address\n FROM houses')
+    db.query_one('SELECT id FROM houses WHERE address = ?', ('z',))
+    db.close()
+
+    stats = {(kind, name): (calls, rows)
+             for kind, name, calls, total, longest, rows
+             in instrumentation.snapshot()}
+    assert stats[('sql', 'SELECT address FROM houses')] == (2, 6)
+    assert stats[('sql', 'SELECT id FROM houses WHERE address = ?')] == (1, 0)
+
+    # A zero threshold logs every operation
+    with open(recording) as f:
+        assert 'SELECT address FROM houses' in f.read()
@@ -0,0 +1,215 @@
+import sqlite3
+
+import pytest
+
+from gui.db_utils import DBManager
+from gui.ledger import ALL_DATES, DateRange, Ledger, Transaction
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    db = DBManager(str(tmp_path / 'test.db'))
+    db.init_db()
+    yield Ledger(db)
+    db.close()
+
+
+def add(ledger, address, amount, category='Repairs'):
+    type_ = 'income' if amount > 0 else 'expense'
+    return ledger.add_transaction(Transaction(
+        address, '2024-01-01', type_, category, 'desc', 'who', amount, 'Cash'))
+
+
+def all_expenses(ledger):
+    return ledger.db.query_all('SELECT * FROM expenses ORDER BY id')
+
+
+def test_add_transaction_creates_house_once(ledger):
+    add(ledger, '1 Main St', -10)
+    add(ledger, '1 Main St', 500, 'Rents received')
+    add(ledger, '2 Oak Ave', -5)
+
+    assert ledger.addresses() == ['1 Main St', '2 Oak Ave']
+    summaries = ledger.house_summaries()
+    assert [(s.address, s.income, s.expenses, s.net) for s in summaries] == [
+        ('1 Main St', 500, -10, 490),
+        ('2 Oak Ave', 0, -5, -5),
+    ]
+    assert [tuple(t) for t in ledger.category_totals('1 Main St')] == [
+        ('Rents received', 500, 0),
+        ('Repairs', 0, -10),
+    ]
+
+
+def test_undo_and_redo_delete_transaction(ledger):
+    add(ledger, '1 Main St', -10)
+    expense_id = add(ledger, '1 Main St', -20)
+    before = all_expenses(ledger)
+
+    assert ledger.delete_transaction(expense_id)
+    assert len(all_expenses(ledger)) == 1
+    assert ledger.house_summaries()[0].expenses == -10
+
+    entry = ledger.undo()
+    assert entry.label == 'Delete Transaction'
+    assert entry.house_ids == {before[0][1]} and not entry.houses_changed
+    # Every column comes back, type and category included
+    assert all_expenses(ledger) == before
+    assert ledger.house_summaries()[0].expenses == -30
+
+    ledger.redo()
+    assert len(all_expenses(ledger)) == 1
+    assert ledger.redo() is None
+    assert not ledger.delete_transaction(12345)
+
+
+def test_undo_and_redo_delete_house(ledger):
+    add(ledger, '1 Main St', -10)
+    add(ledger, '1 Main St', 40, 'Rents received')
+    add(ledger, '2 Oak Ave', -5)
+    before = all_expenses(ledger)
+
+    assert ledger.delete_house('1 Main St')
+    assert ledger.addresses() == ['2 Oak Ave']
+
+    assert ledger.undo().houses_changed
+    assert ledger.addresses() == ['1 Main St', '2 Oak Ave']
+    assert all_expenses(ledger) == before
+    assert ledger.db.verify_rollups() == []
+
+    ledger.redo()
+    assert ledger.addresses() == ['2 Oak Ave']
+    assert ledger.db.verify_rollups() == []
+
+
+def test_undo_goes_back_through_every_action(ledger):
+    add(ledger, '1 Main St', -10)
+    expense_id = add(ledger, '1 Main St', -20)
+    ledger.rename_house('1 Main St', '3 Elm Rd')
+    ledger.delete_transaction(expense_id)
+    ledger.delete_house('3 Elm Rd')
+
+    labels = []
+    while (entry := ledger.undo()) is not None:
+        labels.append(entry.label)
+    assert labels == ['Delete House', 'Delete Transaction', 'Rename House',
+                      'Add Transaction', 'Add Transaction']
+    assert ledger.addresses() == [] and all_expenses(ledger) == []
+
+    ledger.redo()
+    ledger.redo()
+    ledger.redo()
+    assert ledger.addresses() == ['3 Elm Rd']
+    assert len(all_expenses(ledger)) == 2
+    # A new action drops what was left to redo
+    add(ledger, '2 Oak Ave', -5)
+    assert ledger.redo() is None
+    assert ledger.undo().label == 'Add Transaction'
+    assert ledger.undo().label == 'Rename House'
+    assert ledger.addresses() == ['1 Main St']
+    assert ledger.db.verify_rollups() == []
+
+
+def test_rename_house_rejects_duplicates(ledger):
+    ledger.add_house('1 Main St')
+    ledger.add_house('2 Oak Ave')
+
+    ledger.rename_house('1 Main St', '3 Elm Rd')
+    assert ledger.addresses() == ['3 Elm Rd', '2 Oak Ave']
+    with pytest.raises(sqlite3.IntegrityError):
+        ledger.rename_house('3 Elm Rd', '2 Oak Ave')
+    assert ledger.addresses() == ['3 Elm Rd', '2 Oak Ave']
+
+
+def add_dated(ledger, address, date, amount, category='Repairs'):
+    type_ = 'income' if amount > 0 else 'expense'
+    return ledger.add_transaction(Transaction(
+        address, date, type_, category, 'desc', 'who', amount, 'Cash'))
+
+
+def test_date_range_limits_totals(ledger):
+    add_dated(ledger, '1 Main St', '2023-12-31', -10)
+    add_dated(ledger, '1 Main St', '2024-03-05', -20)
+    add_dated(ledger, '1 Main St', '2024-03-31', 300, 'Rents received')
+    add_dated(ledger, '2 Oak Ave', '2025-01-01', -5)
+
+    assert DateRange.month(2024, 2) == DateRange('2024-02-01', '2024-02-29')
+    assert ledger.date_bounds() == ('2023-12-31', '2025-01-01')
+    year = DateRange.year(2024)
+    assert [tuple(s) for s in ledger.house_summaries(year)] == [
+        ('1 Main St', 300, -20), ('2 Oak Ave', 0, 0)]
+    assert [tuple(t) for t in ledger.category_totals('1 Main St', year)] == [
+        ('Rents received', 300, 0), ('Repairs', 0, -20)]
+    # All dates still come from the rollups and agree with an open range
+    assert ledger.house_summaries(ALL_DATES) == ledger.house_summaries(
+        DateRange(start='2000-01-01'))
+    header, cursor = ledger.summary_cursor(DateRange.month(2024, 3))
+    assert cursor.fetchall() == [
+        ('1 Main St', 3.0, -0.2, 2.8), ('2 Oak Ave', 0.0, 0.0, 0.0)]
+
+
+def test_cash_flow_pivots_months_across_houses(ledger):
+    add_dated(ledger, '1 Main St', '2023-11-30', -10)
+    add_dated(ledger, '1 Main St', '2024-01-05', -20)
+    add_dated(ledger, '1 Main St', '2024-01-31', 300, 'Rents received')
+    add_dated(ledger, '2 Oak Ave', '2024-01-02', -5)
+    ledger.add_house('3 Elm Rd')
+
+    cash_flow = ledger.cash_flow()
+    # Months without transactions are kept, houses without are not
+    assert cash_flow.months == ['2023-11', '2023-12', '2024-01']
+    assert cash_flow.addresses == ['1 Main St', '2 Oak Ave']
+    assert cash_flow.cells == {
+        ('1 Main St', '2023-11'): (0, -10),
+        ('1 Main St', '2024-01'): (300, -20),
+        ('2 Oak Ave', '2024-01'): (0, -5),
+    }
+    assert cash_flow.month_totals() == [(0, -10), (0, 0), (300, -25)]
+
+    year = ledger.cash_flow(DateRange.year(2024))
+    assert year.months == ['2024-01']
+    assert year.month_totals() == [(300, -25)]
+    assert ledger.cash_flow(DateRange.year(2022)).months == []
+
+
+def test_dates_must_be_iso(ledger):
+    with pytest.raises(sqlite3.IntegrityError):
+        add_dated(ledger, '1 Main St', '03/05/2024', -10)
+    with pytest.raises(sqlite3.IntegrityError):
+        add_dated(ledger, '1 Main St', '2024-02-30', -10)
+    assert ledger.date_bounds() == (None, None)
+
+
+def test_search_finds_word_prefixes_across_houses(ledger):
+    first = ledger.add_transaction(Transaction(
+        '1 Main St', '2024-01-02', 'expense', 'Repairs', '2nd floor plumbing',
+        'Joe Plumber', -100, 'Check'))
+    ledger.add_transaction(Transaction(
+        '2 Oak Ave', '2024-03-04', 'expense', 'Repairs', 'Leak', 'Joe Plumber',
+        -200, 'Cash'))
+    ledger.add_transaction(Transaction(
+        '2 Oak Ave', '2024-05-06', 'income', 'Rents received', 'May', 'Tenant',
+        900, None))
+
+    assert [r.address for r in ledger.search('plum')] == ['2 Oak Ave', '1 Main St']
+    assert [r.id for r in ledger.search('plum 2nd')] == [first]
+    assert [r.amount for r in ledger.search('joe', DateRange.month(2024, 3))] == [-200]
+    assert ledger.search('plum', limit=1)[0].date == '2024-03-04'
+    # Query syntax is taken as plain words
+    assert ledger.search('"NEAR(') == []
+    assert ledger.search('  ') == []
+
+    # The index follows edits and deletes
+    ledger.db.execute("UPDATE expenses SET recipient = 'Ann Electric' WHERE id = ?",
+                      (first,))
+    ledger.db.commit()
+    assert [r.id for r in ledger.search('electric')] == [first]
+    ledger.delete_transaction(first)
+    assert ledger.search('electric') == []
+
+
+def test_search_without_fts5_falls_back_to_like(ledger, monkeypatch):
+    add(ledger, '1 Main St', -10)
+    monkeypatch.setattr(ledger.db, 'has_table', lambda name: False)
+    assert [r.expense for r in ledger.search('des WH')] == ['desc']
+    assert ledger.search('nothing') == []
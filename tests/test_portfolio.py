@@ -0,0 +1,116 @@
+from gui.db_utils import DBManager
+from gui.ledger import DateRange, Ledger, Transaction
+from gui.portfolio import Portfolio
+
+
+def make_ledger(path, houses):
+    """A ledger file with {address: [(date, category, amount)]}."""
+    db = DBManager(str(path))
+    db.init_db()
+    ledger = Ledger(db)
+    for address, transactions in houses.items():
+        for date, category, amount in transactions:
+            ledger.add_transaction(Transaction(
+                address, date, 'income' if amount > 0 else 'expense',
+                category, 'desc', 'who', amount, 'Cash'))
+    return db
+
+
+def test_houses_across_files_in_file_and_creation_order(tmp_path):
+    paths = [tmp_path / f'{name}.db' for name in 'abc']
+    for db in (
+        make_ledger(paths[0], {'9 Z St': [('2024-01-05', 'Repairs', -10)],
+                               '1 A St': [('2024-02-05', 'Rents received', 500)]}),
+        make_ledger(paths[1], {}),
+        make_ledger(paths[2], {'5 M St': [('2023-06-01', 'Repairs', -7)]}),
+    ):
+        db.close()
+
+    portfolio = Portfolio(map(str, paths + paths[:1]))
+    try:
+        assert len(portfolio.paths) == 3
+        assert [(h.path, tuple(h.summary)) for h in portfolio.houses()] == [
+            (str(paths[0]), ('9 Z St', 0, -10)),
+            (str(paths[0]), ('1 A St', 500, 0)),
+            (str(paths[2]), ('5 M St', 0, -7)),
+        ]
+        assert [tuple(h.summary) for h in portfolio.houses(DateRange.year(2024))] == [
+            ('9 Z St', 0, -10), ('1 A St', 500, 0), ('5 M St', 0, 0)]
+        # One query for all three files
+        assert portfolio.queries == 2
+    finally:
+        portfolio.close()
+
+
+def test_category_totals_merge_across_files(tmp_path):
+    paths = [tmp_path / 'a.db', tmp_path / 'b.db']
+    make_ledger(paths[0], {'1 A St': [('2024-01-05', 'Repairs', -10),
+                                      ('2024-01-06', 'Rents received', 300)],
+                           '2 B St': [('2024-01-07', 'Repairs', -5)]}).close()
+    make_ledger(paths[1], {'1 A St': [('2024-03-01', 'Repairs', -1),
+                                      ('2024-03-02', 'Insurance', -20)]}).close()
+
+    portfolio = Portfolio(map(str, paths))
+    try:
+        assert [tuple(t) for t in portfolio.category_totals()] == [
+            ('Insurance', 0, -20),
+            ('Rents received', 300, 0),
+            ('Repairs', 0, -16),
+        ]
+        # One house of one file, despite the same address in the other
+        assert [tuple(t) for t in portfolio.category_totals(
+            path=str(paths[0]), address='1 A St')] == [
+            ('Rents received', 300, 0),
+            ('Repairs', 0, -10),
+        ]
+        assert [tuple(t) for t in portfolio.category_totals(
+            DateRange.month(2024, 3))] == [
+            ('Insurance', 0, -20),
+            ('Repairs', 0, -1),
+        ]
+    finally:
+        portfolio.close()
+
+
+def test_only_changed_files_are_queried_again(tmp_path):
+    paths = [tmp_path / 'a.db', tmp_path / 'b.db']
+    make_ledger(paths[0], {'1 A St': [('2024-01-05', 'Repairs', -10)]}).close()
+    db = make_ledger(paths[1], {'2 B St': [('2024-01-05', 'Repairs', -3)]})
+
+    portfolio = Portfolio(map(str, paths))
+    try:
+        portfolio.houses()
+        misses = portfolio.cache.misses
+        portfolio.houses()
+        assert portfolio.cache.misses == misses
+        assert portfolio.queries == 1
+
+        Ledger(db).add_transaction(Transaction(
+            '2 B St', '2024-02-01', 'expense', 'Repairs', 'desc', 'who', -4, 'Cash'))
+        houses = portfolio.houses()
+        assert [tuple(h.summary) for h in houses] == [
+            ('1 A St', 0, -10), ('2 B St', 0, -7)]
+        assert portfolio.cache.misses == misses + 1
+        assert portfolio.queries == 2
+    finally:
+        portfolio.close()
+        db.close()
+
+
+def test_files_beyond_the_attach_limit_are_batched(tmp_path):
+    paths = []
+    for i in range(12):
+        path = tmp_path / f'{i:02}.db'
+        make_ledger(path, {f'{i} Main St': [('2024-01-01', 'Repairs', -i)]}).close()
+        paths.append(str(path))
+
+    portfolio = Portfolio(paths)
+    try:
+        houses = portfolio.houses()
+        assert [h.summary.expenses for h in houses] == [-i for i in range(12)]
+        assert [h.path for h in houses] == paths
+        batches = portfolio._batches()
+        assert len(batches) > 1
+        assert portfolio.queries == len(batches)
+    finally:
+        portfolio.close()
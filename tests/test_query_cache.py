@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from gui.db_utils import DBManager
+from gui.query_cache import QueryCache, result_size
+
+SQL = 'SELECT address FROM houses ORDER BY id'
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = DBManager(str(tmp_path / 'test.db'))
+    db.init_db()
+    with db.transaction():
+        db.execute("INSERT INTO houses(address) VALUES('a')")
+    yield db
+    db.close()
+
+
+def test_repeated_reads_come_from_memory(db):
+    first = db.query_cached(SQL)
+    executed = db.stats()['statements_executed']
+    assert db.query_cached(SQL) == first == (('a',),)
+    assert db.stats()['statements_executed'] == executed
+    assert db.stats()['cache_hits'] == 1
+
+
+def test_own_commit_invalidates(db):
+    db.query_cached(SQL)
+    with db.transaction():
+        db.execute("INSERT INTO houses(address) VALUES('b')")
+    assert db.query_cached(SQL) == (('a',), ('b',))
+
+
+def test_other_connection_commit_invalidates(db):
+    db.query_cached(SQL)
+    other = sqlite3.connect(db.path)
+    other.execute("INSERT INTO houses(address) VALUES('c')")
+    other.commit()
+    other.close()
+    assert db.query_cached(SQL) == (('a',), ('c',))
+
+
+def test_uncommitted_rows_are_not_cached(db):
+    with pytest.raises(ValueError):
+        with db.transaction():
+            db.execute("INSERT INTO houses(address) VALUES('d')")
+            assert db.query_cached(SQL) == (('a',), ('d',))
+            raise ValueError('roll back')
+    assert db.query_cached(SQL) == (('a',),)
+
+
+def test_least_recently_used_entries_are_evicted():
+    rows = ((1, 'x'),)
+    cache = QueryCache(max_bytes=result_size(rows) * 2)
+    cache.put('a', 0, rows)
+    cache.put('b', 0, rows)
+    assert cache.get('a') == rows
+    cache.put('c', 0, rows)
+    assert cache.get('b') is None
+    assert cache.get('a') == rows
+    assert cache.get('c') == rows
+    assert cache.stats()['cache_evictions'] == 1
+
+
+def test_results_read_before_a_change_are_not_stored():
+    cache = QueryCache()
+    generation = cache.generation
+    cache.invalidate()
+    cache.put('a', generation, ((1,),))
+    assert cache.get('a') is None
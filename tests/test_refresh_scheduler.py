@@ -0,0 +1,51 @@
+import pytest
+from PySide6.QtCore import QCoreApplication
+
+from gui.refresh_scheduler import RefreshScheduler
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def test_marks_coalesce_into_one_refresh_per_tick(app):
+    calls = []
+    scheduler = RefreshScheduler()
+    scheduler.register('addresses', lambda: calls.append('addresses'))
+    scheduler.register('summary', lambda: calls.append('summary'))
+    scheduler.register('details', lambda: calls.append('details'))
+
+    scheduler.mark_dirty('summary')
+    scheduler.mark_dirty('details', 'summary')
+    scheduler.mark_dirty('addresses')
+    assert calls == []
+    app.processEvents()
+    # Once each, in registration order
+    assert calls == ['addresses', 'summary', 'details']
+
+    app.processEvents()
+    assert calls == ['addresses', 'summary', 'details']
+
+
+def test_marks_made_while_refreshing_wait_for_the_next_tick(app):
+    calls = []
+    scheduler = RefreshScheduler()
+
+    def refresh_summary():
+        calls.append('summary')
+        scheduler.mark_dirty('details')
+
+    scheduler.register('summary', refresh_summary)
+    scheduler.register('details', lambda: calls.append('details'))
+    scheduler.mark_dirty('summary')
+    scheduler.flush()
+    assert calls == ['summary']
+    assert scheduler.is_dirty('details')
+    app.processEvents()
+    assert calls == ['summary', 'details']
+
+
+def test_unknown_view_is_rejected(app):
+    with pytest.raises(KeyError):
+        RefreshScheduler().mark_dirty('chart')
@@ -0,0 +1,288 @@
+import sqlite3
+
+import pytest
+
+from gui.db_utils import DBManager, MIGRATIONS
+
+
+@pytest.fixture
+def db(tmp_path):
+    manager = DBManager(str(tmp_path / 'test.db'))
+    manager.init_db()
+    yield manager
+    manager.close()
+
+
+def add_house(db, address):
+    with db.transaction():
+        return db.execute(
+            'INSERT INTO houses(address) VALUES(?)', (address,)).lastrowid
+
+
+def add_expense(db, house_id, type_, category, amount):
+    with db.transaction():
+        return db.execute(
+            'INSERT INTO expenses(house_id, date, type, category, amount)'
+            ' VALUES(?, ?, ?, ?, ?)',
+            (house_id, '2024-01-01', type_, category, amount)
+        ).lastrowid
+
+
+def house_totals(db):
+    return {
+        house_id: (round(income, 2), round(expenses, 2), count)
+        for house_id, income, expenses, count in db.query_all(
+            'SELECT house_id, income, expenses, row_count FROM house_totals')
+    }
+
+
+def category_totals(db):
+    return {
+        (house_id, category): (round(income, 2), round(expenses, 2), count)
+        for house_id, category, income, expenses, count in db.query_all(
+            'SELECT house_id, category, income, expenses, row_count'
+            ' FROM house_category_totals')
+    }
+
+
+def test_migrations_bring_new_db_to_latest_version(db):
+    assert db.schema_version() == len(MIGRATIONS)
+    tables = {name for (name,) in db.query_all(
+        "SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert {'house_totals', 'house_category_totals'} <= tables
+
+
+def test_migrations_upgrade_legacy_db(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE houses (id INTEGER PRIMARY KEY, address TEXT UNIQUE);
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY, house_id INTEGER, date TEXT,
+            expense TEXT, recipient TEXT, amount REAL, payment TEXT);
+        INSERT INTO houses VALUES (1, '1 Main St');
+        INSERT INTO expenses(house_id, date, amount) VALUES (1, '2024-01-01', -10);
+    ''')
+    conn.commit()
+    conn.close()
+
+    db = DBManager(path)
+    db.init_db()
+    assert db.schema_version() == len(MIGRATIONS)
+    # Legacy rows default to expenses and are rolled up on upgrade, with
+    # dollar amounts turned into cents
+    assert house_totals(db) == {1: (0, -1000, 1)}
+    assert db.verify_rollups() == []
+    db.close()
+
+
+def test_insert_updates_rollups(db):
+    house = add_house(db, '1 Main St')
+    add_expense(db, house, 'income', 'Rents received', 1000)
+    add_expense(db, house, 'expense', 'Repairs', -250.5)
+    add_expense(db, house, 'expense', None, -20)
+
+    assert house_totals(db) == {house: (1000, -270.5, 3)}
+    assert category_totals(db) == {
+        (house, 'Rents received'): (1000, 0, 1),
+        (house, 'Repairs'): (0, -250.5, 1),
+        (house, ''): (0, -20, 1),
+    }
+    assert db.verify_rollups() == []
+
+
+def test_update_amount_and_type(db):
+    house = add_house(db, '1 Main St')
+    expense = add_expense(db, house, 'expense', 'Repairs', -100)
+    with db.transaction():
+        db.execute(
+            "UPDATE expenses SET type = 'income', amount = 40 WHERE id = ?",
+            (expense,))
+
+    assert house_totals(db) == {house: (40, 0, 1)}
+    assert category_totals(db) == {(house, 'Repairs'): (40, 0, 1)}
+    assert db.verify_rollups() == []
+
+
+def test_update_moves_row_between_houses_and_categories(db):
+    first = add_house(db, '1 Main St')
+    second = add_house(db, '2 Main St')
+    moved = add_expense(db, first, 'expense', 'Repairs', -100)
+    add_expense(db, first, 'expense', 'Taxes', -30)
+    with db.transaction():
+        db.execute(
+            "UPDATE expenses SET house_id = ?, category = 'Utilities'"
+            ' WHERE id = ?',
+            (second, moved))
+
+    assert house_totals(db) == {first: (0, -30, 1), second: (0, -100, 1)}
+    # Emptied groups are removed rather than left at zero
+    assert category_totals(db) == {
+        (first, 'Taxes'): (0, -30, 1),
+        (second, 'Utilities'): (0, -100, 1),
+    }
+    assert db.verify_rollups() == []
+
+
+def test_delete_removes_empty_groups(db):
+    house = add_house(db, '1 Main St')
+    keep = add_expense(db, house, 'expense', 'Repairs', -100)
+    gone = add_expense(db, house, 'income', 'Rents received', 500)
+    with db.transaction():
+        db.execute('DELETE FROM expenses WHERE id = ?', (gone,))
+
+    assert house_totals(db) == {house: (0, -100, 1)}
+    assert category_totals(db) == {(house, 'Repairs'): (0, -100, 1)}
+
+    with db.transaction():
+        db.execute('DELETE FROM expenses WHERE id = ?', (keep,))
+    assert house_totals(db) == {}
+    assert category_totals(db) == {}
+    assert db.verify_rollups() == []
+
+
+def test_verify_and_rebuild_stale_rollups(db):
+    house = add_house(db, '1 Main St')
+    add_expense(db, house, 'expense', 'Repairs', -100)
+    with db.transaction():
+        db.execute('UPDATE house_totals SET expenses = 0')
+
+    assert db.verify_rollups() == [house]
+    db.rebuild_rollups()
+    assert db.verify_rollups() == []
+    assert house_totals(db) == {house: (0, -100, 1)}
+
+
+def month_totals(db):
+    return {
+        (house_id, month): (income, expenses, count)
+        for house_id, month, income, expenses, count in db.query_all(
+            'SELECT house_id, month, income, expenses, row_count'
+            ' FROM house_month_totals')
+    }
+
+
+def test_month_rollup_follows_date_changes(db):
+    house = add_house(db, '1 Main St')
+    moved = add_expense(db, house, 'expense', 'Repairs', -100)
+    add_expense(db, house, 'income', 'Rents received', 500)
+    assert month_totals(db) == {(house, '2024-01'): (500, -100, 2)}
+
+    with db.transaction():
+        db.execute("UPDATE expenses SET date = '2024-02-29' WHERE id = ?", (moved,))
+    assert month_totals(db) == {
+        (house, '2024-01'): (500, 0, 1),
+        (house, '2024-02'): (0, -100, 1),
+    }
+
+    # Undated rows belong to no month; emptied months are removed
+    with db.transaction():
+        db.execute('UPDATE expenses SET date = NULL WHERE id = ?', (moved,))
+    assert month_totals(db) == {(house, '2024-01'): (500, 0, 1)}
+    assert db.verify_rollups() == []
+
+    with db.transaction():
+        db.execute("UPDATE house_month_totals SET income = 0")
+    assert db.verify_rollups() == [house]
+    db.rebuild_rollups()
+    assert month_totals(db) == {(house, '2024-01'): (500, 0, 1)}
+
+
+def test_amounts_migrate_to_exact_cents(tmp_path):
+    path = str(tmp_path / 'dollars.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE houses (id INTEGER PRIMARY KEY, address TEXT UNIQUE);
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY, house_id INTEGER, date TEXT,
+            type TEXT, category TEXT, expense TEXT, recipient TEXT,
+            amount REAL, payment TEXT);
+        INSERT INTO houses VALUES (1, '1 Main St');
+    ''')
+    conn.executemany(
+        "INSERT INTO expenses(house_id, date, type, category, amount)"
+        " VALUES (1, '2024-01-01', 'expense', 'Repairs', ?)",
+        [(0.1,), (0.2,), (-19.99,), (None,)])
+    conn.commit()
+    conn.close()
+
+    db = DBManager(path)
+    db.init_db()
+    assert db.query_all('SELECT amount, typeof(amount) FROM expenses ORDER BY id') == [
+        (10, 'integer'), (20, 'integer'), (-1999, 'integer'), (None, 'null')]
+    # Indexes and triggers survive the table rebuild
+    names = {name for (name,) in db.query_all(
+        "SELECT name FROM sqlite_master WHERE tbl_name = 'expenses'")}
+    assert {'idx_expenses_house_amount', 'trg_expenses_rollup_insert'} <= names
+    assert house_totals(db) == {1: (0, -1969, 4)}
+    add_expense(db, 1, 'expense', 'Repairs', -1)
+    assert house_totals(db) == {1: (0, -1970, 5)}
+    assert db.verify_rollups() == []
+    db.close()
+
+
+def test_dates_migrate_to_iso(tmp_path):
+    path = str(tmp_path / 'dates.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE houses (id INTEGER PRIMARY KEY, address TEXT UNIQUE);
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY, house_id INTEGER, date TEXT,
+            expense TEXT, recipient TEXT, amount REAL, payment TEXT);
+        INSERT INTO houses VALUES (1, '1 Main St');
+        INSERT INTO expenses(house_id, date, amount) VALUES
+            (1, '01/15/2024', -1), (1, '2024-01-16', -1),
+            (1, 'someday', -1), (1, NULL, -1);
+    ''')
+    conn.commit()
+    conn.close()
+
+    db = DBManager(path)
+    db.init_db()
+    # Unreadable dates are kept as they were rather than dropped
+    assert db.query_all('SELECT date FROM expenses ORDER BY id') == [
+        ('2024-01-15',), ('2024-01-16',), ('someday',), (None,)]
+    db.close()
+
+
+def test_deleting_house_cascades_to_expenses(db):
+    house = add_house(db, '1 Main St')
+    other = add_house(db, '2 Oak Ave')
+    add_expense(db, house, 'expense', 'Repairs', -10)
+    add_expense(db, other, 'expense', 'Repairs', -5)
+
+    with db.transaction():
+        db.execute('DELETE FROM houses WHERE id = ?', (house,))
+    assert db.query_all('SELECT house_id FROM expenses') == [(other,)]
+    # The rollup triggers fire for cascaded deletes too
+    assert house_totals(db) == {other: (0, -5, 1)}
+    assert db.verify_rollups() == []
+    with pytest.raises(sqlite3.IntegrityError):
+        add_expense(db, house, 'expense', 'Repairs', -1)
+
+
+def test_migration_drops_orphaned_expenses(tmp_path):
+    path = str(tmp_path / 'orphans.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE houses (id INTEGER PRIMARY KEY, address TEXT UNIQUE);
+        CREATE TABLE expenses (
+            id INTEGER PRIMARY KEY, house_id INTEGER, date TEXT,
+            expense TEXT, recipient TEXT, amount REAL, payment TEXT,
+            FOREIGN KEY(house_id) REFERENCES houses(id));
+        INSERT INTO houses VALUES (1, '1 Main St');
+        INSERT INTO expenses(house_id, date, amount) VALUES
+            (1, '2024-01-01', -1), (2, '2024-01-01', -2), (NULL, NULL, -3);
+    ''')
+    conn.commit()
+    conn.close()
+
+    db = DBManager(path)
+    db.init_db()
+    assert db.query_all('SELECT house_id, amount FROM expenses ORDER BY id') == [
+        (1, -100), (None, -300)]
+    assert house_totals(db) == {1: (0, -100, 1)}
+    assert db.query_all('PRAGMA foreign_key_check') == []
+    assert 'ON DELETE CASCADE' in db.query_one(
+        "SELECT sql FROM sqlite_master WHERE name = 'expenses'")[0]
+    db.close()